@@ -1,24 +1,224 @@
-from openai import OpenAI
+import asyncio
+import functools
 import json
 import logging
 import re
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
 
+from analysis_templates import AnalysisTemplates
+from cache_backend import open_backend
 from config import config
+from guide_cache import GuideCache
+from guide_pack import GuidePack, prompt_hash
+from hedging import Hedger
+from http_clients import get_client_factory
+from history import message_tokens, trim_history
+from intent import get_detector
+from metrics import get_metrics
+from model_router import ModelRouter, is_degradation
+from priority_scheduler import SchedulerRejected, current_priority, get_scheduler, priority
+from quiz_parser import parse_quiz, quiz_response_format, validate_quiz
+from quiz_pool import QuizPool
+from rate_limiter import Ticket, get_rate_limiter
+from singleflight import SingleFlight, request_key
 
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# 가이드 요청 문장이 따로 정해진 주제 (나머지는 공통 틀, guide_pack.known_topics 참고)
+GUIDE_PROMPTS = {
+    "토스_송금": "토스 앱에서 송금하는 방법을 단계별로 쉽게 설명해주세요.",
+    "토스_계좌조회": "토스 앱에서 계좌 잔액을 확인하는 방법을 알려주세요.",
+    "전화걸기": "전화걸기에 대해 단계별로 친절하게 설명해주세요.",
+    "문자보내기": "문자메시지 보내는 방법을 어르신이 이해하기 쉽게 설명해주세요.",
+}
+
+
+def setup_logging(level: int = logging.INFO):
+    """로깅 설정 (import 시점이 아니라 실행 진입점에서 호출)"""
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def _instrumented(method: str):
+    """메서드 전체 소요 시간과 성공/실패 횟수 기록 (동기·비동기 메서드 모두 지원)"""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(self, *args, **kwargs):
+                started = time.perf_counter()
+                result = await fn(self, *args, **kwargs)
+                self._record_call(method, started, result)
+                return result
+            return async_wrapper
+        
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            result = fn(self, *args, **kwargs)
+            self._record_call(method, started, result)
+            return result
+        return wrapper
+    return decorate
+
+
+class _StreamAccumulator:
+    """
+    스트리밍 청크 누적기 (동기·비동기 공통)
+    
+    이벤트 형식:
+        {"type": "delta", "text": str}
+        {"type": "done", "success": True, "message": str, "tokens_used": int,
+         "ttft_ms": float, "total_ms": float, "timestamp": str}
+        {"type": "error", "success": False, "error": str, "timestamp": str}
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.parts: List[str] = []
+        self.ttft_ms: Optional[float] = None
+        self.tokens_used: Optional[int] = None
+        self.usage = None
+
+    def feed(self, chunk) -> Optional[Dict]:
+        """청크 하나 처리 → delta 이벤트 (텍스트가 없으면 None)"""
+        # stream_options.include_usage: 마지막 청크에 usage만 담겨서 옴
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage
+            self.tokens_used = chunk.usage.total_tokens
+        
+        if not chunk.choices:
+            return None
+        
+        text = chunk.choices[0].delta.content
+        if not text:
+            return None
+        
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.started) * 1000
+        self.parts.append(text)
+        return {"type": "delta", "text": text}
+
+    def done(self) -> Dict:
+        event = {
+            "type": "done",
+            "success": True,
+            "message": "".join(self.parts),
+            "tokens_used": self.tokens_used,
+            "ttft_ms": self.ttft_ms,
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        logger.info(
+            f"Chat stream finished - Tokens: {self.tokens_used}, "
+            f"TTFT: {self.ttft_ms or 0:.0f}ms"
+        )
+        return event
+
+    @staticmethod
+    def error(e: Exception) -> Dict:
+        logger.error(f"Chat stream error: {e}")
+        return {
+            "type": "error",
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def cached(result: Dict) -> List[Dict]:
+        """캐시된 결과를 스트림 이벤트로 변환"""
+        return [
+            {"type": "delta", "text": result["message"]},
+            {**result, "type": "done", "ttft_ms": 0.0, "total_ms": 0.0}
+        ]
+
+
+class _Uncached(Exception):
+    """공유 캐시에 저장하지 않을 결과 (실패 응답을 get_or_compute 밖으로 전달)"""
+
+    def __init__(self, result: Dict):
+        super().__init__(result.get("error", ""))
+        self.result = result
+
+
 class SonjuAI:
     def __init__(self):
-        """OpenAI 클라이언트 초기화"""
+        """
+        초기화
+        
+        openai·numpy import와 클라이언트 생성은 처음 사용할 때(또는 warm_up()) 일어나므로
+        첫 화면을 띄우기까지 기다리지 않습니다.
+        """
         config.validate()
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        # OpenAI 클라이언트는 프로세스 공용 연결 풀에서 (http_clients.py)
+        self.clients = get_client_factory()
+        self._semantic_cache = None
+        self._lazy_lock = threading.Lock()
+        self.rate_limiter = get_rate_limiter()
+        # 등급별 대기열 (라이브 대화 > 퀴즈·분석 > 풀 채우기·일괄 작업, config.METHOD_PRIORITIES)
+        self.scheduler = get_scheduler() if config.SCHEDULER_ENABLED else None
+        self.metrics = get_metrics()
+        # 작업·의도별 모델 선택 (config.MODEL_ROUTES), 느려지거나 오류가 많으면 대체 모델로
+        self.router = ModelRouter(
+            config.MODEL_ROUTES,
+            window=config.ROUTER_WINDOW,
+            min_samples=config.ROUTER_MIN_SAMPLES,
+            p95_seconds=config.ROUTER_P95_SECONDS,
+            error_rate=config.ROUTER_ERROR_RATE,
+            cooldown=config.ROUTER_COOLDOWN
+        )
+        # 늦어지는 호출에 같은 요청을 한 번 더 보낼 메서드 (config.HEDGE_METHODS)
+        self.hedger = Hedger(
+            percentile=config.HEDGE_PERCENTILE,
+            max_ratio=config.HEDGE_MAX_RATIO,
+            burst=config.HEDGE_BURST,
+            default_delay=config.HEDGE_DEFAULT_DELAY,
+            min_delay=config.HEDGE_MIN_DELAY
+        ) if config.HEDGE_ENABLED else None
+        self.hedge_methods = set(config.HEDGE_METHODS) if config.HEDGE_ENABLED else set()
+        # 동일 요청 합치기를 적용할 메서드 (config.COALESCE_METHODS)
+        self.singleflight = SingleFlight()
+        self.coalesce_methods = set(config.COALESCE_METHODS)
+        self.guide_cache = GuideCache(
+            cache_dir=config.GUIDE_CACHE_DIR or None,
+            ttl=config.GUIDE_CACHE_TTL,
+            max_memory_entries=config.GUIDE_CACHE_MAX_MEMORY,
+            max_disk_entries=config.GUIDE_CACHE_MAX_DISK,
+            variants=config.GUIDE_CACHE_VARIANTS
+        ) if config.GUIDE_CACHE_ENABLED else None
+        # 워커 간 공유 캐시 (가이드 캐시 뒤의 2차 저장소, 같은 가이드는 한 워커만 생성)
+        self.cache_backend = open_backend(
+            config.CACHE_BACKEND,
+            max_entries=config.CACHE_MAX_ENTRIES,
+            lease_seconds=config.CACHE_LEASE_SECONDS,
+            wait_timeout=config.CACHE_WAIT_TIMEOUT
+        ) if self.guide_cache is not None else None
+        # 흔한 분석 유형은 템플릿으로 바로 작성 (config.ANALYSIS_*)
+        self.analysis_templates = AnalysisTemplates(
+            fast_seconds=config.ANALYSIS_FAST_SECONDS,
+            slow_seconds=config.ANALYSIS_SLOW_SECONDS,
+            high_accuracy=config.ANALYSIS_HIGH_ACCURACY,
+            good_accuracy=config.ANALYSIS_GOOD_ACCURACY,
+            min_accuracy=config.ANALYSIS_MIN_ACCURACY,
+            title=config.ANALYSIS_TITLE
+        ) if config.ANALYSIS_TEMPLATES_ENABLED else None
+        # 퀴즈 풀은 만들기만 하고, 채우는 워커(유료 호출)는 쓰는 쪽이 start_quiz_pool()로 시작
+        self.quiz_pool = None
+        if config.QUIZ_POOL_ENABLED:
+            self.quiz_pool = QuizPool(
+                generate=self._refill_quiz,
+                validate=self._validate_quiz,
+                low_water=config.QUIZ_POOL_LOW_WATER,
+                target=config.QUIZ_POOL_TARGET
+            )
+            for topic, difficulty in config.QUIZ_POOL_TOPICS:
+                self.quiz_pool.register(topic, difficulty)
         self.system_prompt = """
         당신은 "손주톡톡"이라는 70대 어르신 전담 AI 손주입니다.
 
@@ -40,58 +240,138 @@ class SonjuAI:
         - 절대로 마크다운 포맷을 사용하지 말 것 (**, *, #, - 등 금지)
         - 모든 텍스트는 평문으로만 작성
         """
+        
+        # 미리 만든 가이드 팩 (mmap, 파일이 없으면 None)
+        self.guide_pack = GuidePack.open(config.GUIDE_PACK_PATH)
+        if self.guide_pack is not None and self.guide_pack.meta.get("system_prompt_hash") != prompt_hash(self.system_prompt):
+            logger.warning("가이드 팩이 현재 시스템 프롬프트와 다른 설정으로 만들어졌습니다. 다시 빌드하세요.")
 
-    def chat(
-        self, 
-        message: str, 
-        conversation_history: List[Dict] = None
-    ) -> Dict:
+    # ========== 지연 생성 ==========
+
+    @property
+    def client(self):
+        """동기 OpenAI 클라이언트 (공용 풀, 재시도는 rate_limiter가 한도·retry-after를 보고 직접 관리)"""
+        return self.clients.sync_client()
+
+    @property
+    def async_client(self):
+        """서버(server.py)용 비동기 클라이언트: 하나의 이벤트 루프에서 동시 요청 처리 (루프마다 공용 풀)"""
+        return self.clients.async_client()
+
+    @property
+    def semantic_cache(self):
+        """유사 질문 캐시 (numpy import를 첫 사용 시점으로 미룸, 비활성화 시 None)"""
+        if self._semantic_cache is None and config.SEMANTIC_CACHE_ENABLED:
+            with self._lazy_lock:
+                if self._semantic_cache is None:
+                    from semantic_cache import SemanticCache
+                    self._semantic_cache = SemanticCache(
+                        threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                        max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+                        ttl=config.SEMANTIC_CACHE_TTL,
+                        signature=get_detector().topic_signature
+                    )
+        return self._semantic_cache
+
+    def start_quiz_pool(self):
         """
-        일반 채팅 기능
+        퀴즈 풀 백그라운드 워커 시작 (config.QUIZ_POOL_TOPICS를 미리 생성 - 호출 비용이 듭니다)
+        
+        퀴즈를 계속 내는 쪽(서버, 콘솔 챗봇)만 호출합니다. 시작하지 않으면 generate_quiz는 실시간 생성.
+        """
+        if self.quiz_pool is not None:
+            self.quiz_pool.start()
+
+    def stop_quiz_pool(self, timeout: Optional[float] = None):
+        if self.quiz_pool is not None:
+            self.quiz_pool.stop(timeout)
+
+    def warm_up(self, background: bool = True, connect: bool = True) -> Optional[threading.Thread]:
+        """
+        무거운 import·클라이언트 생성·첫 연결(TLS)을 미리 해둠
         
         Args:
-            message: 사용자 메시지
-            conversation_history: 이전 대화 [{"role": "user/assistant", "content": "내용"}]
-            
-        Returns:
-            {"success": bool, "message": str, "tokens_used": int, "timestamp": str}
+            background: 백그라운드 스레드에서 실행 (사용자가 첫 화면을 보는 동안)
+            connect: 모델 목록 조회로 실제 연결까지 열어둠 (토큰 사용 없음, config.OPENAI_WARM_CONNECTIONS개)
         """
-        try:
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # 최근 대화 히스토리 추가
-            if conversation_history:
-                messages.extend(conversation_history[-config.MAX_CONVERSATION_HISTORY:])
-            
-            messages.append({"role": "user", "content": message})
-            
-            response = self.client.chat.completions.create(
-                model=config.DEFAULT_MODEL,
-                messages=messages,
-                max_tokens=config.MAX_TOKENS,
-                temperature=config.TEMPERATURE_CHAT
-            )
-            
-            result = {
-                "success": True,
-                "message": response.choices[0].message.content,
-                "tokens_used": response.usage.total_tokens,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            logger.info(f"Chat successful - Tokens: {result['tokens_used']}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Chat error: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
+        def run():
+            started = time.perf_counter()
+            # 비동기 클라이언트는 쓰는 이벤트 루프에서 만듦 (서버는 awarm_up(), 콘솔은 쓰지 않음)
+            self.client
+            self.semantic_cache
+            opened = self.clients.warm(config.OPENAI_WARM_CONNECTIONS) if connect else 0
+            logger.info(f"Warm-up finished - {(time.perf_counter() - started) * 1000:.0f}ms, connections {opened}")
+        
+        if not background:
+            run()
+            return None
+        
+        thread = threading.Thread(target=run, name="sonju-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    async def awarm_up(self) -> int:
+        """서버 이벤트 루프의 비동기 풀에 연결을 미리 열어 둠 (열린 연결 수 반환)"""
+        started = time.perf_counter()
+        opened = await self.clients.awarm(config.OPENAI_WARM_CONNECTIONS)
+        logger.info(f"Async warm-up finished - {(time.perf_counter() - started) * 1000:.0f}ms, connections {opened}")
+        return opened
+
+    async def aclose(self):
+        """헤지 스레드·공유 캐시 정리 (OpenAI 클라이언트는 공용이므로 get_client_factory().aclose()로 닫음)"""
+        if self.hedger is not None:
+            self.hedger.shutdown()
+        if self.cache_backend is not None:
+            self.cache_backend.close()
 
-    def generate_quiz(self, topic: str, difficulty: str = "쉬움") -> Dict:
-        """퀴즈 생성"""
+    # ========== 요청 구성 / 응답 처리 (동기·비동기 공통) ==========
+
+    def _chat_request(
+        self,
+        message: str,
+        conversation_history: List[Dict] = None,
+        method: str = "chat"
+    ) -> Dict:
+        """채팅 요청 파라미터 구성 (일반 채팅은 메시지 의도별 경로 사용)"""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        
+        # 토큰 예산 안의 최근 대화 히스토리 추가
+        if conversation_history:
+            messages.extend(trim_history(conversation_history, config.HISTORY_TOKEN_BUDGET))
+        
+        messages.append({"role": "user", "content": message})
+        
+        intent = get_detector().detect(message)["type"] if method == "chat" else None
+        route = self.router.select(method, intent)
+        return {
+            "model": route["model"],
+            "messages": messages,
+            "max_tokens": route["max_tokens"],
+            "temperature": route["temperature"]
+        }
+
+    def _chat_result(self, response) -> Dict:
+        """채팅 응답 → 결과 dict"""
+        result = {
+            "success": True,
+            "message": response.choices[0].message.content,
+            "tokens_used": response.usage.total_tokens,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        logger.info(f"Chat successful - Tokens: {result['tokens_used']}")
+        return result
+
+    def _chat_error(self, e: Exception) -> Dict:
+        logger.error(f"Chat error: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _quiz_request(self, topic: str, difficulty: str) -> Dict:
+        """퀴즈 요청 파라미터 구성"""
         prompt = f"""
         {topic}에 대한 {difficulty} 난이도의 어르신용 퀴즈를 만들어주세요.
         
@@ -105,95 +385,746 @@ class SonjuAI:
         }}
         """
         
-        tokens_used = None
+        route = self.router.select("generate_quiz")
+        request = {
+            "model": route["model"],
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": route["max_tokens"],
+            "temperature": route["temperature"]
+        }
+        response_format = quiz_response_format(config.QUIZ_RESPONSE_FORMAT)
+        if response_format:
+            request["response_format"] = response_format
+        return request
+
+    def _parse_quiz(self, quiz_text: str) -> Dict:
+        """
+        퀴즈 응답 텍스트 → 검증된 퀴즈 dict (흔한 결함은 보정, quiz_parser 참고)
         
-        try:
-            response = self.client.chat.completions.create(
-                model=config.DEFAULT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-                temperature=config.TEMPERATURE_QUIZ
-            )
-            
-            tokens_used = response.usage.total_tokens
-            quiz_text = response.choices[0].message.content.strip()
-            
-            # JSON 추출
-            if "```json" in quiz_text:
-                quiz_text = quiz_text.split("```json")[1].split("```")[0]
-            elif "```" in quiz_text:
-                quiz_text = quiz_text.split("```")[1].split("```")[0]
-            
-            if "{" in quiz_text and "}" in quiz_text:
-                start = quiz_text.find("{")
-                end = quiz_text.rfind("}") + 1
-                quiz_text = quiz_text[start:end]
-            
-            quiz_data = json.loads(quiz_text)
-            
-            # 필수 필드 검증
-            required_fields = ["question", "options", "correct_answer", "explanation", "encouragement"]
-            missing_fields = [f for f in required_fields if f not in quiz_data]
-            if missing_fields:
-                raise KeyError(f"필수 필드 누락: {', '.join(missing_fields)}")
-            
-            # options 검증
-            if not isinstance(quiz_data["options"], list):
-                raise ValueError("options는 리스트가 아닙니다.")
-            
-            if len(quiz_data["options"]) != 4:
-                raise ValueError(f"options가 {len(quiz_data['options'])}개입니다. (4개 필요)")
-            
-            # correct_answer 타입 및 범위 검증
-            correct_answer = quiz_data["correct_answer"]
-            if isinstance(correct_answer, str) and correct_answer.isdigit():
-                correct_answer = int(correct_answer)
-                quiz_data["correct_answer"] = correct_answer
-            
-            if not isinstance(correct_answer, int) or not (1 <= correct_answer <= 4):
-                raise ValueError(f"correct_answer가 '{correct_answer}'입니다. (1~4 필요)")
-            
-            # 옵션 포맷 검증 (경고만)
-            for i, option in enumerate(quiz_data["options"], 1):
-                if not re.match(rf"^{i}\.\s+.+", option):
-                    logger.warning(f"옵션 포맷 경고: '{option}'이 '{i}. ...' 형식이 아닙니다.")
-            
-            result = {
-                "success": True,
-                "quiz": quiz_data,
-                "tokens_used": tokens_used,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            logger.info(f"Quiz generated - Topic: {topic}, Tokens: {tokens_used}")
-            return result
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON 파싱 실패: {e}, tokens: {tokens_used}")
-            return {
-                "success": False,
-                "error": "퀴즈를 만드는 중 문제가 발생했어요. 다시 시도해주세요.",
-                "tokens_used": tokens_used,
-                "timestamp": datetime.now().isoformat()
-            }
+        Raises:
+            json.JSONDecodeError: JSON 파싱 실패
+            KeyError, ValueError: 필드 검증 실패
+        """
+        quiz_data, repairs = parse_quiz(quiz_text)
+        for repair in set(repairs):
+            self.metrics.inc("sonju_quiz_repairs_total", repair=repair)
+        if repairs:
+            logger.info(f"퀴즈 응답 보정: {', '.join(sorted(set(repairs)))}")
+        return quiz_data
+
+    def _validate_quiz(self, quiz_data: Dict) -> Dict:
+        """
+        퀴즈 필드 검증 + 보정 (퀴즈 풀에 넣을 때도 사용)
+        
+        Raises:
+            KeyError, ValueError: 필드 검증 실패
+        """
+        return validate_quiz(quiz_data)
+
+    def _quiz_result(self, response, topic: str, tokens_used: int) -> Dict:
+        """퀴즈 응답 → 결과 dict (검증 실패 시 예외, tokens_used는 재시도 포함 합계)"""
+        quiz_data = self._parse_quiz(response.choices[0].message.content)
         
-        except (KeyError, ValueError) as e:
+        result = {
+            "success": True,
+            "quiz": quiz_data,
+            "tokens_used": tokens_used,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        logger.info(f"Quiz generated - Topic: {topic}, Tokens: {tokens_used}")
+        return result
+
+    def _quiz_parse_failed(self, e: Exception, tokens_used: Optional[int]) -> bool:
+        """파싱·검증 실패면 기록 후 True (재시도 대상), 그 밖의 오류면 False"""
+        if isinstance(e, json.JSONDecodeError):
+            logger.error(f"JSON 파싱 실패: {e}, tokens: {tokens_used}")
+            self.metrics.inc("sonju_parse_failures_total", method="generate_quiz", reason="json")
+        elif isinstance(e, (KeyError, ValueError)):
             logger.error(f"퀴즈 검증 실패: {e}, tokens: {tokens_used}")
-            return {
-                "success": False,
-                "error": "퀴즈를 만드는 중 문제가 발생했어요. 다시 시도해주세요.",
-                "tokens_used": tokens_used,
-                "timestamp": datetime.now().isoformat()
-            }
+            self.metrics.inc("sonju_parse_failures_total", method="generate_quiz", reason="validation")
+        else:
+            return False
+        return True
+
+    def _quiz_error(self, e: Exception, tokens_used: Optional[int]) -> Dict:
+        if not self._quiz_parse_failed(e, tokens_used):
+            logger.error(f"예상치 못한 오류: {e}, tokens: {tokens_used}")
+        
+        return {
+            "success": False,
+            "error": "퀴즈를 만드는 중 문제가 발생했어요. 다시 시도해주세요.",
+            "tokens_used": tokens_used,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _analysis_request(self, learning_data: Dict) -> Dict:
+        """분석 요청 파라미터 구성"""
+        lesson = learning_data.get("lesson", "학습")
+        avg_time = learning_data.get("avg_time", 0)
+        accuracy = learning_data.get("accuracy", 0)
+        errors = learning_data.get("errors", [])
+        
+        prompt = f"""
+        어르신의 {lesson} 학습 결과를 분석해주세요.
+        
+        **데이터:**
+        - 평균 소요 시간: {avg_time}초
+        - 정확도: {accuracy * 100}%
+        - 자주 틀린 부분: {', '.join(errors) if errors else '없음'}
+        
+        **요구사항:**
+        - 친근하고 격려하는 톤으로
+        - 3-4문장으로 간단히 요약
+        - 잘한 부분은 칭찬, 어려워한 부분은 부드럽게 피드백
+        - "할머니" 또는 "할아버지"라고 부르기
+        """
+        
+        route = self.router.select("generate_analysis")
+        return {
+            "model": route["model"],
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": route["max_tokens"],
+            "temperature": route["temperature"]
+        }
+
+    def _analysis_result(self, response) -> Dict:
+        result = {
+            "success": True,
+            "summary_text": response.choices[0].message.content,
+            "tokens_used": response.usage.total_tokens,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        logger.info(f"Analysis generated - Tokens: {result['tokens_used']}")
+        return result
+
+    def _template_analysis(self, learning_data: Dict, use_llm: bool) -> Optional[Dict]:
+        """템플릿으로 작성할 수 있으면 결과 반환, 모델이 필요하면 None"""
+        if self.analysis_templates is None:
+            return None
+        if use_llm:
+            self.analysis_templates.escalated("requested")
+            return None
+        
+        with self._phase("generate_analysis", "template"):
+            text, pattern = self.analysis_templates.render(learning_data)
+        self.metrics.inc("sonju_analysis_path_total", path="template" if text else "llm", reason=pattern)
+        if text is None:
+            return None
+        return {
+            "success": True,
+            "summary_text": text,
+            "tokens_used": 0,
+            "template": pattern,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _analysis_error(self, e: Exception) -> Dict:
+        logger.error(f"Analysis error: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _summary_request(self, previous_summary: str, messages: List[Dict]) -> Dict:
+        """대화 요약 요청 파라미터 구성"""
+        dialog = "\n".join(
+            f"{'어르신' if m['role'] == 'user' else '손주'}: {m['content']}"
+            for m in messages
+            if m["role"] in ("user", "assistant")
+        )
+        prompt = f"""
+        다음은 어르신과 손주톡톡의 이전 대화 요약과 새 대화입니다.
+        이어지는 대화에 필요한 내용(배우던 앱과 기능, 어려워한 부분, 진행 단계)만 남겨
+        3문장 이내의 평문으로 다시 요약해주세요.
+        
+        이전 요약: {previous_summary or '없음'}
+        
+        새 대화:
+        {dialog}
+        """
+        
+        route = self.router.select("summarize_history")
+        return {
+            "model": route["model"],
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": route["max_tokens"],
+            "temperature": route["temperature"]
+        }
+
+    def _guide_message(self, topic: str) -> str:
+        """주제별 가이드 요청 문장 (app_토스 → 토스 앱 기본 사용법)"""
+        if topic.startswith("app_"):
+            app_name = topic[len("app_"):]
+            return f"{app_name} 앱의 기본 사용법을 어르신이 이해하기 쉽게 단계별로 설명해주세요."
+        
+        return GUIDE_PROMPTS.get(
+            topic, 
+            f"{topic}에 대해 어르신이 이해하기 쉽게 단계별로 설명해주세요."
+        )
+
+    def _packed_guide(self, topic: str) -> Optional[Dict]:
+        """가이드 팩에 있는 주제면 chat()과 같은 형태의 결과 (네트워크 없음)"""
+        if self.guide_pack is None:
+            return None
+        
+        text = self.guide_pack.get(topic)
+        if text is None:
+            return None
+        
+        self._record_cache_hit("get_topic_guide", "pack")
+        return {
+            "success": True,
+            "message": text,
+            "tokens_used": 0,
+            "cached": True,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _guide_cache_key(self, topic: str) -> Optional[str]:
+        if self.guide_cache is None:
+            return None
+        # 대체 모델로 전환 중이어도 키는 기본 경로 기준으로 고정
+        route = self.router.route("get_topic_guide")
+        return GuideCache.make_key(topic, route["model"], self.system_prompt, route["temperature"])
+
+    def _cached_guide(self, cache_key: Optional[str]) -> Optional[Dict]:
+        """캐시 히트 시 chat()과 같은 형태의 결과 반환"""
+        if cache_key is None:
+            return None
+        
+        return self._guide_hit(self.guide_cache.get(cache_key))
+
+    async def _acached_guide(self, cache_key: Optional[str]) -> Optional[Dict]:
+        """_cached_guide()의 비동기 버전 (디스크 캐시 읽기는 스레드에서)"""
+        if cache_key is None:
+            return None
+        return self._guide_hit(await self.guide_cache.aget(cache_key))
+
+    def _guide_hit(self, text: Optional[str]) -> Optional[Dict]:
+        if text is None:
+            return None
+        
+        self._record_cache_hit("get_topic_guide", "guide")
+        return {
+            "success": True,
+            "message": text,
+            "tokens_used": 0,
+            "cached": True,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _store_guide(self, cache_key: Optional[str], topic: str, result: Dict):
+        if cache_key is not None and result["success"]:
+            self.guide_cache.put(cache_key, result["message"], topic=topic)
+
+    async def _astore_guide(self, cache_key: Optional[str], topic: str, result: Dict):
+        if cache_key is not None and result["success"]:
+            await self.guide_cache.aput(cache_key, result["message"], topic=topic)
+
+    def _shared_guide_key(self, cache_key: Optional[str]) -> Optional[str]:
+        """
+        공유 캐시 키 (공유 캐시를 안 쓰면 None)
+        
+        변형마다 칸을 나눠서 워커들이 같은 변형 목록을 나눠 채웁니다.
+        """
+        if self.cache_backend is None or cache_key is None:
+            return None
+        slot = self.guide_cache.filled(cache_key) % self.guide_cache.variants
+        return f"guide:{cache_key}:{slot}"
+
+    async def _ashared_guide_key(self, cache_key: Optional[str]) -> Optional[str]:
+        """_shared_guide_key()의 비동기 버전"""
+        if self.cache_backend is None or cache_key is None:
+            return None
+        slot = await self.guide_cache.afilled(cache_key) % self.guide_cache.variants
+        return f"guide:{cache_key}:{slot}"
+
+    def _shared_hit(self, value: Dict) -> Dict:
+        self._record_cache_hit("get_topic_guide", "shared")
+        return {
+            "success": True,
+            "message": value["message"],
+            "tokens_used": 0,
+            "cached": True,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _shared_lookup(self, shared_key: Optional[str]) -> Optional[Dict]:
+        if shared_key is None:
+            return None
+        value = self.cache_backend.get(shared_key)
+        return self._shared_hit(value) if value else None
+
+    def _shared_store(self, shared_key: Optional[str], result: Dict):
+        if shared_key is not None and result["success"]:
+            self.cache_backend.set(shared_key, {"message": result["message"]}, config.GUIDE_CACHE_TTL)
+
+    async def _ashared_lookup(self, shared_key: Optional[str]) -> Optional[Dict]:
+        """_shared_lookup()의 비동기 버전 (저장소 호출은 스레드에서)"""
+        if shared_key is None:
+            return None
+        value = await self.cache_backend.aget(shared_key)
+        return self._shared_hit(value) if value else None
+
+    async def _ashared_store(self, shared_key: Optional[str], result: Dict):
+        if shared_key is not None and result["success"]:
+            await self.cache_backend.aset(shared_key, {"message": result["message"]}, config.GUIDE_CACHE_TTL)
+
+    @staticmethod
+    def _shared_value(result: Dict) -> Dict:
+        """공유 캐시에 넣을 값 (실패 응답은 저장하지 않도록 예외로)"""
+        if not result["success"]:
+            raise _Uncached(result)
+        return {"message": result["message"]}
+
+    def _shared_guide(self, shared_key: str, generate: Callable[[], Dict]) -> Dict:
+        """공유 캐시에서 가이드를 꺼내거나, 없으면 워커 하나만 generate() 실행"""
+        generated = {}
+        
+        def compute():
+            generated["result"] = generate()
+            return self._shared_value(generated["result"])
+        
+        try:
+            value = self.cache_backend.get_or_compute(shared_key, compute, config.GUIDE_CACHE_TTL)
+        except _Uncached as e:
+            return e.result
+        return generated.get("result") or self._shared_hit(value)
+
+    async def _ashared_guide(self, shared_key: str, generate: Callable[[], Awaitable[Dict]]) -> Dict:
+        """_shared_guide()의 비동기 버전"""
+        generated = {}
+        
+        async def compute():
+            generated["result"] = await generate()
+            return self._shared_value(generated["result"])
         
+        try:
+            value = await self.cache_backend.aget_or_compute(shared_key, compute, config.GUIDE_CACHE_TTL)
+        except _Uncached as e:
+            return e.result
+        return generated.get("result") or self._shared_hit(value)
+
+    def _semantic_cacheable(self, message: str, conversation_history, enabled: bool) -> bool:
+        """
+        유사 질문 캐시 대상: 히스토리 없는 첫 질문 중 방법을 묻는 질문만
+
+        안부·잡담("오늘 기분이 좋아서 전화했어")은 비슷해 보여도 답이 같으면 안 되므로 캐시하지 않음
+        """
+        return (
+            enabled and not conversation_history and self.semantic_cache is not None
+            and get_detector().is_how_to(message)
+        )
+
+    def _semantic_lookup(self, message: str, conversation_history, enabled: bool) -> Optional[Dict]:
+        """방법을 묻는 첫 질문이면 유사 질문 캐시 조회"""
+        if not self._semantic_cacheable(message, conversation_history, enabled):
+            return None
+        
+        answer = self.semantic_cache.get(message)
+        if answer is None:
+            return None
+        
+        logger.info("Chat served from semantic cache")
+        self._record_cache_hit("chat", "semantic")
+        return {
+            "success": True,
+            "message": answer,
+            "tokens_used": 0,
+            "cached": True,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _semantic_store(self, message: str, conversation_history, enabled: bool, result: Dict):
+        if result["success"] and self._semantic_cacheable(message, conversation_history, enabled):
+            self.semantic_cache.put(message, result["message"])
+
+    def _pooled_quiz(self, topic: str, difficulty: str, user_id: Optional[str]) -> Optional[Dict]:
+        """퀴즈 풀에서 꺼낸 결과 (풀이 비었으면 None)"""
+        if self.quiz_pool is None:
+            return None
+        
+        quiz = self.quiz_pool.pop(topic, difficulty, user_id)
+        if quiz is None:
+            return None
+        
+        logger.info(f"Quiz served from pool - Topic: {topic}")
+        self._record_cache_hit("generate_quiz", "quiz_pool")
+        return {
+            "success": True,
+            "quiz": quiz,
+            "tokens_used": 0,
+            "pooled": True,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _mark_quiz_seen(self, user_id: Optional[str], result: Dict):
+        if self.quiz_pool is not None and result["success"]:
+            self.quiz_pool.mark_seen(user_id, result["quiz"])
+
+    # ========== 계측 ==========
+
+    def _phase(self, method: str, phase: str):
+        """단계별 소요 시간 타이머 (build / upstream / parse)"""
+        return self.metrics.timer("sonju_phase_seconds", method=method, phase=phase)
+
+    def _record_call(self, method: str, started: float, result: Dict):
+        self.metrics.observe("sonju_method_seconds", time.perf_counter() - started, method=method)
+        outcome = "success" if result.get("success") else "error"
+        self.metrics.inc("sonju_requests_total", method=method, outcome=outcome)
+
+    def _record_usage(self, method: str, usage):
+        if usage is None:
+            return
+        self.metrics.inc("sonju_prompt_tokens_total", usage.prompt_tokens, method=method)
+        self.metrics.inc("sonju_completion_tokens_total", usage.completion_tokens, method=method)
+
+    def _record_stream(self, method: str, acc: _StreamAccumulator, event: Dict):
+        """스트림 종료 시 전체 시간·첫 토큰 시간·토큰 사용량 기록"""
+        self._record_call(method, acc.started, event)
+        if acc.ttft_ms is not None:
+            self.metrics.observe("sonju_ttft_seconds", acc.ttft_ms / 1000, method=method)
+        self._record_usage(method, acc.usage)
+
+    def _record_cache_hit(self, method: str, cache: str):
+        self.metrics.inc("sonju_cache_hits_total", method=method, cache=cache)
+
+    # ========== 업스트림 호출 ==========
+
+    @staticmethod
+    def _estimate_tokens(request: Dict) -> int:
+        """요청 예약용 토큰 추정 (프롬프트 + 최대 응답 길이)"""
+        return message_tokens(request["messages"]) + request.get("max_tokens", config.MAX_TOKENS)
+
+    @staticmethod
+    def _usage_tokens(response) -> Optional[int]:
+        usage = getattr(response, "usage", None)
+        return usage.total_tokens if usage else None
+
+    def _observed(self, request: Dict, fn, last: Dict):
+        """
+        업스트림 호출 시간을 재고 성공하면 라우터에 기록 (요청량 대기 시간 제외, 스트림은 열릴 때까지)
+
+        실패는 재시도가 끝난 뒤 최종 결과로만 기록하므로 여기서는 last에 시간만 남깁니다 (_record_failure).
+        """
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            last["seconds"] = time.perf_counter() - started
+            raise
+        self.router.record(request["model"], time.perf_counter() - started, True)
+        return result
+
+    async def _aobserved(self, request: Dict, fn, last: Dict):
+        """_observed()의 비동기 버전"""
+        started = time.perf_counter()
+        try:
+            result = await fn()
+        except Exception:
+            last["seconds"] = time.perf_counter() - started
+            raise
+        self.router.record(request["model"], time.perf_counter() - started, True)
+        return result
+
+    def _record_failure(self, request: Dict, last: Optional[Dict], error: Exception):
+        """
+        재시도까지 실패한 호출을 라우터에 기록
+
+        시간 초과·연결 오류·5xx만 모델 오류로 봅니다. 429(요청량 초과)나 잘못된 요청은
+        모델이 나빠진 것이 아니므로 대체 모델(더 비쌈)로 넘기지 않습니다.
+        """
+        if last and "seconds" in last and is_degradation(error):
+            self.router.record(request["model"], last["seconds"], False)
+
+    def _hedge_hooks(self, method: str, request: Dict):
+        """
+        헤지 요청의 요청량 예약 (reserve, cost, release)
+
+        헤지는 따로 예약을 받아야 나가며(한도가 찼으면 헤지 안 함),
+        진 쪽 예약은 실제로 쓴 토큰(취소·실패면 프롬프트 추정치, 보내기 전에 취소됐으면 0)으로 보정하고
+        둘 다 실패하면 돌려줍니다.
+        """
+        extra: List[Ticket] = []
+
+        def reserve() -> bool:
+            ticket, _ = self.rate_limiter.try_reserve(self._estimate_tokens(request))
+            if ticket is not None:
+                extra.append(ticket)
+            return ticket is not None
+
+        def cost(loser, sent: bool) -> int:
+            if loser is not None:
+                tokens = self._usage_tokens(loser) or 0
+            else:
+                tokens = message_tokens(request["messages"]) if sent else 0
+            self.rate_limiter.record(extra[0], tokens)
+            self.metrics.inc("sonju_hedge_extra_tokens_total", tokens, method=method)
+            return tokens
+
+        def release():
+            if extra:
+                self.rate_limiter.release(extra[0])
+
+        return reserve, cost, release
+
+    def _priority(self, method: str) -> str:
+        """호출 등급 (priority() 블록 안이면 그 등급, 아니면 메서드별 기본값)"""
+        return current_priority(config.METHOD_PRIORITIES.get(method, "interactive"))
+
+    def _limited(self, request: Dict, fn, priority_class: str, tokens_of=None, last: Optional[Dict] = None):
+        """
+        우선순위 대기열에서 입장한 뒤 요청량 한도·재시도를 적용해 fn() 호출 (호출 중에는 스케줄러를 점유하지 않음)
+
+        재시도도 같은 등급으로 다시 입장합니다 (background 재시도가 interactive 몫을 쓰지 않게).
+        """
+        estimated = self._estimate_tokens(request)
+        admit = None
+        if self.scheduler is not None:
+            admit = functools.partial(self._admit, priority_class, estimated)
+        try:
+            return self.rate_limiter.call(fn, estimated, tokens_of, admit=admit)
         except Exception as e:
-            logger.error(f"예상치 못한 오류: {e}, tokens: {tokens_used}")
-            return {
-                "success": False,
-                "error": "퀴즈를 만드는 중 문제가 발생했어요. 다시 시도해주세요.",
-                "tokens_used": tokens_used,
-                "timestamp": datetime.now().isoformat()
-            }
+            self._record_failure(request, last, e)
+            raise
+
+    async def _alimited(self, request: Dict, fn, priority_class: str, tokens_of=None, last: Optional[Dict] = None):
+        """_limited()의 비동기 버전"""
+        estimated = self._estimate_tokens(request)
+        admit = None
+        if self.scheduler is not None:
+            admit = functools.partial(self._aadmit, priority_class, estimated)
+        try:
+            return await self.rate_limiter.acall(fn, estimated, tokens_of, admit=admit)
+        except Exception as e:
+            self._record_failure(request, last, e)
+            raise
+
+    def _admit(self, priority_class: str, estimated: int) -> Optional[Ticket]:
+        """스케줄러 입장 (시도마다, 거절되면 지표 기록 후 전파)"""
+        try:
+            return self.scheduler.admit(priority_class, estimated)
+        except SchedulerRejected as e:
+            self.metrics.inc("sonju_scheduler_rejected_total", priority=e.priority, reason=e.reason)
+            raise
+
+    async def _aadmit(self, priority_class: str, estimated: int) -> Optional[Ticket]:
+        """_admit()의 비동기 버전"""
+        try:
+            return await self.scheduler.aadmit(priority_class, estimated)
+        except SchedulerRejected as e:
+            self.metrics.inc("sonju_scheduler_rejected_total", priority=e.priority, reason=e.reason)
+            raise
+
+    def _create(self, request: Dict, method: str = ""):
+        """
+        동기 completion 호출 (모든 동기 메서드의 단일 진입점)
+        
+        우선순위 대기열·요청량 제한·재시도를 적용하고, method가 합치기 대상이면
+        진행 중인 동일 요청의 결과를 함께 기다립니다.
+        헤지 대상이면 늦어질 때 같은 요청을 한 번 더 보내 먼저 온 응답을 씁니다.
+        """
+        last = {}
+
+        def upstream():
+            return self._observed(request, lambda: self.client.chat.completions.create(**request), last)
+
+        def hedged():
+            # 입장·요청량 대기를 마친 뒤 업스트림 호출만 헤지 (지연 표본·헤지 타이머에 대기 시간이 섞이지 않게)
+            reserve, cost, release = self._hedge_hooks(method, request)
+            try:
+                return self.hedger.call(upstream, method, cost, reserve)
+            except Exception:
+                release()
+                raise
+        
+        # 합치기 키에 들어가므로 호출한 쪽의 등급을 미리 정함 (다른 등급의 호출에 붙지 않게)
+        priority_class = self._priority(method)
+
+        def call():
+            with self._phase(method, "upstream"):
+                response = self._limited(
+                    request,
+                    hedged if method in self.hedge_methods else upstream,
+                    priority_class,
+                    self._usage_tokens,
+                    last
+                )
+            self._record_usage(method, getattr(response, "usage", None))
+            return response
+        
+        if method in self.coalesce_methods:
+            return self.singleflight.do(request_key(request, priority_class), call, label=method)
+        return call()
+
+    async def _acreate(self, request: Dict, method: str = ""):
+        """비동기 completion 호출 (모든 비동기 메서드의 단일 진입점)"""
+        last = {}
+
+        def upstream():
+            return self._aobserved(request, lambda: self.async_client.chat.completions.create(**request), last)
+
+        async def hedged():
+            reserve, cost, release = self._hedge_hooks(method, request)
+            try:
+                return await self.hedger.acall(upstream, method, cost, reserve)
+            except Exception:
+                release()
+                raise
+        
+        priority_class = self._priority(method)
+
+        async def call():
+            with self._phase(method, "upstream"):
+                response = await self._alimited(
+                    request,
+                    hedged if method in self.hedge_methods else upstream,
+                    priority_class,
+                    self._usage_tokens,
+                    last
+                )
+            self._record_usage(method, getattr(response, "usage", None))
+            return response
+        
+        if method in self.coalesce_methods:
+            return await self.singleflight.ado(request_key(request, priority_class), call, label=method)
+        return await call()
+
+    def _create_stream(self, request: Dict, method: str = "chat"):
+        """
+        동기 스트리밍 completion 호출 (마지막 청크에 토큰 사용량 포함)
+        
+        스트림은 시작 시점에만 재시도하며, 예약 토큰은 추정치로 계산합니다.
+        """
+        last = {}
+        return self._limited(
+            request,
+            lambda: self._observed(request, lambda: self.client.chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}
+            ), last),
+            self._priority(method),
+            last=last
+        )
+
+    async def _acreate_stream(self, request: Dict, method: str = "chat"):
+        """비동기 스트리밍 completion 호출"""
+        last = {}
+        return await self._alimited(
+            request,
+            lambda: self._aobserved(request, lambda: self.async_client.chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}
+            ), last),
+            self._priority(method),
+            last=last
+        )
+
+    # ========== 동기 API ==========
+
+    @_instrumented("chat")
+    def chat(
+        self, 
+        message: str, 
+        conversation_history: List[Dict] = None,
+        semantic_cache: bool = True
+    ) -> Dict:
+        """
+        일반 채팅 기능
+        
+        Args:
+            message: 사용자 메시지
+            conversation_history: 이전 대화 [{"role": "user/assistant", "content": "내용"}]
+            semantic_cache: 히스토리 없는 첫 질문이면 유사 질문 캐시 사용
+            
+        Returns:
+            {"success": bool, "message": str, "tokens_used": int, "timestamp": str}
+        """
+        return self._chat(message, conversation_history, semantic_cache, method="chat")
+
+    def _chat(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict]],
+        semantic_cache: bool,
+        method: str
+    ) -> Dict:
+        cached = self._semantic_lookup(message, conversation_history, semantic_cache)
+        if cached:
+            return cached
+        
+        try:
+            with self._phase(method, "build"):
+                request = self._chat_request(message, conversation_history, method)
+            response = self._create(request, method)
+            with self._phase(method, "parse"):
+                result = self._chat_result(response)
+        except Exception as e:
+            return self._chat_error(e)
+        
+        self._semantic_store(message, conversation_history, semantic_cache, result)
+        return result
+
+    @_instrumented("generate_quiz")
+    def generate_quiz(
+        self,
+        topic: str,
+        difficulty: str = "쉬움",
+        user_id: Optional[str] = None
+    ) -> Dict:
+        """
+        퀴즈 생성
+        
+        퀴즈 풀에 사용자가 아직 안 본 퀴즈가 있으면 바로 꺼내고,
+        없을 때만 실시간으로 생성합니다.
+        """
+        pooled = self._pooled_quiz(topic, difficulty, user_id)
+        if pooled:
+            return pooled
+        
+        result = self._generate_quiz_live(topic, difficulty)
+        self._mark_quiz_seen(user_id, result)
+        return result
+
+    def return_quiz(self, topic: str, result: Dict, difficulty: str = "쉬움", user_id: Optional[str] = None) -> bool:
+        """
+        받았지만 보여 주지 않은 퀴즈를 되돌림 (미리 준비했다가 빗나간 퀴즈)
+
+        사용자의 푼 문제 기록에서 빼고 퀴즈 풀 맨 앞에 넣어, 다음 generate_quiz가 호출 없이 씁니다.
+        (풀이 없거나 등록하지 않은 주제면 False)
+        """
+        if self.quiz_pool is None or not result.get("success"):
+            return False
+        self.quiz_pool.unsee(user_id, result["quiz"])
+        return self.quiz_pool.put(topic, difficulty, result["quiz"], front=True)
+
+    def _refill_quiz(self, topic: str, difficulty: str) -> Dict:
+        """퀴즈 풀 워커용 생성 (라이브 요청에 밀리는 background 등급)"""
+        with priority("background"):
+            return self._generate_quiz_live(topic, difficulty)
+
+    def _generate_quiz_live(self, topic: str, difficulty: str = "쉬움") -> Dict:
+        """퀴즈 실시간 생성 (풀 워커도 사용)"""
+        tokens_used = None
+        
+        with self._phase("generate_quiz", "build"):
+            request = self._quiz_request(topic, difficulty)
+        
+        # 보정으로도 못 고친 응답은 QUIZ_PARSE_RETRIES번까지 다시 요청
+        for attempt in range(config.QUIZ_PARSE_RETRIES + 1):
+            try:
+                response = self._create(request, "generate_quiz")
+                tokens_used = (tokens_used or 0) + response.usage.total_tokens
+                with self._phase("generate_quiz", "parse"):
+                    return self._quiz_result(response, topic, tokens_used)
+            except Exception as e:
+                if attempt == config.QUIZ_PARSE_RETRIES or not self._quiz_parse_failed(e, tokens_used):
+                    return self._quiz_error(e, tokens_used)
+                self.metrics.inc("sonju_quiz_retries_total")
 
     def check_quiz_answer(self, quiz_data: Dict, user_answer: int) -> Dict:
         """
@@ -233,82 +1164,295 @@ class SonjuAI:
                 "error": str(e)
             }
 
-    def generate_analysis(self, learning_data: Dict) -> Dict:
+    @_instrumented("generate_analysis")
+    def generate_analysis(self, learning_data: Dict, use_llm: bool = False) -> Dict:
         """
         학습 분석 텍스트 생성
         
+        흔한 유형(빠르고 정확함, 느리지만 정확함, 한 단계에서만 막힘 등)은 템플릿으로 바로 작성하고
+        특이한 데이터이거나 use_llm=True일 때만 모델을 호출합니다.
+        
         Args:
             learning_data: {
                 "lesson": str,
                 "avg_time": float,
                 "accuracy": float,
-                "errors": List[str]
+                "errors": List[str],
+                "title": str (선택, 호칭)
             }
+            use_llm: 템플릿을 쓰지 않고 항상 모델로 작성
             
         Returns:
-            {"success": bool, "summary_text": str, "tokens_used": int}
+            {"success": bool, "summary_text": str, "tokens_used": int, "template": str (템플릿일 때)}
         """
-        lesson = learning_data.get("lesson", "학습")
-        avg_time = learning_data.get("avg_time", 0)
-        accuracy = learning_data.get("accuracy", 0)
-        errors = learning_data.get("errors", [])
+        fast = self._template_analysis(learning_data, use_llm)
+        if fast:
+            return fast
         
-        prompt = f"""
-        어르신의 {lesson} 학습 결과를 분석해주세요.
+        try:
+            with self._phase("generate_analysis", "build"):
+                request = self._analysis_request(learning_data)
+            response = self._create(request, "generate_analysis")
+            with self._phase("generate_analysis", "parse"):
+                return self._analysis_result(response)
+        except Exception as e:
+            return self._analysis_error(e)
+
+    def summarize_history(self, previous_summary: str, messages: List[Dict]) -> str:
+        """
+        오래된 대화를 요약문으로 접기 (history.ConversationMemory의 summarize 콜백)
         
-        **데이터:**
-        - 평균 소요 시간: {avg_time}초
-        - 정확도: {accuracy * 100}%
-        - 자주 틀린 부분: {', '.join(errors) if errors else '없음'}
+        Returns:
+            새 요약문 (실패 시 빈 문자열)
+        """
+        try:
+            response = self._create(self._summary_request(previous_summary, messages), "summarize_history")
+            logger.info(f"History summarized - Tokens: {response.usage.total_tokens}")
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Summary error: {e}")
+            return ""
+
+    @_instrumented("get_topic_guide")
+    def get_topic_guide(self, topic: str) -> Dict:
+        """주제별 가이드 (가이드 팩·캐시 히트 시 API 호출 없음, 모르는 주제만 라이브 생성)"""
+        # 가이드 문장은 주제만 다른 같은 틀이라 유사 질문 캐시 대신 가이드 캐시를 사용
+        cache_key = self._guide_cache_key(topic)
+        cached = self._packed_guide(topic) or self._cached_guide(cache_key)
+        if cached:
+            return cached
         
-        **요구사항:**
-        - 친근하고 격려하는 톤으로
-        - 3-4문장으로 간단히 요약
-        - 잘한 부분은 칭찬, 어려워한 부분은 부드럽게 피드백
-        - "할머니" 또는 "할아버지"라고 부르기
+        shared_key = self._shared_guide_key(cache_key)
+        generate = functools.partial(self.generate_topic_guide, topic)
+        result = self._shared_guide(shared_key, generate) if shared_key else generate()
+        self._store_guide(cache_key, topic, result)
+        return result
+
+    def generate_topic_guide(self, topic: str) -> Dict:
+        """가이드 팩·캐시를 거치지 않고 모델로 새로 생성 (가이드 팩 빌드용, 결과도 캐시에 넣지 않음)"""
+        return self._chat(self._guide_message(topic), None, semantic_cache=False, method="get_topic_guide")
+
+    def chat_stream(
+        self,
+        message: str,
+        conversation_history: List[Dict] = None,
+        semantic_cache: bool = True
+    ) -> Iterator[Dict]:
+        """
+        스트리밍 채팅: 텍스트 조각이 도착하는 대로 이벤트를 내보냄
+        
+        Yields:
+            {"type": "delta", "text": str} ... 마지막에 "done" 또는 "error" 이벤트
+            (done 이벤트에 전체 message, tokens_used, ttft_ms 포함)
         """
+        return self._chat_stream(message, conversation_history, semantic_cache, method="chat")
+
+    def _chat_stream(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict]],
+        semantic_cache: bool,
+        method: str
+    ) -> Iterator[Dict]:
+        cached = self._semantic_lookup(message, conversation_history, semantic_cache)
+        if cached:
+            yield from _StreamAccumulator.cached(cached)
+            return
         
+        acc = _StreamAccumulator()
         try:
-            response = self.client.chat.completions.create(
-                model=config.DEFAULT_MODEL,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
-            
-            result = {
-                "success": True,
-                "summary_text": response.choices[0].message.content,
-                "tokens_used": response.usage.total_tokens,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            logger.info(f"Analysis generated - Tokens: {result['tokens_used']}")
-            return result
-            
+            for chunk in self._create_stream(self._chat_request(message, conversation_history, method), method):
+                event = acc.feed(chunk)
+                if event:
+                    yield event
         except Exception as e:
-            logger.error(f"Analysis error: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
+            error = acc.error(e)
+            self._record_stream(method, acc, error)
+            yield error
+            return
+        
+        done = acc.done()
+        self._record_stream(method, acc, done)
+        self._semantic_store(message, conversation_history, semantic_cache, done)
+        yield done
 
-    def get_topic_guide(self, topic: str) -> Dict:
-        """주제별 가이드"""
-        topic_prompts = {
-            "토스_송금": "토스 앱에서 송금하는 방법을 단계별로 쉽게 설명해주세요.",
-            "토스_계좌조회": "토스 앱에서 계좌 잔액을 확인하는 방법을 알려주세요.",
-            "전화걸기": "전화걸기에 대해 단계별로 친절하게 설명해주세요.",
-            "문자보내기": "문자메시지 보내는 방법을 어르신이 이해하기 쉽게 설명해주세요.",
-        }
+    def get_topic_guide_stream(self, topic: str) -> Iterator[Dict]:
+        """주제별 가이드 스트리밍 (캐시 히트 시 전체 텍스트를 한 번에)"""
+        cache_key = self._guide_cache_key(topic)
+        cached = self._packed_guide(topic) or self._cached_guide(cache_key)
+        shared_key = None if cached else self._shared_guide_key(cache_key)
+        shared = self._shared_lookup(shared_key)
+        if shared:
+            self._store_guide(cache_key, topic, shared)
+        if cached or shared:
+            yield from _StreamAccumulator.cached(cached or shared)
+            return
         
-        guide_message = topic_prompts.get(
-            topic, 
-            f"{topic}에 대해 어르신이 이해하기 쉽게 단계별로 설명해주세요."
-        )
+        # 스트림은 바로 보여줘야 하므로 다른 워커의 생성을 기다리지 않고, 끝난 뒤 공유 캐시에 저장
+        for event in self._chat_stream(self._guide_message(topic), None, False, method="get_topic_guide"):
+            if event["type"] == "done":
+                self._store_guide(cache_key, topic, event)
+                self._shared_store(shared_key, event)
+            yield event
+
+    # ========== 비동기 API (서버용, AsyncOpenAI) ==========
+
+    @_instrumented("chat")
+    async def achat(
+        self,
+        message: str,
+        conversation_history: List[Dict] = None,
+        semantic_cache: bool = True
+    ) -> Dict:
+        """chat()의 비동기 버전"""
+        return await self._achat(message, conversation_history, semantic_cache, method="chat")
+
+    async def _achat(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict]],
+        semantic_cache: bool,
+        method: str
+    ) -> Dict:
+        cached = self._semantic_lookup(message, conversation_history, semantic_cache)
+        if cached:
+            return cached
+        
+        try:
+            with self._phase(method, "build"):
+                request = self._chat_request(message, conversation_history, method)
+            response = await self._acreate(request, method)
+            with self._phase(method, "parse"):
+                result = self._chat_result(response)
+        except Exception as e:
+            return self._chat_error(e)
+        
+        self._semantic_store(message, conversation_history, semantic_cache, result)
+        return result
+
+    @_instrumented("generate_quiz")
+    async def agenerate_quiz(
+        self,
+        topic: str,
+        difficulty: str = "쉬움",
+        user_id: Optional[str] = None
+    ) -> Dict:
+        """generate_quiz()의 비동기 버전"""
+        pooled = self._pooled_quiz(topic, difficulty, user_id)
+        if pooled:
+            return pooled
+        
+        result = await self._agenerate_quiz_live(topic, difficulty)
+        self._mark_quiz_seen(user_id, result)
+        return result
+
+    async def _agenerate_quiz_live(self, topic: str, difficulty: str = "쉬움") -> Dict:
+        tokens_used = None
+        
+        with self._phase("generate_quiz", "build"):
+            request = self._quiz_request(topic, difficulty)
+        
+        for attempt in range(config.QUIZ_PARSE_RETRIES + 1):
+            try:
+                response = await self._acreate(request, "generate_quiz")
+                tokens_used = (tokens_used or 0) + response.usage.total_tokens
+                with self._phase("generate_quiz", "parse"):
+                    return self._quiz_result(response, topic, tokens_used)
+            except Exception as e:
+                if attempt == config.QUIZ_PARSE_RETRIES or not self._quiz_parse_failed(e, tokens_used):
+                    return self._quiz_error(e, tokens_used)
+                self.metrics.inc("sonju_quiz_retries_total")
+
+    @_instrumented("generate_analysis")
+    async def agenerate_analysis(self, learning_data: Dict, use_llm: bool = False) -> Dict:
+        """generate_analysis()의 비동기 버전"""
+        fast = self._template_analysis(learning_data, use_llm)
+        if fast:
+            return fast
+        
+        try:
+            with self._phase("generate_analysis", "build"):
+                request = self._analysis_request(learning_data)
+            response = await self._acreate(request, "generate_analysis")
+            with self._phase("generate_analysis", "parse"):
+                return self._analysis_result(response)
+        except Exception as e:
+            return self._analysis_error(e)
+
+    @_instrumented("get_topic_guide")
+    async def aget_topic_guide(self, topic: str) -> Dict:
+        """get_topic_guide()의 비동기 버전"""
+        cache_key = self._guide_cache_key(topic)
+        cached = self._packed_guide(topic) or await self._acached_guide(cache_key)
+        if cached:
+            return cached
+        
+        shared_key = await self._ashared_guide_key(cache_key)
+        generate = functools.partial(self.agenerate_topic_guide, topic)
+        result = await self._ashared_guide(shared_key, generate) if shared_key else await generate()
+        await self._astore_guide(cache_key, topic, result)
+        return result
+
+    async def agenerate_topic_guide(self, topic: str) -> Dict:
+        """generate_topic_guide()의 비동기 버전"""
+        return await self._achat(self._guide_message(topic), None, semantic_cache=False, method="get_topic_guide")
+
+    async def achat_stream(
+        self,
+        message: str,
+        conversation_history: List[Dict] = None,
+        semantic_cache: bool = True
+    ) -> AsyncIterator[Dict]:
+        """chat_stream()의 비동기 버전"""
+        async for event in self._achat_stream(message, conversation_history, semantic_cache, method="chat"):
+            yield event
+
+    async def _achat_stream(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict]],
+        semantic_cache: bool,
+        method: str
+    ) -> AsyncIterator[Dict]:
+        cached = self._semantic_lookup(message, conversation_history, semantic_cache)
+        if cached:
+            for event in _StreamAccumulator.cached(cached):
+                yield event
+            return
+        
+        acc = _StreamAccumulator()
+        try:
+            stream = await self._acreate_stream(self._chat_request(message, conversation_history, method), method)
+            async for chunk in stream:
+                event = acc.feed(chunk)
+                if event:
+                    yield event
+        except Exception as e:
+            error = acc.error(e)
+            self._record_stream(method, acc, error)
+            yield error
+            return
+        
+        done = acc.done()
+        self._record_stream(method, acc, done)
+        self._semantic_store(message, conversation_history, semantic_cache, done)
+        yield done
+
+    async def aget_topic_guide_stream(self, topic: str) -> AsyncIterator[Dict]:
+        """get_topic_guide_stream()의 비동기 버전"""
+        cache_key = self._guide_cache_key(topic)
+        cached = self._packed_guide(topic) or await self._acached_guide(cache_key)
+        shared_key = None if cached else await self._ashared_guide_key(cache_key)
+        shared = await self._ashared_lookup(shared_key)
+        if shared:
+            await self._astore_guide(cache_key, topic, shared)
+        if cached or shared:
+            for event in _StreamAccumulator.cached(cached or shared):
+                yield event
+            return
         
-        return self.chat(guide_message)
\ No newline at end of file
+        async for event in self._achat_stream(self._guide_message(topic), None, False, method="get_topic_guide"):
+            if event["type"] == "done":
+                await self._astore_guide(cache_key, topic, event)
+                await self._ashared_store(shared_key, event)
+            yield event
@@ -0,0 +1,196 @@
+"""
+학습 분석 템플릿 (자주 나오는 경우는 API 호출 없이 바로 작성)
+
+generate_analysis 입력의 대부분은 몇 가지 유형으로 나뉩니다.
+유형이 분명하면 검수한 문장 틀에 레슨·시간·정확도·틀린 단계를 채워 넣고,
+애매하거나 특이한 데이터만 모델에 넘깁니다.
+
+유형 (기준값은 config.ANALYSIS_*)
+    fast_accurate : 정확도 높고 빠름
+    steady        : 정확도 좋고 보통 속도 (가끔 틀린 단계가 있으면 한 문장 덧붙임)
+    slow_accurate : 정확도 좋지만 느림 (steady와 같이 틀린 단계 한 문장)
+    one_error     : 정확도가 낮고 틀린 단계가 하나에 몰림
+그 밖에 (틀린 단계가 여러 개인데 정확도가 낮음, 값이 비었거나 범위를 벗어남 등)는 모델로 작성합니다.
+
+문장 규칙은 시스템 프롬프트와 같음: 3-4문장, 평문, 격려는 마지막에 한 번.
+호칭은 learning_data["title"]이 없으면 성별과 무관한 "어르신" (할머니·할아버지를 짐작하지 않음).
+"""
+import json
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+TEMPLATES: Dict[str, List[str]] = {
+    "fast_accurate": [
+        "{title}, {lesson} 연습을 정말 잘하셨어요. 한 단계에 평균 {time}밖에 안 걸리셨고 정확도도 {accuracy}나 돼요. "
+        "이제 혼자서도 충분히 하실 수 있겠어요. 다음 단계도 지금처럼만 하시면 돼요!",
+        "{title}, {lesson_object} 아주 빠르고 정확하게 해내셨어요. 정확도 {accuracy}에 단계마다 평균 {time}, 정말 능숙하세요. "
+        "가끔 한 번씩만 다시 해보시면 잊어버리지 않으실 거예요. 정말 멋지세요!",
+    ],
+    "steady": [
+        "{title}, {lesson} 연습을 차근차근 잘 해내셨어요. 정확도 {accuracy}에 한 단계 평균 {time}로 아주 안정적이에요.{note} "
+        "이대로만 하시면 금방 익숙해지실 거예요!",
+        "{title}, {lesson} 연습에서 정확도가 {accuracy}나 나왔어요. 한 단계에 평균 {time} 정도로 서두르지 않고 잘 하셨어요.{note} "
+        "조금만 더 연습하시면 완전히 내 것이 될 거예요!",
+    ],
+    "slow_accurate": [
+        "{title}, {lesson} 연습에서 정확도가 {accuracy}나 돼요. 한 단계에 평균 {time} 정도 걸리셨는데, "
+        "천천히 꼼꼼하게 하시는 게 제일 좋은 방법이에요.{note} "
+        "몇 번 더 해보시면 손에 익어서 저절로 빨라질 테니, 지금처럼만 하시면 돼요!",
+        "{title}, {lesson_object} 꼼꼼하게 해내셨어요. 정확도 {accuracy}에 한 단계 평균 {time} 정도로 조금 천천히 하셨지만 "
+        "정확하게 하시는 게 훨씬 중요해요.{note} 자주 해보시면 속도는 자연스럽게 따라오니, 정말 훌륭하세요!",
+    ],
+    "one_error": [
+        "{title}, {lesson} 연습하시느라 고생 많으셨어요. 다른 단계는 잘 따라오셨는데 {error}에서 자주 막히셨어요. "
+        "{error_topic} 처음엔 누구나 헷갈리는 부분이니 걱정 안 하셔도 돼요. "
+        "다음에 그 부분만 천천히 같이 다시 해봐요!",
+        "{title}, {lesson} 연습을 끝까지 해내셨어요. 대부분은 잘 하셨고, {error_object} 누르는 부분만 조금 어려워하셨어요. "
+        "그 단계만 몇 번 더 연습하면 금방 익숙해지실 거예요. 끝까지 해보시는 모습이 정말 멋지세요!",
+    ],
+}
+
+# 잘한 유형(steady / slow_accurate)에 틀린 단계가 있을 때 덧붙이는 문장
+STEADY_NOTE = " 다만 {error_topic} 가끔 헷갈리셨으니 다음에 한 번 더 살펴봐요."
+
+# 숫자를 한국어로 읽었을 때 받침 유무 (0 영, 1 일, 3 삼, 6 육, 7 칠, 8 팔)
+_DIGIT_BATCHIM = set("013678")
+
+
+def has_batchim(word: str) -> bool:
+    """마지막 글자에 받침이 있는지 (조사 선택용, 한글·숫자 외에는 받침 없음으로 봄)"""
+    word = word.rstrip()
+    if not word:
+        return False
+    last = word[-1]
+    if "가" <= last <= "힣":
+        return (ord(last) - ord("가")) % 28 != 0
+    return last in _DIGIT_BATCHIM
+
+
+def josa(word: str, with_batchim: str, without_batchim: str) -> str:
+    """단어 + 알맞은 조사 (예: 송금을, 버튼3은)"""
+    return word + (with_batchim if has_batchim(word) else without_batchim)
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 10:
+        return f"{seconds:.1f}".rstrip("0").rstrip(".") + "초"
+    if seconds < 60:
+        return f"{round(seconds)}초"
+    minutes, rest = divmod(round(seconds), 60)
+    return f"{minutes}분 {rest}초" if rest else f"{minutes}분"
+
+
+class AnalysisTemplates:
+    def __init__(
+        self,
+        fast_seconds: float = 15.0,
+        slow_seconds: float = 30.0,
+        high_accuracy: float = 0.9,
+        good_accuracy: float = 0.8,
+        min_accuracy: float = 0.3,
+        max_seconds: float = 600.0,
+        title: str = "어르신"
+    ):
+        """
+        Args:
+            fast_seconds: 단계당 평균 시간이 이 이하이면 빠름
+            slow_seconds: 이 이상이면 느림
+            high_accuracy: fast_accurate 기준 정확도
+            good_accuracy: steady / slow_accurate 기준 정확도 (미만이면 one_error 후보)
+            min_accuracy: 이보다 낮으면 템플릿 대신 모델로 (세심한 피드백 필요)
+            max_seconds: 단계당 평균이 이보다 길면 이상값으로 보고 모델로
+            title: 기본 호칭 (성별을 모를 때 쓰므로 중립적인 말, learning_data["title"]로 바꿀 수 있음)
+        """
+        self.fast_seconds = fast_seconds
+        self.slow_seconds = slow_seconds
+        self.high_accuracy = high_accuracy
+        self.good_accuracy = good_accuracy
+        self.min_accuracy = min_accuracy
+        self.max_seconds = max_seconds
+        self.title = title
+
+        self._lock = threading.Lock()
+        self._patterns: Counter = Counter()
+        self._escalations: Counter = Counter()
+
+    def classify(self, learning_data: Dict) -> Tuple[Optional[str], str]:
+        """(유형 또는 None, 유형 이름 또는 모델로 넘기는 이유)"""
+        try:
+            avg_time = float(learning_data["avg_time"])
+            accuracy = float(learning_data["accuracy"])
+        except (KeyError, TypeError, ValueError):
+            return None, "missing_fields"
+        errors = learning_data.get("errors") or []
+        if not learning_data.get("lesson") or not isinstance(errors, list):
+            return None, "missing_fields"
+        if not 0 <= accuracy <= 1 or not 0 < avg_time <= self.max_seconds:
+            return None, "out_of_range"
+
+        if accuracy >= self.good_accuracy:
+            if len(errors) > 1:
+                return None, "many_errors"
+            if accuracy >= self.high_accuracy and avg_time <= self.fast_seconds and not errors:
+                return "fast_accurate", "fast_accurate"
+            if avg_time >= self.slow_seconds:
+                return "slow_accurate", "slow_accurate"
+            return "steady", "steady"
+
+        if accuracy < self.min_accuracy:
+            return None, "low_accuracy"
+        if len(errors) == 1:
+            return "one_error", "one_error"
+        return None, "many_errors" if errors else "no_error_detail"
+
+    def render(self, learning_data: Dict) -> Tuple[Optional[str], str]:
+        """
+        템플릿으로 작성한 분석 문장
+
+        Returns:
+            (문장 또는 None, 유형 또는 모델로 넘기는 이유) - 통계에 기록됨
+        """
+        pattern, label = self.classify(learning_data)
+        if pattern is None:
+            self.escalated(label)
+            return None, label
+
+        lesson = str(learning_data["lesson"]).replace("_", " ")
+        errors = [str(e) for e in learning_data.get("errors") or []]
+        error = errors[0] if errors else ""
+        values = {
+            "title": learning_data.get("title") or self.title,
+            "lesson": lesson,
+            "lesson_object": josa(lesson, "을", "를"),
+            "time": format_seconds(float(learning_data["avg_time"])),
+            "accuracy": f"{round(float(learning_data['accuracy']) * 100)}%",
+            "error": error,
+            "error_topic": josa(error, "은", "는"),
+            "error_object": josa(error, "을", "를"),
+        }
+        values["note"] = STEADY_NOTE.format(**values) if error else ""
+
+        # 같은 데이터에는 항상 같은 문장 (재시도·캐시 비교가 쉬움)
+        variants = TEMPLATES[pattern]
+        seed = zlib.crc32(json.dumps(learning_data, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        with self._lock:
+            self._patterns[pattern] += 1
+        return variants[seed % len(variants)].format(**values), pattern
+
+    def escalated(self, reason: str):
+        """모델로 작성한 경우 기록 (reason: 템플릿을 못 쓴 이유 또는 "requested")"""
+        with self._lock:
+            self._escalations[reason] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            template = sum(self._patterns.values())
+            llm = sum(self._escalations.values())
+            total = template + llm
+            return {
+                "template": template,
+                "llm": llm,
+                "fast_path_share": template / total if total else 0.0,
+                "patterns": dict(self._patterns),
+                "escalations": dict(self._escalations)
+            }
@@ -0,0 +1,248 @@
+"""
+학습 분석 일괄 생성 (주간 리포트 등)
+
+AnalysisRequest 형태의 JSONL을 읽어 generate_analysis를 동시에 여러 건씩 실행하고,
+끝나는 순서대로 결과 JSONL에 한 줄씩 씁니다.
+
+- 입력 한 줄: {"user_id": ..., "learning_data": {...}} 또는 {"user_id": ..., "lesson": ...}
+  (lesson만 있으면 --stats로 준 학습 집계 스냅샷에서 learning_data를 만듦)
+- 동시 실행 수는 --concurrency로 제한, 요청량 한도는 SonjuAI의 rate limiter가 지킴
+- 모든 호출은 background 등급 (같은 프로세스의 라이브 요청이 먼저, 대기열이 넘치면 실패로 기록 → --retry-failed)
+- 결과 파일이 곧 체크포인트: 다시 실행하면 이미 결과가 있는 줄(입력 줄 번호 기준)은 건너뜀
+  (--retry-failed를 주면 실패한 줄은 다시 실행, 같은 줄은 파일에서 마지막 결과가 유효)
+- 끝나면 처리량과 총 토큰 수를 출력
+
+실행: python batch_analysis.py requests.jsonl --out reports.jsonl --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from priority_scheduler import priority
+
+logger = logging.getLogger(__name__)
+
+
+def read_requests(path: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """(줄 번호, 요청, 형식 오류) - 빈 줄은 건너뜀, 줄 번호는 1부터"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"JSON 형식 오류: {e}"
+                continue
+            if not isinstance(record, dict) or "user_id" not in record:
+                yield line_no, None, "user_id가 없습니다."
+                continue
+            yield line_no, record, None
+
+
+def completed_lines(path: str, retry_failed: bool) -> Set[int]:
+    """결과 파일에서 이미 끝난 입력 줄 번호 (마지막 줄이 쓰다 만 줄이면 무시)"""
+    done: Set[int] = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get("success") or not retry_failed:
+                done.add(result["line"])
+            else:
+                done.discard(result["line"])
+    return done
+
+
+def truncate_partial_line(path: str):
+    """비정상 종료로 마지막 줄이 끊겼으면 잘라냄 (이어 쓸 때 줄이 붙지 않게)"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # 마지막 줄바꿈 위치 찾기
+        position = size - 1
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            index = chunk.rfind(b"\n")
+            if index >= 0:
+                f.truncate(position - step + index + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+
+class BatchRunner:
+    def __init__(self, ai, out, concurrency: int = 16, learning=None, sync_every: int = 50):
+        """
+        Args:
+            ai: SonjuAI 인스턴스
+            out: 결과를 쓸 텍스트 파일 객체 (append 모드)
+            concurrency: 동시에 진행할 분석 수
+            learning: lesson만 있는 요청에 쓸 LearningStats (없으면 해당 요청은 실패 처리)
+            sync_every: 결과 N줄마다 fsync (0이면 끝날 때만)
+        """
+        self.ai = ai
+        self.out = out
+        self.concurrency = concurrency
+        self.learning = learning
+        self.sync_every = sync_every
+        self.stats = {"processed": 0, "succeeded": 0, "failed": 0, "skipped": 0, "tokens": 0}
+        self._unsynced = 0
+
+    async def run(self, requests: Iterator[Tuple[int, Optional[Dict], Optional[str]]], done: Set[int]) -> Dict:
+        """입력을 조금씩 읽어 워커들에 나눠 줌 (전체를 메모리에 올리지 않음)"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        started = time.perf_counter()
+        try:
+            for line_no, record, error in requests:
+                if line_no in done:
+                    self.stats["skipped"] += 1
+                    continue
+                await queue.put((line_no, record, error))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._sync()
+
+        elapsed = time.perf_counter() - started
+        return {
+            **self.stats,
+            "elapsed_s": elapsed,
+            "throughput_per_min": self.stats["processed"] / elapsed * 60 if elapsed else 0.0,
+            "templates": self.ai.analysis_templates.stats() if self.ai.analysis_templates is not None else None,
+            "rate_limiter": self.ai.rate_limiter.stats(),
+            "scheduler": self.ai.scheduler.stats() if self.ai.scheduler is not None else None,
+            "http_pool": self.ai.clients.stats()
+        }
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            line_no, record, error = item
+            self._write(line_no, record, await self._analyze(record, error))
+
+    async def _analyze(self, record: Optional[Dict], error: Optional[str]) -> Dict:
+        if error is not None:
+            return {"success": False, "error": error}
+
+        learning_data = record.get("learning_data")
+        if learning_data is None and record.get("lesson") and self.learning is not None:
+            learning_data = self.learning.learning_data(str(record["user_id"]), record["lesson"])
+        if learning_data is None:
+            return {"success": False, "error": "learning_data가 없습니다."}
+
+        try:
+            with priority("background"):
+                return await self.ai.agenerate_analysis(learning_data, use_llm=bool(record.get("use_llm")))
+        except Exception as e:
+            logger.error(f"Batch analysis error: {e}")
+            return {"success": False, "error": str(e)}
+
+    def _write(self, line_no: int, record: Optional[Dict], result: Dict):
+        row = {
+            "line": line_no,
+            "user_id": record.get("user_id") if record else None,
+            "lesson": (record.get("lesson") or (record.get("learning_data") or {}).get("lesson")) if record else None,
+            **result
+        }
+        self.out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+        self.stats["processed"] += 1
+        self.stats["succeeded" if result.get("success") else "failed"] += 1
+        self.stats["tokens"] += result.get("tokens_used") or 0
+        self._unsynced += 1
+        if self.sync_every and self._unsynced >= self.sync_every:
+            self._sync()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self.out.fileno())
+            self._unsynced = 0
+
+
+def print_report(report: Dict):
+    print(f"처리 {report['processed']}건 (성공 {report['succeeded']}, 실패 {report['failed']}), "
+          f"이전 실행분 건너뜀 {report['skipped']}건")
+    print(f"{report['elapsed_s']:.1f}초 → 분당 {report['throughput_per_min']:.0f}건, 총 토큰 {report['tokens']}")
+    templates = report["templates"]
+    if templates:
+        print(f"템플릿 {templates['template']}건 / 모델 {templates['llm']}건 "
+              f"(템플릿 비율 {templates['fast_path_share'] * 100:.0f}%)")
+    limiter = report["rate_limiter"]
+    print(f"요청량 조절: 대기 {limiter['queued']}건, 재시도 {limiter['retries']}건, 429 {limiter['rate_limited']}건")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="학습 분석 일괄 생성 (중단 후 이어서 실행 가능)")
+    parser.add_argument("input", help="AnalysisRequest 형태의 JSONL")
+    parser.add_argument("--out", required=True, help="결과 JSONL (있으면 이어서 씀)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stats", default=None, help="lesson만 있는 요청에 쓸 학습 집계 스냅샷 (LEARNING_STATS_PATH)")
+    parser.add_argument("--retry-failed", action="store_true", help="이전 실행에서 실패한 줄도 다시 실행")
+    parser.add_argument("--sync-every", type=int, default=50, help="결과 N줄마다 디스크에 확정")
+    parser.add_argument("--json", action="store_true", help="결과 요약을 JSON으로 출력")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    from ai_service import SonjuAI, setup_logging
+    from config import config
+    from http_clients import get_client_factory
+    from learning_stats import LearningStats
+
+    setup_logging(logging.INFO if args.verbose else logging.WARNING)
+    learning = LearningStats(snapshot_path=args.stats) if args.stats else None
+
+    done = completed_lines(args.out, args.retry_failed)
+    truncate_partial_line(args.out)
+
+    async def run() -> Dict:
+        ai = SonjuAI()
+        try:
+            with open(args.out, "a", encoding="utf-8") as out:
+                runner = BatchRunner(ai, out, args.concurrency, learning, args.sync_every)
+                return await runner.run(read_requests(args.input), done)
+        finally:
+            await ai.aclose()
+            await get_client_factory().aclose()
+
+    try:
+        report = asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n중단됨 - 같은 명령으로 다시 실행하면 이어서 처리합니다.", file=sys.stderr)
+        sys.exit(130)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
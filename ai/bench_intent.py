@@ -0,0 +1,102 @@
+"""
+의도 파악 마이크로벤치마크
+
+앱·주제 수를 늘려가며 메시지당 분류 비용을 비교합니다.
+    - linear: 기존 detect_intent 방식 (키워드 목록마다 `in` 검사)
+    - compiled: intent.IntentDetector (Aho-Corasick, 한 번 훑기)
+
+실행: python bench_intent.py [--sizes 0 100 300 1000] [--repeat 2000]
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from intent import DEFAULT_TABLE_PATH, IntentDetector
+
+MESSAGES = [
+    "토스 퀴즈 내줘",
+    "송금하는 방법 알려줘",
+    "카카오톡 어떻게 써?",
+    "할머니 오늘 날씨가 좋네요",
+    "사진 찍는 방법 좀 가르쳐줄래",
+    "문자 문제 하나 내주세요",
+    "계좌 잔액은 어케 봐",
+    "손주야 밥은 먹었니",
+]
+
+
+def grow_table(table: Dict, extra: int) -> Dict:
+    """가상의 앱 extra개를 퀴즈·가이드 주제로 추가한 테이블"""
+    table = json.loads(json.dumps(table))
+    for i in range(extra):
+        name = f"가상앱{i:04d}"
+        table["quiz"]["topics"].append({"topic": name, "keywords": [name]})
+        table["guide"]["topics"].append({"topic": f"app_{name}", "keywords": [name, f"{name}앱"]})
+    return table
+
+
+def linear_detect(table: Dict, message: str) -> Dict:
+    """기존 방식을 테이블로 일반화한 기준 구현"""
+    quiz, guide = table["quiz"], table["guide"]
+    if any(keyword in message for keyword in quiz["keywords"]):
+        for entry in quiz["topics"]:
+            if any(keyword in message for keyword in entry["keywords"]):
+                return {"type": "quiz", "topic": entry["topic"]}
+        return {"type": "quiz", "topic": quiz["default_topic"]}
+
+    if any(keyword in message for keyword in guide["keywords"]):
+        for entry in guide["topics"]:
+            if any(keyword in message for keyword in entry["keywords"]):
+                return {"type": "guide", "topic": entry["topic"]}
+
+    return {"type": "chat"}
+
+
+def sample_messages(table: Dict) -> List[str]:
+    """기본 메시지 + 테이블 맨 뒤 주제를 묻는 메시지 (선형 검색의 최악 경우)"""
+    last = table["quiz"]["topics"][-1]["keywords"][0]
+    return MESSAGES + [f"{last} 퀴즈 내줘", f"{last} 어떻게 써?", "이건 어떻게 하는 거야"]
+
+
+def measure(fn, messages: List[str], repeat: int) -> float:
+    """메시지당 평균 소요 시간(µs)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="의도 파악 마이크로벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(DEFAULT_TABLE_PATH, encoding="utf-8") as f:
+        base = json.load(f)
+
+    print(f"{'추가 앱':>8} {'패턴':>6} {'노드':>6} {'linear(µs)':>12} {'compiled(µs)':>13}")
+    for size in args.sizes:
+        table = grow_table(base, size)
+        detector = IntentDetector(table)
+        messages = sample_messages(table)
+
+        for message in messages:
+            expected = linear_detect(table, message)
+            actual = detector.detect(message)
+            actual.pop("guide_topic", None)
+            assert expected == actual, (message, expected, actual)
+
+        patterns = sum(
+            len(table[g]["keywords"]) + sum(len(e["keywords"]) for e in table[g]["topics"])
+            for g in ("quiz", "guide")
+        )
+        linear = measure(lambda m: linear_detect(table, m), messages, args.repeat)
+        compiled = measure(detector.detect, messages, args.repeat)
+        print(f"{size:>8} {patterns:>6} {len(detector.matcher):>6} {linear:>12.2f} {compiled:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+부하 테스트 / 처리량 벤치마크 (가짜 OpenAI 서버 사용, 실제 API 호출 없음)
+
+fake_openai.py 서버를 프로세스 안에 띄우고(또는 --base-url로 지정한 서버 사용)
+지정한 동시성으로 요청을 보내 처리량, 지연 분위수, 퀴즈 파싱 실패율을 출력합니다.
+
+    - sdk: SonjuAI 비동기 메서드를 직접 호출
+    - http: server.py 앱을 함께 띄우고 HTTP 엔드포인트로 호출
+
+업스트림 경로를 재기 위해 기본으로 캐시·퀴즈 풀·요청 합치기를 끄고(--keep-caches로 유지),
+요청량 한도도 사실상 무제한으로 둡니다(--rpm/--tpm으로 실제 한도 재현).
+
+실행: python bench_load.py --mode sdk --concurrency 50 --requests 500 --mix chat=6,quiz=3,guide=1
+      python bench_load.py --mode http --latency-ms 300 --rate-limit-ratio 0.05 --malformed-ratio 0.1
+      python bench_load.py --tpm 60000 --background 32 [--no-scheduler]  (일괄 작업 중 대화 지연 비교)
+    --max-p95-ms / --max-parse-failure-rate: 넘으면 종료 코드 1 (회귀 확인용)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import fake_openai
+from config import config
+
+OPERATIONS = ("chat", "quiz", "guide", "chat_stream")
+CHAT_MESSAGES = ["송금 어떻게 해요", "카카오톡 사진 보내는 법", "글씨를 크게 하고 싶어", "전화번호 저장하는 방법"]
+QUIZ_TOPICS = [topic for topic, _ in config.QUIZ_POOL_TOPICS]
+GUIDE_TOPICS = ["토스_송금", "토스_계좌조회", "전화걸기", "문자보내기"]
+# --background 워커가 반복하는 일괄 분석 (템플릿을 건너뛰고 모델로 작성)
+BULK_ANALYSIS = {"lesson": "토스_송금", "avg_time": 22.0, "accuracy": 0.55, "errors": ["송금 버튼", "계좌 입력"]}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """"chat=6,quiz=3" → {"chat": 6, "quiz": 3}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"알 수 없는 작업: {name} (가능: {', '.join(OPERATIONS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def schedule(mix: Dict[str, int], total: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    names = list(mix)
+    return rng.choices(names, weights=[mix[n] for n in names], k=total)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app, port: int):
+    """uvicorn 서버를 데몬 스레드에서 실행하고 준비될 때까지 대기"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.ttfts: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    def add(self, op: str, seconds: float, ok: bool, ttft: Optional[float] = None):
+        with self._lock:
+            self.latencies[op].append(seconds * 1000)
+            if ttft is not None:
+                self.ttfts[op].append(ttft * 1000)
+            if not ok:
+                self.errors[op] += 1
+
+    def report(self, elapsed: float) -> Dict:
+        everything = [ms for values in self.latencies.values() for ms in values]
+        operations = {}
+        for op, values in sorted(self.latencies.items()):
+            operations[op] = {
+                "requests": len(values),
+                "errors": self.errors[op],
+                "p50_ms": percentile(values, 0.50),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+            }
+            if self.ttfts[op]:
+                operations[op]["ttft_p50_ms"] = percentile(self.ttfts[op], 0.50)
+                operations[op]["ttft_p95_ms"] = percentile(self.ttfts[op], 0.95)
+        return {
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "elapsed_s": elapsed,
+            "throughput_rps": len(everything) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(everything, 0.50),
+            "p95_ms": percentile(everything, 0.95),
+            "p99_ms": percentile(everything, 0.99),
+            "operations": operations
+        }
+
+
+# ========== sdk 모드 ==========
+
+async def sdk_call(ai, op: str, i: int) -> Tuple[bool, Optional[float]]:
+    """(성공 여부, 첫 토큰까지 시간)"""
+    if op == "chat":
+        return (await ai.achat(f"{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} ({i})"))["success"], None
+    if op == "quiz":
+        return (await ai.agenerate_quiz(QUIZ_TOPICS[i % len(QUIZ_TOPICS)]))["success"], None
+    if op == "guide":
+        return (await ai.aget_topic_guide(GUIDE_TOPICS[i % len(GUIDE_TOPICS)]))["success"], None
+
+    started = time.perf_counter()
+    ttft = None
+    async for event in ai.achat_stream(f"{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} ({i})"):
+        if event["type"] == "delta" and ttft is None:
+            ttft = time.perf_counter() - started
+        if event["type"] in ("done", "error"):
+            return event["type"] == "done", ttft
+    return False, ttft
+
+
+async def run_bulk(ai, workers: int, recorder: Recorder, stop: asyncio.Event):
+    """측정하는 동안 background 등급 분석을 계속 보내는 워커들 (주간 리포트 일괄 생성 흉내)"""
+    from priority_scheduler import priority
+
+    async def worker():
+        with priority("background"):
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    ok = (await ai.agenerate_analysis(BULK_ANALYSIS, use_llm=True))["success"]
+                except Exception:
+                    ok = False
+                recorder.add("analysis", time.perf_counter() - started, ok)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def run_sdk(ops: List[str], concurrency: int, recorder: Recorder, background: int = 0,
+                  bulk_recorder: Optional[Recorder] = None) -> Dict:
+    from ai_service import SonjuAI
+
+    ai = SonjuAI()
+    # --keep-caches면 서버처럼 퀴즈 풀도 채움 (꺼져 있으면 아무 일 없음)
+    ai.start_quiz_pool()
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    bulk = asyncio.ensure_future(run_bulk(ai, background, bulk_recorder, stop)) if background else None
+
+    async def one(i: int, op: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok, ttft = await sdk_call(ai, op, i)
+            except Exception:
+                ok, ttft = False, None
+            recorder.add(op, time.perf_counter() - started, ok, ttft)
+
+    await asyncio.gather(*(one(i, op) for i, op in enumerate(ops)))
+    if bulk is not None:
+        stop.set()
+        await bulk
+    stats = service_stats(ai)
+    await ai.aclose()
+    await ai.clients.aclose()
+    return stats
+
+
+# ========== http 모드 ==========
+
+def http_call(base: str, op: str, i: int) -> Tuple[bool, Optional[float]]:
+    user_id = f"bench-{i % 100}"
+    if op in ("chat", "chat_stream"):
+        path = "/chat/stream" if op == "chat_stream" else "/chat"
+        body = {"message": f"{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} ({i})", "user_id": user_id}
+    elif op == "quiz":
+        path, body = "/quiz/generate", {"topic": QUIZ_TOPICS[i % len(QUIZ_TOPICS)], "user_id": user_id}
+    else:
+        path, body = "/guide", {"topic": GUIDE_TOPICS[i % len(GUIDE_TOPICS)], "user_id": user_id}
+
+    request = urllib.request.Request(
+        base + path,
+        data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"}
+    )
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        if op != "chat_stream":
+            return json.load(response).get("success", False), None
+
+        ttft = None
+        ok = False
+        for line in response:
+            if line.startswith(b"event: delta") and ttft is None:
+                ttft = time.perf_counter() - started
+            elif line.startswith(b"event: done"):
+                ok = True
+        return ok, ttft
+
+
+def service_stats(ai) -> Dict:
+    return {
+        "rate_limiter": ai.rate_limiter.stats(),
+        "hedging": ai.hedger.stats() if ai.hedger is not None else None,
+        "scheduler": ai.scheduler.stats() if ai.scheduler is not None else None,
+        "http_pool": ai.clients.stats()
+    }
+
+
+def run_http(ops: List[str], concurrency: int, recorder: Recorder) -> Dict:
+    import server
+
+    port = free_port()
+    uvicorn_server = serve_in_thread(server.app, port)
+    base = f"http://127.0.0.1:{port}"
+
+    def one(item: Tuple[int, str]):
+        i, op = item
+        started = time.perf_counter()
+        try:
+            ok, ttft = http_call(base, op, i)
+        except Exception:
+            ok, ttft = False, None
+        recorder.add(op, time.perf_counter() - started, ok, ttft)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, enumerate(ops)))
+
+    stats = service_stats(server.ai)
+    uvicorn_server.should_exit = True
+    return stats
+
+
+# ========== 실행 ==========
+
+def configure(base_url: str, args: argparse.Namespace):
+    """벤치마크용 설정 (SonjuAI 생성 전에 적용)"""
+    config.OPENAI_BASE_URL = base_url
+    config.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or "sk-bench"
+    config.WARMUP_ON_START = False
+    config.RATE_LIMIT_RPM = args.rpm
+    config.RATE_LIMIT_TPM = args.tpm
+    if args.quiz_format is not None:
+        config.QUIZ_RESPONSE_FORMAT = args.quiz_format
+    if args.quiz_retries is not None:
+        config.QUIZ_PARSE_RETRIES = args.quiz_retries
+    if args.hedge:
+        config.HEDGE_ENABLED = True
+        if args.hedge_max_ratio is not None:
+            config.HEDGE_MAX_RATIO = args.hedge_max_ratio
+    if args.no_scheduler:
+        config.SCHEDULER_ENABLED = False
+    if not args.keep_caches:
+        config.GUIDE_CACHE_ENABLED = False
+        config.SEMANTIC_CACHE_ENABLED = False
+        config.QUIZ_POOL_ENABLED = False
+        config.COALESCE_METHODS = []
+
+
+def quiz_effectiveness(quiz_requests: int, quiz_errors: int) -> Dict:
+    """
+    퀴즈 파싱 실패율(업스트림 응답 기준)과 호출·토큰당 성공 퀴즈 수
+    
+    업스트림 퀴즈 호출 수 = 성공 + 파싱 실패 (재요청 포함)
+    """
+    from metrics import get_metrics
+
+    counters = get_metrics().snapshot()["counters"]
+    failures = sum(counters.get("sonju_parse_failures_total", {}).values())
+    tokens = sum(
+        value
+        for name in ("sonju_prompt_tokens_total", "sonju_completion_tokens_total")
+        for labels, value in counters.get(name, {}).items()
+        if labels == "method=generate_quiz"
+    )
+    quizzes = quiz_requests - quiz_errors
+    calls = quizzes + failures
+    return {
+        "parse_failure_rate": failures / calls if calls else 0.0,
+        "quizzes_per_call": quizzes / calls if calls else 0.0,
+        "quizzes_per_1k_tokens": quizzes / tokens * 1000 if tokens else 0.0,
+        "repairs": counters.get("sonju_quiz_repairs_total", {}),
+        "retries": sum(counters.get("sonju_quiz_retries_total", {}).values())
+    }
+
+
+def fetch_json(url: str) -> Dict:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return json.load(response)
+    except Exception:
+        return {}
+
+
+def print_report(report: Dict):
+    print(f"요청 {report['requests']}건 / 오류 {report['errors']}건 / {report['elapsed_s']:.1f}초 "
+          f"→ {report['throughput_rps']:.1f} req/s")
+    print(f"전체 지연: p50 {report['p50_ms']:.0f}ms, p95 {report['p95_ms']:.0f}ms, p99 {report['p99_ms']:.0f}ms")
+    quiz = report["quiz"]
+    print(f"퀴즈: 파싱 실패율 {quiz['parse_failure_rate'] * 100:.1f}%, 호출당 {quiz['quizzes_per_call']:.2f}개, "
+          f"1k 토큰당 {quiz['quizzes_per_1k_tokens']:.2f}개, 재요청 {quiz['retries']}건")
+    if quiz["repairs"]:
+        print(f"      보정: {quiz['repairs']}")
+    print()
+
+    print(f"{'작업':<12} {'요청':>6} {'오류':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'ttft p50':>9}")
+    for op, row in report["operations"].items():
+        ttft = f"{row['ttft_p50_ms']:.0f}" if "ttft_p50_ms" in row else "-"
+        print(f"{op:<12} {row['requests']:>6} {row['errors']:>5} "
+              f"{row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} {row['p99_ms']:>8.0f} {ttft:>9}")
+
+    limiter = report["rate_limiter"]
+    print(f"\n요청량 조절: 대기 {limiter.get('queued', 0)}건, 재시도 {limiter.get('retries', 0)}건, "
+          f"429 {limiter.get('rate_limited', 0)}건, 최종 실패 {limiter.get('failed', 0)}건")
+    hedging = report["hedging"]
+    if hedging:
+        print(f"헤지: {hedging['hedged']}건 ({hedging['hedge_ratio'] * 100:.1f}%), 헤지 승 {hedging['hedge_wins']}건, "
+              f"상한으로 보류 {hedging['denied']}건, 추가 토큰 {hedging['extra_tokens']}")
+    scheduler = report["scheduler"]
+    if scheduler:
+        for name, row in scheduler["classes"].items():
+            if row["granted"] or row["shed"] or row["expired"]:
+                print(f"우선순위 {name}: 입장 {row['granted']}건, 대기 p50 {row['wait_ms_p50']:.0f}ms / "
+                      f"p95 {row['wait_ms_p95']:.0f}ms, 거절 {row['shed']}건, 마감 초과 {row['expired']}건")
+    for kind in ("sync", "async"):
+        pool = (report.get("http_pool") or {}).get(kind)
+        if pool and pool["requests"]:
+            print(f"연결 풀({kind}): 요청 {pool['requests']}건, 새 연결 {pool['connections_opened']}개 "
+                  f"(재사용 {pool['reuse_ratio'] * 100:.1f}%), HTTP/2 {report['http_pool']['http2']}")
+    bulk = report.get("background")
+    if bulk:
+        print(f"background 분석: {bulk['requests']}건 (오류 {bulk['errors']}건), p50 {bulk['p50_ms']:.0f}ms")
+    if report["fake_server"]:
+        print(f"가짜 서버: {report['fake_server']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 OpenAI 서버 기반 부하 테스트")
+    parser.add_argument("--mode", choices=("sdk", "http"), default="sdk")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=5,quiz=3,guide=1,chat_stream=1"))
+    parser.add_argument("--base-url", default=None, help="이미 떠 있는 가짜 서버 주소 (없으면 내부에서 실행)")
+    parser.add_argument("--rpm", type=int, default=10 ** 9)
+    parser.add_argument("--tpm", type=int, default=10 ** 12)
+    parser.add_argument("--keep-caches", action="store_true")
+    parser.add_argument("--quiz-format", choices=("json_schema", "json_object", "none"), default=None,
+                        help="퀴즈 response_format (기본: config 값)")
+    parser.add_argument("--quiz-retries", type=int, default=None, help="퀴즈 재요청 횟수 (기본: config 값)")
+    parser.add_argument("--hedge", action="store_true", help="chat·guide 헤지 요청 켜기")
+    parser.add_argument("--hedge-max-ratio", type=float, default=None, help="헤지 비율 상한 (기본: config 값)")
+    parser.add_argument("--background", type=int, default=0,
+                        help="측정 중 background 등급 분석을 계속 보낼 워커 수 (sdk 모드)")
+    parser.add_argument("--no-scheduler", action="store_true", help="우선순위 스케줄러 끄기 (비교용)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    parser.add_argument("--verbose", action="store_true", help="SonjuAI 로그 출력")
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--max-parse-failure-rate", type=float, default=None)
+    fake_openai.add_arguments(parser)
+    args = parser.parse_args()
+
+    from ai_service import setup_logging
+    setup_logging(logging.INFO if args.verbose else logging.CRITICAL)
+
+    base_url = args.base_url
+    if base_url is None:
+        port = free_port()
+        serve_in_thread(fake_openai.create_app(fake_openai.settings_from_args(args)), port)
+        base_url = f"http://127.0.0.1:{port}/v1"
+    configure(base_url, args)
+
+    ops = schedule(args.mix, args.requests, args.seed or 0)
+    recorder = Recorder()
+    bulk_recorder = Recorder()
+    started = time.perf_counter()
+    if args.mode == "sdk":
+        stats = asyncio.run(run_sdk(ops, args.concurrency, recorder, args.background, bulk_recorder))
+    else:
+        stats = run_http(ops, args.concurrency, recorder)
+
+    report = recorder.report(time.perf_counter() - started)
+    report["mode"] = args.mode
+    report["concurrency"] = args.concurrency
+    report["quiz"] = quiz_effectiveness(ops.count("quiz"), recorder.errors["quiz"])
+    report.update(stats)
+    if args.background:
+        report["background"] = bulk_recorder.report(report["elapsed_s"])
+    report["fake_server"] = fetch_json(base_url.rsplit("/v1", 1)[0] + "/stats")
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+    failed = []
+    if args.max_p95_ms is not None and report["p95_ms"] > args.max_p95_ms:
+        failed.append(f"p95 {report['p95_ms']:.0f}ms > {args.max_p95_ms:.0f}ms")
+    parse_failure_rate = report["quiz"]["parse_failure_rate"]
+    if args.max_parse_failure_rate is not None and parse_failure_rate > args.max_parse_failure_rate:
+        failed.append(f"파싱 실패율 {parse_failure_rate:.3f} > {args.max_parse_failure_rate:.3f}")
+    if failed:
+        print("\n기준 초과: " + ", ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+콘솔 챗봇 시작 시간 측정
+
+run_chatbot.py를 새 프로세스로 실행해 첫 입력 프롬프트("어르신: ")가
+뜰 때까지 걸린 시간을 반복 측정합니다. (API 호출은 하지 않음)
+
+실행: python bench_startup.py [--runs 5] [--max-ms 800] [--imports 10]
+    --max-ms: 중앙값이 이 값을 넘으면 종료 코드 1 (CI 회귀 확인용)
+    --imports: python -X importtime 기준 누적 import 시간 상위 N개 출력
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROMPT = "어르신: ".encode("utf-8")
+
+
+def bench_env(cache_dir: str) -> Dict[str, str]:
+    """네트워크·백그라운드 작업 없이 시작만 재는 환경 변수"""
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    env["WARMUP_ON_START"] = "false"
+    env["GUIDE_CACHE_DIR"] = cache_dir
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+def time_to_prompt(env: Dict[str, str], timeout: float = 30.0) -> float:
+    """프로세스 시작부터 프롬프트 출력까지(ms)"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "run_chatbot.py"],
+        cwd=HERE,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    output = b""
+    try:
+        while PROMPT not in output:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError(f"프롬프트 전에 종료됨: {output.decode('utf-8', 'replace')[-200:]}")
+            output += chunk
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError("시간 초과")
+        return (time.perf_counter() - started) * 1000
+    finally:
+        process.kill()
+        process.wait()
+
+
+def top_imports(env: Dict[str, str], limit: int) -> List[Tuple[int, str]]:
+    """run_chatbot import 시 누적 import 시간 상위 모듈 (µs, 모듈명)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import run_chatbot"],
+        cwd=HERE,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="콘솔 챗봇 시작 시간 측정")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--imports", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = bench_env(cache_dir)
+        times = [time_to_prompt(env) for _ in range(args.runs)]
+        median = statistics.median(times)
+        print(f"프롬프트까지: 중앙값 {median:.0f}ms, 최소 {min(times):.0f}ms, 최대 {max(times):.0f}ms ({args.runs}회)")
+
+        if args.imports:
+            print(f"\n누적 import 시간 상위 {args.imports}개:")
+            for cumulative, name in top_imports(env, args.imports):
+                print(f"  {cumulative / 1000:>8.1f}ms  {name}")
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"\n예산 초과: {median:.0f}ms > {args.max_ms:.0f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+워커 간 공유 캐시 백엔드
+
+여러 워커 프로세스로 서버를 띄우면 프로세스마다 캐시를 따로 채우느라 같은 응답을 N번 생성하게 됩니다.
+같은 호스트의 워커들이 하나의 저장소를 보게 해서 한 워커가 만든 결과를 모두 쓰게 합니다.
+
+- CacheBackend: 공통 인터페이스 (get / set / delete / get_or_compute, 비동기 aget / aset / aget_or_compute)
+- MemoryBackend: 프로세스 안에서만 공유 (단일 워커, 기본 구현 확인용)
+- SQLiteBackend: SQLite WAL 파일 하나를 워커들이 같이 씀 (읽기는 서로 막지 않음)
+
+get_or_compute: 키가 없으면 "계산 중" 임대(lease)를 잡은 호출 하나만 계산하고
+나머지는 값이 저장될 때까지 기다렸다가 읽습니다. 계산한 워커가 죽으면 임대가 만료되어
+다른 워커가 이어받습니다. 값은 JSON으로 저장할 수 있어야 합니다.
+
+설정: config.CACHE_BACKEND = "memory" 또는 "sqlite:///경로/cache.db"
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# 임대를 기다리는 동안 값을 다시 확인하는 간격(초, 두 배씩 늘려 상한까지)
+POLL_START = 0.01
+POLL_MAX = 0.2
+
+
+class CacheBackend:
+    """공유 캐시 인터페이스 (하위 클래스는 _lookup / _store / _remove / _acquire / _release 구현)"""
+
+    # 저장소 호출이 잠금·디스크를 기다릴 수 있으면 비동기 API는 스레드에서 실행 (이벤트 루프를 막지 않게)
+    blocking = True
+
+    def __init__(self, lease_seconds: float = 60, wait_timeout: float = 30):
+        """
+        Args:
+            lease_seconds: 계산 임대 유지 시간 (계산이 이보다 오래 걸리면 다른 호출도 계산을 시작)
+            wait_timeout: 다른 호출의 계산을 기다리는 최대 시간 (넘으면 직접 계산)
+        """
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "computed": 0, "waited": 0, "wait_timeouts": 0}
+
+    # ========== 공개 API ==========
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._lookup(key)
+        self._count("misses" if value is _MISSING else "hits")
+        return None if value is _MISSING else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """ttl(초)이 None이면 만료 없음 (개수 상한으로만 삭제)"""
+        self._store(key, value, ttl)
+
+    def delete(self, key: str):
+        self._remove(key)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await self._offload(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self._offload(self.set, key, value, ttl)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        값이 있으면 반환, 없으면 한 호출만 compute()를 실행해 저장
+
+        compute()가 예외를 내면 저장하지 않고 그대로 전파하며, 기다리던 호출 중 하나가 이어서 계산합니다.
+        """
+        value, owner = self._begin(key)
+        poll = POLL_START
+        deadline = time.monotonic() + self.wait_timeout
+        while value is _MISSING:
+            if owner is not None:
+                return self._compute(key, owner, compute, ttl)
+            time.sleep(poll)
+            poll = min(poll * 2, POLL_MAX)
+            value, owner = self._retry(key, deadline)
+        return value
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """get_or_compute()의 비동기 버전 (기다리는 동안·저장소 호출 중에도 이벤트 루프를 막지 않음)"""
+        value, owner = await self._offload(self._begin, key)
+        poll = POLL_START
+        deadline = time.monotonic() + self.wait_timeout
+        while value is _MISSING:
+            if owner is not None:
+                try:
+                    value = await compute()
+                    await self._offload(self._store, key, value, ttl)
+                    self._count("computed")
+                    return value
+                finally:
+                    await self._offload(self._release, key, owner)
+            await asyncio.sleep(poll)
+            poll = min(poll * 2, POLL_MAX)
+            value, owner = await self._offload(self._retry, key, deadline)
+        return value
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "backend": type(self).__name__,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        pass
+
+    # ========== get_or_compute 공통 ==========
+
+    def _begin(self, key: str) -> Tuple[Any, Optional[str]]:
+        """(값, 임대 소유자) - 값이 있으면 소유자 None, 없으면 임대를 시도"""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self._count("hits")
+            return value, None
+        self._count("misses")
+        return self._try_lease(key)
+
+    def _retry(self, key: str, deadline: float) -> Tuple[Any, Optional[str]]:
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self._count("waited")
+            return value, None
+        if time.monotonic() > deadline:
+            # 계산하던 쪽이 너무 오래 걸림 → 임대와 상관없이 직접 계산
+            self._count("wait_timeouts")
+            return _MISSING, uuid.uuid4().hex
+        return self._try_lease(key)
+
+    def _try_lease(self, key: str) -> Tuple[Any, Optional[str]]:
+        owner = uuid.uuid4().hex
+        if not self._acquire(key, owner):
+            return _MISSING, None
+        # 임대를 잡기 직전에 다른 호출이 저장했을 수 있음
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self._release(key, owner)
+            self._count("waited")
+            return value, None
+        return _MISSING, owner
+
+    def _compute(self, key: str, owner: str, compute: Callable[[], Any], ttl: Optional[float]) -> Any:
+        try:
+            value = compute()
+            self._store(key, value, ttl)
+            self._count("computed")
+            return value
+        finally:
+            self._release(key, owner)
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    async def _offload(self, fn: Callable[..., Any], *args) -> Any:
+        if not self.blocking:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    # ========== 저장소별 구현 ==========
+
+    def _lookup(self, key: str) -> Any:
+        """값 또는 _MISSING"""
+        raise NotImplementedError
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]):
+        raise NotImplementedError
+
+    def _remove(self, key: str):
+        raise NotImplementedError
+
+    def _acquire(self, key: str, owner: str) -> bool:
+        """계산 임대 잡기 (이미 다른 소유자가 유효한 임대를 갖고 있으면 False)"""
+        raise NotImplementedError
+
+    def _release(self, key: str, owner: str):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """프로세스 안 공유 (LRU + TTL)"""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 10000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _remove(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _acquire(self, key: str, owner: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] > now:
+                return False
+            self._leases[key] = (owner, now + self.lease_seconds)
+            return True
+
+    def _release(self, key: str, owner: str):
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[0] == owner:
+                del self._leases[key]
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._lock:
+            stats["entries"] = len(self._data)
+        return stats
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    SQLite WAL 파일 공유 (같은 호스트의 여러 워커 프로세스)
+
+    값은 파일 하나에만 있으므로 워커 수가 늘어도 캐시 메모리는 늘지 않습니다.
+    임대 시각은 프로세스끼리 비교해야 하므로 벽시계(time.time) 기준입니다.
+    """
+
+    # 개수 상한 확인 주기 (저장 N번마다 한 번)
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 20000, busy_timeout: float = 5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_updated_at ON cache (updated_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _lookup(self, key: str) -> Any:
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        if row[1] is not None and row[1] < time.time():
+            return _MISSING
+        try:
+            return json.loads(row[0])
+        except ValueError as e:
+            logger.warning(f"공유 캐시 값 손상: {key} ({e})")
+            return _MISSING
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]):
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (key, data, now + ttl if ttl else None, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _remove(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _acquire(self, key: str, owner: str) -> bool:
+        now = time.time()
+        with self._lock:
+            # 만료된 임대 정리와 새 임대를 한 쓰기 트랜잭션으로 (워커 둘이 동시에 잡지 않음)
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, owner, now + self.lease_seconds)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            return cursor.rowcount == 1
+
+    def _release(self, key: str, owner: str):
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def _evict(self, now: float):
+        """만료 항목 삭제 + 상한을 넘으면 오래된 것부터 (self._lock 안에서 호출)"""
+        self._db.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY updated_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._lock:
+            (stats["entries"],) = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        stats["path"] = self.path
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_backend(url: Optional[str], **kwargs) -> Optional[CacheBackend]:
+    """
+    설정 문자열 → 백엔드 (빈 값이면 None = 공유 캐시 사용 안 함)
+
+    "memory" / "sqlite:///절대/경로.db" / "sqlite://상대/경로.db"
+    """
+    if not url:
+        return None
+    if url == "memory":
+        return MemoryBackend(**kwargs)
+    if url.startswith("sqlite://"):
+        return SQLiteBackend(url[len("sqlite://"):], **kwargs)
+    raise ValueError(f"알 수 없는 캐시 백엔드: {url}")
@@ -1,29 +1,222 @@
 import os
-from dotenv import load_dotenv
+import threading
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env():
+    """.env 파일을 한 번만 로드 (import 시점이 아니라 설정값을 처음 읽을 때 호출됨)"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+class EnvSetting:
+    """
+    환경 변수에서 읽는 설정 항목
+    
+    처음 접근할 때 .env를 로드하고 값을 인스턴스에 저장하므로
+    이후 접근은 일반 속성과 같고, 코드에서 값을 덮어쓸 수도 있습니다.
+    """
+
+    def __init__(self, name: str, default=None, cast=str):
+        self.name = name
+        self.default = default
+        self.cast = cast
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        load_env()
+        raw = os.getenv(self.name)
+        value = self.default if raw is None else self.cast(raw)
+        obj.__dict__[self.attr] = value
+        return value
+
+
+def _flag(value: str) -> bool:
+    return value.lower() == "true"
 
-load_dotenv()
 
 class Config:
     # OpenAI 설정
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_API_KEY = EnvSetting("OPENAI_API_KEY")
+    # 비우면 공식 API, 부하 테스트 시 fake_openai.py 주소 (예: http://127.0.0.1:8765/v1)
+    OPENAI_BASE_URL = EnvSetting("OPENAI_BASE_URL")
+    # 연결 풀 (http_clients.py, 프로세스 안의 모든 OpenAI 클라이언트가 공유)
+    OPENAI_HTTP2 = EnvSetting("OPENAI_HTTP2", True, _flag)  # h2 패키지가 없으면 HTTP/1.1
+    OPENAI_MAX_CONNECTIONS = EnvSetting("OPENAI_MAX_CONNECTIONS", 100, int)
+    OPENAI_MAX_KEEPALIVE = 50  # 요청이 없을 때도 열어 둘 연결 수
+    OPENAI_KEEPALIVE_EXPIRY = 60.0  # 초, 요청 사이가 뜸해도 연결을 다시 쓰도록 httpx 기본값(5초)보다 길게
+    OPENAI_CONNECT_TIMEOUT = 5.0
+    OPENAI_READ_TIMEOUT = 60.0
+    OPENAI_POOL_TIMEOUT = 10.0  # 풀에 빈 연결이 없을 때 기다리는 시간
+    OPENAI_WARM_CONNECTIONS = 4  # 시작할 때 미리 열어 둘 연결 수 (HTTP/2면 1개)
     
     # 모델 설정
     DEFAULT_MODEL = "gpt-3.5-turbo"
     MAX_TOKENS = 600
     TEMPERATURE_CHAT = 0.7
     TEMPERATURE_QUIZ = 0.8
+    # 퀴즈 응답 형식: "json_schema" (structured output, gpt-4o 계열) / "json_object" (JSON 모드) / "none"
+    QUIZ_RESPONSE_FORMAT = "json_object"
+    QUIZ_PARSE_RETRIES = 1  # 보정으로도 못 고친 퀴즈 응답 재요청 횟수
     
-    # 대화 설정
-    MAX_CONVERSATION_HISTORY = 5
+    # 대화 설정 (히스토리는 메시지 개수가 아니라 토큰 예산으로 관리)
+    HISTORY_TOKEN_BUDGET = 1200  # 프롬프트에 넣을 히스토리(요약 포함) 최대 토큰
+    HISTORY_SUMMARY_TRIGGER = 600  # 예산을 넘으면 이만큼 여유가 생기도록 오래된 대화를 한꺼번에 요약에 합침
+    HISTORY_SUMMARY_MAX_TOKENS = 150
+    
+    # 모델 라우팅: "작업:의도" → "작업" → "default" 순서로 찾음 (의도는 intent.detect_intent의 type)
+    # 대부분의 요청은 싸고 빠른 모델로, 기본 모델이 느려지거나 오류가 많으면 fallback으로 전환
+    FAST_MODEL = "gpt-4o-mini"
+    MODEL_ROUTES = {
+        "default": {"model": DEFAULT_MODEL, "max_tokens": MAX_TOKENS, "temperature": TEMPERATURE_CHAT, "fallback": None},
+        "chat": {"model": FAST_MODEL, "max_tokens": MAX_TOKENS, "temperature": TEMPERATURE_CHAT, "fallback": DEFAULT_MODEL},
+        "chat:chat": {"model": FAST_MODEL, "max_tokens": 300, "temperature": TEMPERATURE_CHAT, "fallback": DEFAULT_MODEL},
+        "generate_quiz": {"model": FAST_MODEL, "max_tokens": 500, "temperature": TEMPERATURE_QUIZ, "fallback": DEFAULT_MODEL},
+        "generate_analysis": {"model": FAST_MODEL, "max_tokens": 200, "temperature": 0.7, "fallback": DEFAULT_MODEL},
+        "get_topic_guide": {"model": FAST_MODEL, "max_tokens": MAX_TOKENS, "temperature": TEMPERATURE_CHAT, "fallback": DEFAULT_MODEL},
+        "summarize_history": {"model": FAST_MODEL, "max_tokens": HISTORY_SUMMARY_MAX_TOKENS, "temperature": 0.3, "fallback": DEFAULT_MODEL},
+    }
+    ROUTER_WINDOW = 50  # 모델별로 보는 최근 호출 수
+    ROUTER_MIN_SAMPLES = 10
+    ROUTER_P95_SECONDS = 8.0  # 최근 p95 지연이 넘으면 전환 (스트리밍은 첫 응답까지 시간)
+    ROUTER_ERROR_RATE = 0.2  # 최근 오류율이 넘으면 전환
+    ROUTER_COOLDOWN = 60  # 전환 유지 시간(초), 이후 기본 모델 다시 시도
     
     # API 설정
     API_HOST = "0.0.0.0"
     API_PORT = 8000
     
-    @classmethod
-    def validate(cls):
+    # 서버 세션 (클라이언트 대신 서버가 대화 히스토리·출제 퀴즈 보관)
+    SESSION_MAX_TURNS = 20  # 세션당 저장할 최근 메시지 수 (프롬프트에는 HISTORY_TOKEN_BUDGET만큼)
+    SESSION_MAX_QUIZZES = 4
+    SESSION_IDLE_TTL = 6 * 3600  # 초
+    SESSION_MAX_SESSIONS = 10000
+    SESSION_MAX_BYTES = 64 * 1024 * 1024
+    SESSION_DB_PATH = EnvSetting("SESSION_DB_PATH")  # 지정하면 SQLite에 저장 (재시작 후 복구)
+    
+    # 학습 분석 템플릿 (흔한 유형은 모델 호출 없이 작성, 나머지만 모델로)
+    ANALYSIS_TEMPLATES_ENABLED = True
+    ANALYSIS_FAST_SECONDS = 15  # 단계당 평균 시간이 이 이하면 "빠름"
+    ANALYSIS_SLOW_SECONDS = 30  # 이 이상이면 "느림"
+    ANALYSIS_HIGH_ACCURACY = 0.9
+    ANALYSIS_GOOD_ACCURACY = 0.8
+    ANALYSIS_MIN_ACCURACY = 0.3  # 이보다 낮으면 템플릿 대신 모델이 세심하게 작성
+    ANALYSIS_TITLE = "어르신"  # 기본 호칭 - 성별을 모르므로 중립적인 말 (learning_data["title"]로 바꿀 수 있음)
+    
+    # 학습 이벤트 집계 (POST /events → 분석 요청에 바로 사용)
+    LEARNING_TOP_ERRORS = 3  # 분석에 넘길 자주 틀린 단계 수
+    LEARNING_STATS_PATH = EnvSetting("LEARNING_STATS_PATH")  # 지정하면 이벤트 로그 + 스냅샷으로 저장, 시작 시 복구
+    LEARNING_SNAPSHOT_INTERVAL = EnvSetting("LEARNING_SNAPSHOT_INTERVAL", 300, int)  # 스냅샷 주기(초) - 그 사이는 로그에 쌓임
+    
+    # 요청량 제한 (OpenAI 계정 한도에 맞춰 조정, 넘는 요청은 대기열에서 기다림)
+    RATE_LIMIT_RPM = EnvSetting("RATE_LIMIT_RPM", 3500, int)
+    RATE_LIMIT_TPM = EnvSetting("RATE_LIMIT_TPM", 90000, int)
+    RATE_LIMIT_MAX_RETRIES = 5
+    
+    # 업스트림 호출 우선순위 (priority_scheduler.py) - 라이브 대화가 일괄 작업 뒤에서 기다리지 않게
+    SCHEDULER_ENABLED = EnvSetting("SCHEDULER_ENABLED", True, _flag)
+    SCHEDULER_RESERVED_QUOTA = 0.2  # 분당 요청·토큰 한도 중 interactive 전용 비율
+    METHOD_PRIORITIES = {
+        "chat": "interactive",
+        "get_topic_guide": "interactive",
+        "generate_quiz": "near_real_time",
+        "generate_analysis": "near_real_time",
+        "summarize_history": "near_real_time",
+    }  # 퀴즈 풀·일괄 분석·가이드 팩 빌드는 background로 호출
+    PRIORITY_WEIGHTS = {"interactive": 8, "near_real_time": 3, "background": 1}  # 한도가 찼을 때 토큰 배분 비율
+    PRIORITY_DEADLINES = {"interactive": 20, "near_real_time": 60, "background": 600}  # 최대 대기 시간(초)
+    PRIORITY_QUEUE_LIMITS = {"interactive": 1000, "near_real_time": 300, "background": 100}  # 대기열이 이만큼이면 거절
+    
+    # 진행 중인 동일 요청 합치기 대상 메서드 (결과가 충분히 결정적인 것만)
+    COALESCE_METHODS = ["get_topic_guide", "generate_quiz"]
+    
+    # 헤지 요청: 최근 지연의 HEDGE_PERCENTILE 분위를 넘기면 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+    # (비용이 늘어나므로 기본은 꺼 둠, 헤지 수는 호출 수 × HEDGE_MAX_RATIO 이하)
+    HEDGE_ENABLED = EnvSetting("HEDGE_ENABLED", False, _flag)
+    HEDGE_METHODS = ["chat", "get_topic_guide"]
+    HEDGE_PERCENTILE = 0.9
+    HEDGE_MAX_RATIO = 0.1
+    HEDGE_BURST = 5  # 한가할 때 모아 둘 수 있는 헤지 수
+    HEDGE_DEFAULT_DELAY = 3.0  # 지연 표본이 모이기 전 헤지 대기 시간(초)
+    HEDGE_MIN_DELAY = 0.5
+    
+    # 가이드 캐시 설정 (GUIDE_CACHE_DIR이 빈 값이면 메모리 캐시만 사용)
+    GUIDE_CACHE_ENABLED = True
+    GUIDE_CACHE_DIR = EnvSetting(
+        "GUIDE_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "guides")
+    )
+    GUIDE_CACHE_TTL = 7 * 24 * 3600  # 초
+    GUIDE_CACHE_MAX_MEMORY = 256
+    GUIDE_CACHE_MAX_DISK = 2048
+    GUIDE_CACHE_VARIANTS = 1  # 주제별로 돌려가며 보여줄 답변 개수
+    # 미리 만든 가이드 팩 (python guide_pack.py build), 파일이 없으면 라이브 생성
+    GUIDE_PACK_PATH = EnvSetting(
+        "GUIDE_PACK_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "guides.pack")
+    )
+    
+    # 워커 간 공유 캐시 ("sqlite:///경로/cache.db" 또는 "memory", 비우면 사용 안 함)
+    # 여러 워커로 띄울 때 한 워커가 만든 가이드를 모두 쓰고, 같은 가이드는 한 워커만 생성
+    CACHE_BACKEND = EnvSetting("CACHE_BACKEND", "")
+    CACHE_MAX_ENTRIES = 20000
+    CACHE_LEASE_SECONDS = 60  # 생성 중 표시 유지 시간 (생성하던 워커가 죽어도 이후 다른 워커가 이어받음)
+    CACHE_WAIT_TIMEOUT = 30  # 다른 워커의 생성을 기다리는 최대 시간
+    
+    # 유사 질문 캐시 설정 (히스토리 없는 첫 질문 중 방법을 묻는 질문만 대상, 일반 대화는 캐시 안 함)
+    SEMANTIC_CACHE_ENABLED = True
+    SEMANTIC_CACHE_THRESHOLD = 0.9  # 코사인 유사도 (부정·반대말이 다르면 이 값과 무관하게 미스)
+    SEMANTIC_CACHE_MAX_ENTRIES = 2000
+    SEMANTIC_CACHE_TTL = 24 * 3600  # 초
+    
+    # 퀴즈 풀 설정 (서버·콘솔 챗봇이 start_quiz_pool()을 부르면 백그라운드에서 미리 생성)
+    QUIZ_POOL_ENABLED = EnvSetting("QUIZ_POOL_ENABLED", True, _flag)
+    QUIZ_POOL_LOW_WATER = 2  # 이 개수 미만이면 다시 채움
+    QUIZ_POOL_TARGET = 4
+    QUIZ_POOL_TOPICS = [
+        ("토스", "쉬움"),
+        ("카카오톡", "쉬움"),
+        ("전화", "쉬움"),
+        ("문자", "쉬움"),
+        ("사진", "쉬움"),
+    ]
+    
+    # 콘솔 챗봇(run_chatbot.py) 사용자 ID - 퀴즈 풀에서 이미 푼 문제를 다시 내지 않도록
+    CONSOLE_USER_ID = EnvSetting("CONSOLE_USER_ID", "console")
+    # 콘솔 챗봇에서도 퀴즈 풀을 채울지 (켤 때마다 주제 수 × QUIZ_POOL_TARGET번 호출 - 풀은 저장되지 않음)
+    CONSOLE_QUIZ_POOL = EnvSetting("CONSOLE_QUIZ_POOL", False, _flag)
+    
+    # 다음 요청 미리 준비 (콘솔 챗봇: 가이드를 읽는 동안 관련 퀴즈, 퀴즈를 푼 뒤 다음 퀴즈)
+    PREFETCH_ENABLED = EnvSetting("PREFETCH_ENABLED", True, _flag)
+    PREFETCH_MIN_PROBABILITY = 0.5  # 다음 요청일 확률이 이 이상일 때만 준비
+    PREFETCH_PRIOR = 2  # 기본 예측(가이드 → 같은 주제 퀴즈, 퀴즈 → 다음 퀴즈)의 가상 횟수
+    PREFETCH_BUDGET_RATIO = 0.5  # 빗나간 준비로 늘어나는 호출은 요청 수 × 이 비율 이하
+    PREFETCH_BURST = 3
+    PREFETCH_WAIT_SECONDS = 30  # 준비 중인 결과를 기다리는 최대 시간(초)
+    PREFETCH_START_DELAY = 3  # 예측 후 이만큼(초) 읽으시는 동안 다른 요청이 없을 때만 실제로 생성
+    PREFETCH_STATS_PATH = EnvSetting("PREFETCH_STATS_PATH")  # 지정하면 전이 횟수를 저장해 다음 실행에서 이어 씀
+    
+    # 소리 내어 읽어 주기 (read_aloud.py: 답변을 문장 단위로 TTS에 넘김)
+    READ_ALOUD_MAX_CHARS = 120  # 문장 경계 없이 이 길이를 넘으면 쉼표·띄어쓰기에서 끊어 먼저 읽음
+    
+    # 시작 시 백그라운드에서 OpenAI 클라이언트 생성 + 연결 미리 열기
+    WARMUP_ON_START = EnvSetting("WARMUP_ON_START", True, _flag)
+    
+    def validate(self):
         """설정 검증"""
-        if not cls.OPENAI_API_KEY:
+        if not self.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY가 .env 파일에 설정되지 않았습니다.")
 
 config = Config()
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+로컬 가짜 OpenAI 서버 (부하 테스트·벤치마크용)
+
+chat.completions 엔드포인트를 흉내 내어 실제 API 없이 처리량을 잴 수 있게 합니다.
+
+- 지연: fixed / uniform / lognormal 분포, 스트리밍은 첫 토큰 지연 + 토큰 간격
+- 응답 토큰 수 지정, 퀴즈 요청에는 퀴즈 JSON으로 응답
+- 일정 비율로 429(retry-after-ms 포함), 500, 깨진 퀴즈 JSON 응답
+  (response_format을 지정하면 실제 API처럼 해당 모드에서 생길 수 없는 결함은 빼고 응답)
+
+실행: python fake_openai.py --port 8765 --latency lognormal --latency-ms 800 --rate-limit-ratio 0.05
+사용: OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python server.py
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHAT_TEXT = (
+    "할머니, 천천히 따라 해보세요. 먼저 화면 아래에 있는 버튼을 눌러주세요. "
+    "그다음 받는 분을 고르고 금액을 입력하시면 돼요. 마지막으로 확인 버튼을 누르면 끝이에요. "
+)
+
+QUIZ = {
+    "question": "토스에서 돈을 보낼 때 가장 먼저 눌러야 하는 버튼은 무엇일까요?",
+    "options": ["1. 송금", "2. 설정", "3. 알림", "4. 혜택"],
+    "correct_answer": 1,
+    "explanation": "송금 버튼을 눌러야 받는 분을 고를 수 있어요.",
+    "encouragement": "정말 잘하셨어요!"
+}
+
+# 실제 모델이 가끔 내놓는 깨진 퀴즈 응답
+# 문법 결함: JSON 모드(response_format)를 쓰면 나오지 않음
+SYNTAX_DEFECTS = (
+    '{"question": "송금 버튼은 어디 있을까요?", "options": ["1. 아래", "2. 위", "3. 왼쪽", "4. 오른쪽"], '
+    '"correct_answer": 1, "explanation": "아래에 있어요.", "encouragement": "잘하셨어요!",}',
+    '{"question": "송금 버튼은 어디 있을까요?", "options": ["1. 아래", "2. 위"',
+    '좋아요! 퀴즈를 만들어 봤어요.\n```json\n{"question": "송금 버튼은?", "options": ["1. 아래", "2. 위", "3. 왼쪽", '
+    '"4. 오른쪽"], "correct_answer": 1, "explanation": "아래에 있어요.", "encouragement": "잘하셨어요!"}\n```',
+)
+# 스키마 결함: structured output(json_schema)을 쓰면 나오지 않음
+SCHEMA_DEFECTS = (
+    '{"question": "송금 버튼은?", "options": ["아래", "위", "왼쪽", "오른쪽"], '
+    '"correct_answer": "1번", "explanation": "아래에 있어요.", "encouragement": "잘하셨어요!"}',
+    '{"question": "송금 버튼은?", "options": ["1) 아래", "2) 위", "3) 왼쪽", "4) 오른쪽"], '
+    '"answer": "아래", "explanation": "아래에 있어요."}',
+    '{"question": "송금 버튼은?", "options": ["1. 아래", "2. 위", "3. 왼쪽", "4. 오른쪽"], "correct_answer": 7, '
+    '"explanation": "아래에 있어요.", "encouragement": "잘하셨어요!"}',
+    '{"question": "송금 버튼은?", "options": ["1. 아래", "2. 위", "3. 왼쪽"], "correct_answer": 1, '
+    '"explanation": "아래에 있어요.", "encouragement": "잘하셨어요!"}',
+)
+
+
+@dataclass
+class FakeSettings:
+    latency: str = "lognormal"      # fixed / uniform / lognormal
+    latency_ms: float = 600.0       # 전체 응답 지연 중앙값 (스트리밍은 첫 토큰까지)
+    latency_spread: float = 0.5     # uniform: ±비율, lognormal: 시그마
+    token_interval_ms: float = 15.0 # 스트리밍 토큰 간격
+    completion_tokens: int = 120
+    rate_limit_ratio: float = 0.0
+    retry_after_ms: int = 200
+    error_ratio: float = 0.0
+    malformed_ratio: float = 0.0
+    slow_model: str = ""            # 이 모델만 지연을 slow_factor배로 (모델 라우팅 대체 전환 확인용)
+    slow_factor: float = 1.0
+    seed: Optional[int] = None
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """FakeSettings 항목을 --옵션으로 추가 (bench_load.py와 공유)"""
+    for field in fields(FakeSettings):
+        option = "--" + field.name.replace("_", "-")
+        kind = int if field.name == "seed" else field.type
+        parser.add_argument(option, type=kind, default=field.default)
+
+
+def settings_from_args(args: argparse.Namespace) -> FakeSettings:
+    return FakeSettings(**{field.name: getattr(args, field.name) for field in fields(FakeSettings)})
+
+
+def estimate_prompt_tokens(messages: List[Dict]) -> int:
+    return sum(len(str(m.get("content", ""))) // 2 + 4 for m in messages)
+
+
+def is_quiz_request(messages: List[Dict]) -> bool:
+    last = str(messages[-1].get("content", "")) if messages else ""
+    return "퀴즈" in last and "JSON" in last
+
+
+def create_app(settings: FakeSettings) -> FastAPI:
+    app = FastAPI(title="fake-openai")
+    rng = random.Random(settings.seed)
+    counts: Counter = Counter()
+    lock = threading.Lock()
+
+    def count(name: str):
+        with lock:
+            counts[name] += 1
+
+    def delay(model: str) -> float:
+        base = settings.latency_ms / 1000
+        if settings.slow_model and model == settings.slow_model:
+            base *= settings.slow_factor
+        if settings.latency == "fixed":
+            return base
+        if settings.latency == "uniform":
+            return base * rng.uniform(1 - settings.latency_spread, 1 + settings.latency_spread)
+        return base * math.exp(rng.gauss(0, settings.latency_spread))
+
+    def content_for(messages: List[Dict], response_format: Optional[Dict]) -> str:
+        if not is_quiz_request(messages):
+            return (CHAT_TEXT * (settings.completion_tokens // len(CHAT_TEXT) + 1))[:settings.completion_tokens * 2]
+
+        kind = (response_format or {}).get("type")
+        defects = {"json_schema": (), "json_object": SCHEMA_DEFECTS}.get(kind, SYNTAX_DEFECTS + SCHEMA_DEFECTS)
+        if defects and rng.random() < settings.malformed_ratio:
+            count("malformed")
+            return rng.choice(defects)
+        return json.dumps(QUIZ, ensure_ascii=False)
+
+    def envelope(body: Dict, kind: str) -> Dict:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": kind,
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+        }
+
+    def usage(prompt_tokens: int) -> Dict:
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": settings.completion_tokens,
+            "total_tokens": prompt_tokens + settings.completion_tokens
+        }
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "fake"}]}
+
+    @app.get("/stats")
+    async def stats():
+        with lock:
+            return dict(counts)
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        count("requests")
+
+        roll = rng.random()
+        if roll < settings.rate_limit_ratio:
+            count("rate_limited")
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after-ms": str(settings.retry_after_ms)}
+            )
+        if roll < settings.rate_limit_ratio + settings.error_ratio:
+            count("server_error")
+            await asyncio.sleep(delay(body.get("model", "")))
+            return JSONResponse(
+                {"error": {"message": "Internal error (fake)", "type": "server_error", "code": None}},
+                status_code=500
+            )
+
+        content = content_for(messages, body.get("response_format"))
+        prompt_tokens = estimate_prompt_tokens(messages)
+
+        if body.get("stream"):
+            count("streams")
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                stream(body, content, prompt_tokens, include_usage),
+                media_type="text/event-stream"
+            )
+
+        await asyncio.sleep(delay(body.get("model", "")))
+        count(f"model:{body.get('model', '')}")
+        return {
+            **envelope(body, "chat.completion"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage(prompt_tokens)
+        }
+
+    async def stream(body: Dict, content: str, prompt_tokens: int, include_usage: bool):
+        head = envelope(body, "chat.completion.chunk")
+        pieces = [content[i:i + 2] for i in range(0, len(content), 2)]
+
+        await asyncio.sleep(delay(body.get("model", "")))
+        count(f"model:{body.get('model', '')}")
+        for i, piece in enumerate(pieces):
+            if i:
+                await asyncio.sleep(settings.token_interval_ms / 1000)
+            chunk = {**head, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+        last = {**head, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(last)}\n\n"
+        if include_usage:
+            yield f"data: {json.dumps({**head, 'choices': [], 'usage': usage(prompt_tokens)})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 가짜 OpenAI 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
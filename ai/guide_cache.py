@@ -0,0 +1,244 @@
+"""
+get_topic_guide 응답 캐시
+
+- 1차: 메모리 LRU (히트 시 dict 조회 한 번, 1ms 미만)
+- 2차: 디스크 (JSON 파일, 재시작 후에도 유지)
+- 키: 주제 + 모델 + 시스템 프롬프트 해시 + temperature + 캐시 버전
+- TTL / 개수 제한으로 만료, 주제별 N개 변형(variant)을 돌려가며 제공
+- 디스크 읽기·쓰기는 잠금 밖에서 (메모리 히트가 디스크 작업을 기다리지 않게),
+  비동기 경로(aget / aput / afilled)는 디스크를 건드릴 때만 스레드로 넘김
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 저장 포맷이나 프롬프트 구성 방식이 바뀌면 올려서 기존 캐시를 무효화
+CACHE_VERSION = 1
+
+
+class GuideCache:
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: float = 7 * 24 * 3600,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 2048,
+        variants: int = 1
+    ):
+        """
+        Args:
+            cache_dir: 디스크 캐시 경로 (None이면 메모리만 사용)
+            ttl: 변형 하나의 유효 시간(초)
+            max_memory_entries: 메모리 LRU 최대 키 개수
+            max_disk_entries: 디스크 최대 파일 개수 (초과 시 오래된 것부터 삭제)
+            variants: 주제별로 모아둘 응답 개수 (모이기 전까지는 미스로 처리)
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.variants = max(1, variants)
+
+        self._memory: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._rotation: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(topic: str, model: str, system_prompt: str, temperature: float) -> str:
+        """캐시 키 생성"""
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        raw = json.dumps(
+            [CACHE_VERSION, topic, model, prompt_hash, temperature],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        캐시된 가이드 텍스트 조회
+
+        변형이 variants개 모두 모였을 때만 히트이며, 히트마다 다음 변형으로 순환합니다.
+        """
+        now = time.time()
+
+        with self._lock:
+            entries = self._memory.get(key)
+            if entries is not None:
+                self._memory.move_to_end(key)
+                return self._pick(key, entries, "memory_hits", now)
+
+        loaded = self._load(key)
+        with self._lock:
+            entries = self._memory.get(key)
+            if entries is None and loaded:
+                entries = loaded
+                self._remember(key, entries)
+            return self._pick(key, entries, "disk_hits", now)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get()의 비동기 버전 (메모리에 없어 디스크를 읽어야 할 때만 스레드에서)"""
+        if self._needs_disk(key):
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    def filled(self, key: str) -> int:
+        """모아 둔(만료 전) 변형 개수 (통계에는 넣지 않음)"""
+        now = time.time()
+        with self._lock:
+            entries = self._memory.get(key)
+            if entries is not None:
+                return sum(1 for e in entries if now - e["created_at"] < self.ttl)
+        entries = self._load(key) or []
+        return sum(1 for e in entries if now - e["created_at"] < self.ttl)
+
+    async def afilled(self, key: str) -> int:
+        """filled()의 비동기 버전"""
+        if self._needs_disk(key):
+            return await asyncio.to_thread(self.filled, key)
+        return self.filled(key)
+
+    def put(self, key: str, text: str, topic: str = ""):
+        """새 변형 저장 (variants개를 넘으면 가장 오래된 변형부터 교체)"""
+        loaded = None if self._in_memory(key) else self._load(key)
+        with self._lock:
+            entries = self._memory.get(key)
+            if entries is None:
+                entries = loaded or []
+
+            entries.append({"text": text, "created_at": time.time()})
+            del entries[:-self.variants]
+
+            self._remember(key, entries)
+            saved = list(entries)
+        self._save(key, topic, saved)
+
+    async def aput(self, key: str, text: str, topic: str = ""):
+        """put()의 비동기 버전 (디스크 캐시를 쓰면 파일 쓰기·정리를 스레드에서)"""
+        if self.cache_dir:
+            await asyncio.to_thread(self.put, key, text, topic)
+        else:
+            self.put(key, text, topic)
+
+    def clear(self):
+        """메모리/디스크 캐시 전체 삭제"""
+        with self._lock:
+            self._memory.clear()
+            self._rotation.clear()
+            for path in self._disk_files():
+                os.remove(path)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self._stats.values())
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+    # ========== 내부 ==========
+
+    def _in_memory(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory
+
+    def _needs_disk(self, key: str) -> bool:
+        return bool(self.cache_dir) and not self._in_memory(key)
+
+    def _pick(self, key: str, entries: Optional[List[Dict]], source: str, now: float) -> Optional[str]:
+        """만료된 변형을 정리하고 순서대로 하나 고름 (self._lock 안에서 호출)"""
+        if entries:
+            fresh = [e for e in entries if now - e["created_at"] < self.ttl]
+            if len(fresh) != len(entries):
+                entries[:] = fresh
+
+        if not entries or len(entries) < self.variants:
+            self._stats["misses"] += 1
+            return None
+
+        index = self._rotation.get(key, 0) % len(entries)
+        self._rotation[key] = index + 1
+        self._stats[source] += 1
+        return entries[index]["text"]
+
+    def _remember(self, key: str, entries: List[Dict]):
+        self._memory[key] = entries
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            old_key, _ = self._memory.popitem(last=False)
+            self._rotation.pop(old_key, None)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _disk_files(self) -> List[str]:
+        if not self.cache_dir:
+            return []
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".json")
+        ]
+
+    def _load(self, key: str) -> Optional[List[Dict]]:
+        if not self.cache_dir:
+            return None
+
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"가이드 캐시 파일 손상: {key} ({e})")
+            return None
+
+        if data.get("version") != CACHE_VERSION:
+            return None
+        return data.get("variants", [])
+
+    def _save(self, key: str, topic: str, entries: List[Dict]):
+        if not self.cache_dir:
+            return
+
+        # 임시 파일에 쓴 뒤 교체 → 다른 프로세스가 반쯤 쓴 파일을 읽지 않음
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": CACHE_VERSION, "topic": topic, "variants": entries},
+                    f,
+                    ensure_ascii=False
+                )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"가이드 캐시 저장 실패: {e}")
+            return
+
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = self._disk_files()
+        if len(files) <= self.max_disk_entries:
+            return
+
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,259 @@
+"""
+오프라인 가이드 팩 (미리 만들어 검수한 가이드 묶음)
+
+알려진 주제(가이드 주제 + 앱 "app_토스" 등)의 가이드를 미리 생성·검증해 파일 하나로 묶고,
+SonjuAI는 mmap으로 열어 네트워크 없이 바로 제공합니다.
+텍스트는 페이지 캐시를 통해 프로세스끼리 공유되고, 프로세스마다 들고 있는 것은 작은 색인뿐입니다.
+
+파일 구조 (리틀 엔디언)
+    헤더   : magic "SJGP" | 포맷 버전 u16 | 항목 수 u32 | 색인 위치 u64 | 색인 길이 u32 | 메타 위치 u64 | 메타 길이 u32
+    본문   : 가이드 텍스트(UTF-8)를 이어 붙인 영역
+    색인   : 항목마다 주제 길이 u16 | 주제(UTF-8) | 본문 위치 u64 | 길이 u32 | crc32 u32
+    메타   : JSON (팩 버전, 생성 시각, 모델, 시스템 프롬프트 해시)
+
+실행:
+    python guide_pack.py build [--out guides.pack] [--topics 토스_송금 app_토스 ...]
+    python guide_pack.py list [--pack guides.pack]
+    python guide_pack.py verify [--pack guides.pack]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SJGP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHIQIQI")
+ENTRY = struct.Struct("<QII")
+TOPIC_LENGTH = struct.Struct("<H")
+
+# 검증 기준
+MIN_GUIDE_CHARS = 80
+MAX_GUIDE_CHARS = 3000
+REFUSAL_MARKERS = ("죄송", "AI 언어 모델", "도와드릴 수 없")
+SENTENCE_ENDINGS = (".", "!", "?", "요", "다", ")", "~")
+
+
+def prompt_hash(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class GuidePack:
+    """읽기 전용 가이드 팩 (mmap)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, index_offset, index_length, meta_offset, meta_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"가이드 팩 파일이 아닙니다: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 가이드 팩 포맷 버전: {version}")
+
+        self.meta: Dict = json.loads(self._mm[meta_offset:meta_offset + meta_length].decode("utf-8"))
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        position = index_offset
+        for _ in range(count):
+            (topic_length,) = TOPIC_LENGTH.unpack_from(self._mm, position)
+            position += TOPIC_LENGTH.size
+            topic = self._mm[position:position + topic_length].decode("utf-8")
+            position += topic_length
+            self._index[topic] = ENTRY.unpack_from(self._mm, position)
+            position += ENTRY.size
+        if position != index_offset + index_length:
+            raise ValueError(f"가이드 팩 색인이 손상되었습니다: {path}")
+
+    @classmethod
+    def open(cls, path: Optional[str]) -> Optional["GuidePack"]:
+        """파일이 없거나 읽을 수 없으면 None (라이브 생성으로 동작)"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"가이드 팩을 열 수 없습니다 ({path}): {e}")
+            return None
+
+    def get(self, topic: str) -> Optional[str]:
+        entry = self._index.get(topic)
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        return self._mm[offset:offset + length].decode("utf-8")
+
+    def topics(self) -> List[str]:
+        return list(self._index)
+
+    def __contains__(self, topic: str) -> bool:
+        return topic in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def verify(self) -> List[str]:
+        """crc가 맞지 않는 주제 목록"""
+        return [
+            topic
+            for topic, (offset, length, crc) in self._index.items()
+            if zlib.crc32(self._mm[offset:offset + length]) != crc
+        ]
+
+    def close(self):
+        self._mm.close()
+
+
+def write_pack(path: str, guides: Dict[str, str], meta: Dict):
+    """가이드 dict → 팩 파일 (임시 파일에 쓰고 교체하므로 읽는 쪽은 항상 완전한 파일을 봄)"""
+    body = bytearray()
+    index = bytearray()
+    for topic in sorted(guides):
+        data = guides[topic].encode("utf-8")
+        offset = HEADER.size + len(body)
+        body += data
+        encoded_topic = topic.encode("utf-8")
+        index += TOPIC_LENGTH.pack(len(encoded_topic)) + encoded_topic
+        index += ENTRY.pack(offset, len(data), zlib.crc32(data))
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    index_offset = HEADER.size + len(body)
+    meta_offset = index_offset + len(index)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(guides), index_offset, len(index), meta_offset, len(meta_bytes)
+    )
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(body)
+        f.write(index)
+        f.write(meta_bytes)
+    os.replace(tmp_path, path)
+
+
+def validate_guide(text: Optional[str]) -> Optional[str]:
+    """가이드 검증 (문제가 있으면 사유, 없으면 None)"""
+    if not text or not text.strip():
+        return "빈 응답"
+    text = text.strip()
+    if len(text) < MIN_GUIDE_CHARS:
+        return f"너무 짧음 ({len(text)}자)"
+    if len(text) > MAX_GUIDE_CHARS:
+        return f"너무 김 ({len(text)}자)"
+    if any(marker in text for marker in REFUSAL_MARKERS):
+        return "거절·사과 문구 포함"
+    if not text.endswith(SENTENCE_ENDINGS):
+        return "문장이 끝나지 않음 (max_tokens에서 잘렸을 수 있음)"
+    return None
+
+
+def known_topics(table_path: Optional[str] = None) -> List[str]:
+    """팩에 넣을 주제: 가이드 문장이 정해진 주제 + 의도 테이블의 가이드·앱 주제"""
+    from ai_service import GUIDE_PROMPTS
+    from intent import DEFAULT_TABLE_PATH
+
+    with open(table_path or DEFAULT_TABLE_PATH, encoding="utf-8") as f:
+        table = json.load(f)
+
+    topics = list(GUIDE_PROMPTS)
+    for entry in table["guide"]["topics"]:
+        topic = entry.get("guide_topic", entry["topic"])
+        if topic not in topics:
+            topics.append(topic)
+    return topics
+
+
+def build(out: str, topics: List[str], attempts: int = 3) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    주제별 가이드를 생성·검증해 팩으로 저장
+
+    Returns:
+        (성공한 가이드, 실패한 주제 → 사유)
+    """
+    from ai_service import SonjuAI
+    from config import config
+    from priority_scheduler import priority
+
+    # 빌드에는 퀴즈 풀·워밍업이 필요 없음
+    config.QUIZ_POOL_ENABLED = False
+    config.WARMUP_ON_START = False
+    ai = SonjuAI()
+    guides: Dict[str, str] = {}
+    failures: Dict[str, str] = {}
+
+    for topic in topics:
+        for attempt in range(1, attempts + 1):
+            with priority("background"):
+                result = ai.generate_topic_guide(topic)
+            reason = validate_guide(result.get("message")) if result["success"] else result.get("error", "호출 실패")
+            if reason is None:
+                guides[topic] = result["message"].strip()
+                print(f"  ✓ {topic} ({len(guides[topic])}자)")
+                failures.pop(topic, None)
+                break
+            failures[topic] = reason
+            print(f"  ✗ {topic} ({attempt}/{attempts}): {reason}")
+
+    route = ai.router.route("get_topic_guide")
+    meta = {
+        "pack_version": time.strftime("%Y%m%d%H%M%S"),
+        "created": time.time(),
+        "model": route["model"],
+        "temperature": route["temperature"],
+        "system_prompt_hash": prompt_hash(ai.system_prompt),
+        "topics": len(guides)
+    }
+    if guides:
+        write_pack(out, guides, meta)
+    return guides, failures
+
+
+def main():
+    from config import config
+
+    parser = argparse.ArgumentParser(description="오프라인 가이드 팩 만들기 / 확인")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="알려진 주제의 가이드를 생성해 팩으로 저장")
+    build_parser.add_argument("--out", default=config.GUIDE_PACK_PATH)
+    build_parser.add_argument("--topics", nargs="+", default=None, help="기본: 알려진 주제 전체")
+    build_parser.add_argument("--attempts", type=int, default=3, help="검증 실패 시 주제당 최대 시도 횟수")
+
+    for name in ("list", "verify"):
+        sub_parser = sub.add_parser(name)
+        sub_parser.add_argument("--pack", default=config.GUIDE_PACK_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        topics = args.topics or known_topics()
+        print(f"가이드 {len(topics)}개 생성 → {args.out}")
+        guides, failures = build(args.out, topics, args.attempts)
+        print(f"\n저장 {len(guides)}개, 실패 {len(failures)}개")
+        for topic, reason in failures.items():
+            print(f"  - {topic}: {reason}")
+        sys.exit(1 if failures else 0)
+
+    pack = GuidePack(args.pack)
+    if args.command == "list":
+        print(json.dumps(pack.meta, ensure_ascii=False, indent=2))
+        for topic in pack.topics():
+            print(f"  {topic}: {len(pack.get(topic))}자")
+    else:
+        broken = pack.verify()
+        print(f"{len(pack)}개 중 손상 {len(broken)}개" + (f": {', '.join(broken)}" if broken else ""))
+        sys.exit(1 if broken else 0)
+
+
+if __name__ == "__main__":
+    main()
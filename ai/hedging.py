@@ -0,0 +1,241 @@
+"""
+헤지 요청 (느린 꼬리 지연 줄이기)
+
+첫 호출이 최근 지연의 percentile 분위 시간 안에 끝나지 않으면 같은 요청을 하나 더 보내고,
+먼저 끝난 응답을 쓰고 나머지는 취소합니다.
+
+- 지연 기준: 메서드별 최근 window건의 지연 분위수 (표본이 적으면 default_delay)
+- 비율 상한: 호출 1건마다 max_ratio만큼 크레딧이 쌓이고 헤지 1건에 1을 씀
+  (장기적으로 헤지 수 ≤ 호출 수 × max_ratio, 한가할 때 쌓아 둘 수 있는 양은 burst까지)
+- 한도: reserve()를 주면 헤지마다 따로 예약을 받고, 받지 못하면(한도가 찼으면) 헤지하지 않음
+- 추가 비용: 진 쪽 요청의 토큰을 extra_tokens로 집계 (cost(결과, 보냈는지)로 헤지 예약도 보정)
+  (비동기는 취소되므로 프롬프트 추정치, 동기는 스레드를 멈출 수 없어 끝난 뒤 실제 사용량,
+   진 쪽이 실패했으면 프롬프트 추정치, 시작 전에 취소됐으면 0)
+- 동기 호출의 헤지 타이머는 첫 호출이 스레드에서 실제로 시작될 때부터 잼 (실행기 대기 시간 제외)
+
+fn에는 업스트림 호출만 넘깁니다 (대기열·요청량 대기가 지연 표본과 헤지 타이머에 섞이지 않게).
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    def __init__(
+        self,
+        percentile: float = 0.9,
+        max_ratio: float = 0.1,
+        burst: float = 5.0,
+        window: int = 200,
+        min_samples: int = 20,
+        default_delay: float = 3.0,
+        min_delay: float = 0.5,
+        max_workers: int = 16
+    ):
+        """
+        Args:
+            percentile: 이 분위의 최근 지연을 넘기면 헤지 (0.9 = p90)
+            max_ratio: 호출 대비 헤지 비율 상한
+            burst: 쌓아 둘 수 있는 헤지 크레딧 최대치
+            window: 메서드별로 유지할 최근 지연 수
+            min_samples: 분위수를 쓰기 위한 최소 표본 수
+            default_delay: 표본이 부족할 때 헤지 대기 시간(초)
+            min_delay: 헤지 대기 시간 하한(초, 짧은 응답에 헤지가 몰리지 않게)
+            max_workers: 동기 호출용 스레드 수
+        """
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.burst = burst
+        self.window = window
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._credits = burst
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "denied": 0, "extra_tokens": 0}
+
+    # ========== 호출 ==========
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        label: str = "",
+        cost: Callable[[Optional[T], bool], int] = None,
+        reserve: Callable[[], bool] = None
+    ) -> T:
+        """
+        fn()을 실행하고, 늦어지면 한 번 더 실행해 먼저 끝난 결과 반환
+
+        Args:
+            fn: 업스트림 호출 (같은 요청을 두 번 불러도 안전해야 함)
+            label: 지연 통계를 나누는 이름 (메서드명)
+            cost: (진 쪽 결과 - 취소·실패면 None, 업스트림에 보냈는지) → 추가로 쓴 토큰 수
+            reserve: 헤지 직전에 호출, False면 헤지하지 않음 (요청량 한도 예약)
+        """
+        delay = self._begin(label)
+        executor = self._pool()
+        began = threading.Event()
+        primary = executor.submit(self._timed, fn, label, began)
+        # 실행기 스레드가 모두 바쁘면 대기열에서 기다린 시간은 헤지 대기 시간에 넣지 않음
+        began.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._allow(reserve):
+            return primary.result()
+
+        hedge = executor.submit(self._timed, fn, label)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._won(future is hedge)
+                    for loser in pending:
+                        if loser.cancel():
+                            # 시작 전에 취소 - 보내지 않았으므로 0
+                            self._extra(cost(None, False) if cost else 0)
+                        else:
+                            # 실행 중인 스레드는 멈출 수 없으므로 끝난 뒤 실제 사용량(실패면 추정치)을 집계
+                            loser.add_done_callback(lambda f: self._loser_done(f, cost))
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        label: str = "",
+        cost: Callable[[Optional[T], bool], int] = None,
+        reserve: Callable[[], bool] = None
+    ) -> T:
+        """call()의 비동기 버전 (진 쪽 요청은 취소)"""
+        delay = self._begin(label)
+        primary = asyncio.ensure_future(self._atimed(fn, label))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not self._allow(reserve):
+                return await primary
+
+            hedge = asyncio.ensure_future(self._atimed(fn, label))
+            pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._won(task is hedge)
+                        if pending:
+                            self._extra(cost(None, True) if cost else 0)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # ========== 조회 ==========
+
+    def delay(self, label: str = "") -> float:
+        """지금 헤지를 보낼 대기 시간(초)"""
+        with self._lock:
+            return self._delay(label)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self._stats["calls"]
+            return {
+                **self._stats,
+                "hedge_ratio": self._stats["hedged"] / calls if calls else 0.0,
+                "credits": round(self._credits, 2),
+                "delays": {label: round(self._delay(label), 3) for label in self._latencies}
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # ========== 내부 ==========
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+            return self._executor
+
+    def _begin(self, label: str) -> float:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._credits = min(self.burst, self._credits + self.max_ratio)
+            return self._delay(label)
+
+    def _delay(self, label: str) -> float:
+        samples = self._latencies.get(label)
+        if not samples or len(samples) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(samples)
+        return max(self.min_delay, ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))])
+
+    def _allow(self, reserve: Callable[[], bool] = None) -> bool:
+        with self._lock:
+            if self._credits < 1:
+                self._stats["denied"] += 1
+                return False
+            self._credits -= 1
+        if reserve is not None and not reserve():
+            with self._lock:
+                self._credits += 1
+                self._stats["denied"] += 1
+            return False
+        with self._lock:
+            self._stats["hedged"] += 1
+        return True
+
+    def _won(self, hedge: bool):
+        if hedge:
+            with self._lock:
+                self._stats["hedge_wins"] += 1
+
+    def _extra(self, tokens: Optional[int]):
+        if tokens:
+            with self._lock:
+                self._stats["extra_tokens"] += tokens
+
+    def _loser_done(self, future, cost):
+        if cost:
+            failed = future.cancelled() or future.exception() is not None
+            self._extra(cost(None if failed else future.result(), True))
+
+    def _record(self, label: str, seconds: float):
+        with self._lock:
+            samples = self._latencies.get(label)
+            if samples is None:
+                samples = self._latencies[label] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def _timed(self, fn: Callable[[], T], label: str, began: Optional[threading.Event] = None) -> T:
+        if began is not None:
+            began.set()
+        started = time.perf_counter()
+        result = fn()
+        self._record(label, time.perf_counter() - started)
+        return result
+
+    async def _atimed(self, fn: Callable[[], Awaitable[T]], label: str) -> T:
+        started = time.perf_counter()
+        result = await fn()
+        self._record(label, time.perf_counter() - started)
+        return result
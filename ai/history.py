@@ -0,0 +1,184 @@
+"""
+토큰 예산 기반 대화 히스토리 관리
+
+- 메시지 개수가 아니라 토큰 수로 히스토리를 자름 (긴 가이드 답변이 프롬프트를 키우지 않도록)
+- 예산을 넘으면 오래된 대화를 (질문·답 한 쌍 단위로) 요약문에 바로 합침
+  (접은 대화가 요약되기 전까지 프롬프트에서 빠지는 일이 없게, 요약 호출이 잦지 않게
+   한 번 접을 때 summary_trigger만큼 여유가 생기도록 넉넉히 접음)
+- 토큰 수는 로컬 추정 (tiktoken이 설치되어 있으면 사용, 없으면 글자 수 기반 근사)
+"""
+import logging
+import math
+import re
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 메시지 하나당 role/구분자 오버헤드 (OpenAI chat 포맷 기준 근사값)
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_PREFIX = "이전 대화 요약: "
+
+_HANGUL = re.compile(r"[가-힣ㄱ-ㆎ]")
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """텍스트 토큰 수 추정"""
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+
+    # 근사: 한글 한 글자 ≈ 1토큰, 그 외 문자는 4글자 ≈ 1토큰
+    hangul = len(_HANGUL.findall(text))
+    return hangul + math.ceil((len(text) - hangul) / 4)
+
+
+def message_tokens(messages: List[Dict]) -> int:
+    """메시지 목록 전체 토큰 수 추정"""
+    return sum(
+        estimate_tokens(m.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+        for m in messages
+    )
+
+
+def trim_history(history: List[Dict], budget: int) -> List[Dict]:
+    """
+    토큰 예산 안에 들어가는 최근 메시지만 남김
+
+    맨 앞의 system 메시지(요약문)는 항상 유지하고, 나머지는 최신 것부터 채웁니다.
+    """
+    if not history:
+        return []
+
+    pinned = []
+    for message in history:
+        if message.get("role") != "system":
+            break
+        pinned.append(message)
+
+    remaining = budget - message_tokens(pinned)
+    kept = []
+    for message in reversed(history[len(pinned):]):
+        cost = message_tokens([message])
+        if cost > remaining:
+            break
+        kept.append(message)
+        remaining -= cost
+
+    return pinned + kept[::-1]
+
+
+class ConversationMemory:
+    def __init__(
+        self,
+        summarize: Optional[Callable[[str, List[Dict]], str]] = None,
+        budget: int = 1200,
+        summary_trigger: int = 600
+    ):
+        """
+        Args:
+            summarize: (이전 요약, 접을 메시지들) → 새 요약문 (None이면 요약 없이 버림)
+            budget: 프롬프트에 넣을 히스토리(요약 포함) 최대 토큰
+            summary_trigger: 예산을 넘었을 때 한 번에 접을 양 (접은 뒤 예산보다 이만큼 여유가 생기도록,
+                클수록 요약 호출이 드물고 최근 대화는 짧아짐)
+        """
+        self.summarize = summarize
+        self.budget = budget
+        self.summary_trigger = min(summary_trigger, budget // 2)
+
+        self.summary = ""
+        self.recent: List[Dict] = []
+
+        self._total_tokens = 0
+        self._stats = {
+            "prompts": 0,
+            "prompt_tokens_sent": 0,
+            "prompt_tokens_saved": 0,
+            "summaries": 0
+        }
+
+    def add(self, role: str, content: str):
+        message = {"role": role, "content": content}
+        self.recent.append(message)
+        self._total_tokens += message_tokens([message])
+        self._fold()
+
+    def add_turn(self, user_message: str, assistant_message: str):
+        self.add("user", user_message)
+        self.add("assistant", assistant_message)
+
+    def history(self) -> List[Dict]:
+        """chat()에 넘길 히스토리 (요약문 + 예산 안의 최근 대화)"""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + self.summary})
+        messages.extend(self.recent)
+
+        sent = message_tokens(messages)
+        self._stats["prompts"] += 1
+        self._stats["prompt_tokens_sent"] += sent
+        self._stats["prompt_tokens_saved"] += max(0, self._total_tokens - sent)
+        return messages
+
+    def clear(self):
+        self.summary = ""
+        self.recent.clear()
+        self._total_tokens = 0
+
+    def stats(self) -> Dict:
+        """절약한 프롬프트 토큰 등 통계 (전체 히스토리를 보냈을 경우 대비)"""
+        return {
+            **self._stats,
+            "summary_tokens": estimate_tokens(self.summary),
+            "recent_messages": len(self.recent)
+        }
+
+    def _summary_tokens(self) -> int:
+        if not self.summary:
+            return 0
+        return estimate_tokens(SUMMARY_PREFIX + self.summary) + MESSAGE_OVERHEAD_TOKENS
+
+    def _over(self, limit: int) -> bool:
+        return self._summary_tokens() + message_tokens(self.recent) > limit
+
+    def _oldest_turn(self) -> int:
+        """가장 오래된 대화 한 쌍의 메시지 수 (사용자 메시지 + 다음 사용자 메시지 전까지의 답)"""
+        end = 1
+        while end < len(self.recent) and self.recent[end]["role"] != "user":
+            end += 1
+        return end
+
+    def _fold(self):
+        """예산을 넘으면 오래된 대화를 쌍 단위로 떼어 바로 요약 (가장 최근 한 쌍은 남김)"""
+        while self._over(self.budget):
+            folded: List[Dict] = []
+            while self._over(self.budget - self.summary_trigger) and self._oldest_turn() < len(self.recent):
+                count = self._oldest_turn()
+                folded.extend(self.recent[:count])
+                del self.recent[:count]
+            if not folded:
+                # 최근 한 쌍만으로 예산을 넘음 - 그대로 두고 trim_history가 자름
+                return
+
+            if self.summarize is None:
+                continue
+            summary = self.summarize(self.summary, folded)
+            if summary:
+                self.summary = summary
+                self._stats["summaries"] += 1
+            else:
+                logger.warning("대화 요약 실패 - 이전 요약 유지")
@@ -0,0 +1,299 @@
+"""
+OpenAI 클라이언트 공용 팩토리 (연결 풀 공유 + 미리 연결)
+
+SonjuAI, local_chatbot.py, test_connection.py가 모두 여기서 클라이언트를 받습니다.
+프로세스 안에서 동기 클라이언트 하나, 비동기 클라이언트는 이벤트 루프마다 하나를 만들어 공유하므로
+클라이언트마다 자기 keep-alive 연결 풀을 계속 재사용하고, 요청마다 TCP·TLS 연결을 새로 맺지 않습니다.
+(동기·비동기, 루프마다 풀이 따로라 서로 연결을 나눠 쓰지는 않음 - warm()은 동기 풀, awarm()은 그 루프의 풀)
+
+- HTTP/2 (config.OPENAI_HTTP2): 연결 하나로 여러 요청을 동시에 보냄, h2 패키지가 없으면 HTTP/1.1
+- 풀 크기·keep-alive 유지 시간·타임아웃: config.OPENAI_*
+- warm() / awarm(): 시작할 때 모델 목록 조회(토큰 사용 없음)로 연결을 미리 열어 둠
+- stats(): 풀의 연결 수(사용 중 / 쉬는 중), 새로 연 연결 수, 연결 재사용 비율
+
+openai·httpx import는 클라이언트를 처음 만들 때 일어납니다 (시작 시간에 영향 없음).
+"""
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def _httpx():
+    """openai SDK가 쓰는 httpx 모듈 (SDK 버전에 따라 httpx2)"""
+    try:
+        import httpx2
+        return httpx2
+    except ImportError:
+        import httpx
+        return httpx
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class _PoolCounter:
+    """요청 수와 새로 연 연결 수 (응답 훅에서 풀을 보고 처음 보는 연결을 셈)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.opened = 0
+        self._seen: "weakref.WeakSet" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def observe(self, pool):
+        with self._lock:
+            self.requests += 1
+            for connection in list(getattr(pool, "connections", ())):
+                if connection not in self._seen:
+                    self._seen.add(connection)
+                    self.opened += 1
+
+
+def _pool(http_client):
+    """httpx 클라이언트의 연결 풀 (구조가 다르면 None)"""
+    return getattr(getattr(http_client, "_transport", None), "_pool", None)
+
+
+class ClientFactory:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive: int = 50,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        pool_timeout: float = 10.0,
+        max_retries: int = 0
+    ):
+        """
+        Args:
+            api_key / base_url: OpenAI 접속 정보 (base_url이 None이면 공식 API)
+            http2: HTTP/2 사용 (h2 패키지가 없으면 경고 후 HTTP/1.1)
+            max_connections: 풀의 최대 연결 수
+            max_keepalive: 요청이 없을 때도 열어 둘 연결 수
+            keepalive_expiry: 쉬는 연결을 닫기까지의 시간(초)
+            connect_timeout / read_timeout / pool_timeout: 연결·응답 대기·빈 연결 대기 시간(초)
+            max_retries: SDK 자체 재시도 (SonjuAI는 rate_limiter가 재시도하므로 0)
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.http2 = http2 and http2_available()
+        if http2 and not self.http2:
+            logger.warning("h2 패키지가 없어 HTTP/1.1로 연결합니다. (pip install h2)")
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+        self.max_retries = max_retries
+
+        self._lock = threading.Lock()
+        self._sync = None
+        self._sync_counter = _PoolCounter()
+        # 비동기 연결은 만든 이벤트 루프에 묶이므로 루프마다 따로 (루프 없이 만든 것은 처음 쓰는 루프가 가져감)
+        self._async: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._unbound = None
+        self._async_counter = _PoolCounter()
+
+    # ========== 클라이언트 ==========
+
+    def sync_client(self):
+        """공유 동기 OpenAI 클라이언트"""
+        if self._sync is None:
+            with self._lock:
+                if self._sync is None:
+                    from openai import DefaultHttpxClient, OpenAI
+                    counter = self._sync_counter
+                    http_client = DefaultHttpxClient(
+                        **self._http_options(),
+                        event_hooks={"response": [lambda response: counter.observe(_pool(http_client))]}
+                    )
+                    self._sync = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        max_retries=self.max_retries,
+                        timeout=self._timeout(),
+                        http_client=http_client
+                    )
+        return self._sync
+
+    def async_client(self):
+        """지금 이벤트 루프의 공유 비동기 OpenAI 클라이언트"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        with self._lock:
+            if loop is None:
+                if self._unbound is None:
+                    self._unbound = self._new_async()
+                return self._unbound
+            client = self._async.get(loop)
+            if client is None:
+                client = self._async[loop] = self._unbound or self._new_async()
+                self._unbound = None
+            return client
+
+    # ========== 미리 연결 ==========
+
+    def warm(self, connections: int = 1) -> int:
+        """
+        동기 풀에 연결을 미리 열어 둠 (동시에 모델 목록 조회, HTTP/2면 연결 하나면 충분)
+
+        Returns:
+            성공한 조회 수
+        """
+        client = self.sync_client()
+        count = 1 if self.http2 else max(1, min(connections, self.max_keepalive))
+
+        def ping(_) -> bool:
+            try:
+                client.models.list()
+                return True
+            except Exception as e:
+                logger.warning(f"Warm-up connection failed: {e}")
+                return False
+
+        if count == 1:
+            return int(ping(0))
+        with ThreadPoolExecutor(max_workers=count, thread_name_prefix="sonju-warm") as pool:
+            return sum(pool.map(ping, range(count)))
+
+    async def awarm(self, connections: int = 1) -> int:
+        """warm()의 비동기 버전 (지금 이벤트 루프의 풀)"""
+        client = self.async_client()
+        count = 1 if self.http2 else max(1, min(connections, self.max_keepalive))
+        results = await asyncio.gather(*(client.models.list() for _ in range(count)), return_exceptions=True)
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning(f"Warm-up connection failed: {failures[0]}")
+        return count - len(failures)
+
+    # ========== 조회 / 종료 ==========
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sync_clients = [self._sync] if self._sync is not None else []
+            async_clients = list(self._async.values()) + ([self._unbound] if self._unbound is not None else [])
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry": self.keepalive_expiry,
+            "sync": self._pool_stats(sync_clients, self._sync_counter) if sync_clients else None,
+            "async": self._pool_stats(async_clients, self._async_counter) if async_clients else None
+        }
+
+    def close(self):
+        """동기 클라이언트 닫기"""
+        with self._lock:
+            client, self._sync = self._sync, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self):
+        """지금 이벤트 루프의 비동기 클라이언트와 동기 클라이언트 닫기 (다시 쓰면 새로 만듦)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async.pop(loop, None)
+            unbound, self._unbound = self._unbound, None
+        for c in (client, unbound):
+            if c is not None:
+                await c.close()
+        self.close()
+
+    # ========== 내부 ==========
+
+    def _timeout(self):
+        return _httpx().Timeout(
+            self.read_timeout,
+            connect=self.connect_timeout,
+            pool=self.pool_timeout
+        )
+
+    def _http_options(self) -> Dict:
+        httpx = _httpx()
+        return {
+            "http2": self.http2,
+            "timeout": self._timeout(),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry
+            )
+        }
+
+    def _new_async(self):
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        counter = self._async_counter
+
+        async def observe(response):
+            counter.observe(_pool(http_client))
+
+        http_client = DefaultAsyncHttpxClient(**self._http_options(), event_hooks={"response": [observe]})
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=self.max_retries,
+            timeout=self._timeout(),
+            http_client=http_client
+        )
+
+    def _pool_stats(self, clients: List, counter: _PoolCounter) -> Dict:
+        connections = [
+            connection
+            for client in clients
+            for connection in list(getattr(_pool(client._client), "connections", ()))
+        ]
+        idle = sum(1 for c in connections if c.is_idle())
+        active = len(connections) - idle
+        with counter._lock:
+            requests, opened = counter.requests, counter.opened
+        return {
+            "connections": len(connections),
+            "active": active,
+            "idle": idle,
+            "http2_connections": sum(1 for c in connections if "HTTP/2" in c.info()),
+            "utilization": active / (self.max_connections * len(clients)) if clients else 0.0,
+            "requests": requests,
+            "connections_opened": opened,
+            "reuse_ratio": 1 - opened / requests if requests else 0.0
+        }
+
+
+_shared: Optional[ClientFactory] = None
+_shared_lock = threading.Lock()
+
+
+def get_client_factory() -> ClientFactory:
+    """프로세스 공용 팩토리 (config 값으로 최초 1회 생성)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ClientFactory(
+                api_key=config.OPENAI_API_KEY,
+                base_url=config.OPENAI_BASE_URL,
+                http2=config.OPENAI_HTTP2,
+                max_connections=config.OPENAI_MAX_CONNECTIONS,
+                max_keepalive=config.OPENAI_MAX_KEEPALIVE,
+                keepalive_expiry=config.OPENAI_KEEPALIVE_EXPIRY,
+                connect_timeout=config.OPENAI_CONNECT_TIMEOUT,
+                read_timeout=config.OPENAI_READ_TIMEOUT,
+                pool_timeout=config.OPENAI_POOL_TIMEOUT
+            )
+        return _shared
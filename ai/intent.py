@@ -0,0 +1,167 @@
+"""
+사용자 의도 파악
+
+키워드·주제 테이블(intent_table.json)을 한 번만 Aho-Corasick 오토마톤으로 컴파일해두고,
+메시지를 한 번 훑어서 매칭된 키워드를 모두 찾습니다.
+키워드·앱·주제가 수백 개로 늘어나도 메시지당 비용은 메시지 길이에만 비례합니다.
+
+우선순위 규칙 (기존 run_chatbot.detect_intent와 동일):
+    1. 퀴즈 키워드가 있으면 퀴즈 (주제는 테이블 순서상 가장 앞의 매칭, 없으면 default_topic)
+    2. 가이드 키워드가 있고 주제가 매칭되면 가이드 (테이블 순서상 가장 앞의 주제)
+    3. 그 외에는 일반 대화
+"""
+import json
+import os
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_table.json")
+
+# 매칭 라벨: (그룹, 인덱스)
+#   ("quiz", -1) / ("guide", -1): 퀴즈·가이드 요청 키워드
+#   ("quiz", i) / ("guide", i): 해당 그룹의 i번째 주제 (i가 작을수록 우선)
+Label = Tuple[str, int]
+REQUEST_KEYWORD = -1
+
+
+class AhoCorasick:
+    """다중 패턴 문자열 매칭 오토마톤 (한글 음절 단위로 동작)"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Label]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[Label]] = [set()]
+
+        for pattern, label in patterns:
+            self._add(pattern, label)
+        self._build()
+
+    def _add(self, pattern: str, label: Label):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            node = next_node
+        self._output[node].add(label)
+
+    def _build(self):
+        """BFS로 실패 링크 계산, 출력 집합을 실패 링크 방향으로 합침"""
+        # 루트의 자식은 실패 링크가 루트(0) - 초기값 그대로
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] |= self._output[self._fail[child]]
+
+    def search(self, text: str) -> Set[Label]:
+        """text에 등장하는 모든 패턴의 라벨"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[Label] = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found |= output[node]
+        return found
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+class IntentDetector:
+    def __init__(self, table: Dict):
+        """
+        Args:
+            table: intent_table.json 형식의 dict
+        """
+        self.version = table.get("version")
+        self.quiz_topics: List[Dict] = table["quiz"]["topics"]
+        self.quiz_default_topic: str = table["quiz"]["default_topic"]
+        self.guide_topics: List[Dict] = table["guide"]["topics"]
+
+        patterns = []
+        for group in ("quiz", "guide"):
+            for keyword in table[group]["keywords"]:
+                patterns.append((keyword, (group, REQUEST_KEYWORD)))
+            for i, entry in enumerate(table[group]["topics"]):
+                for keyword in entry["keywords"]:
+                    patterns.append((keyword, (group, i)))
+
+        self.matcher = AhoCorasick(patterns)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_TABLE_PATH) -> "IntentDetector":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def detect(self, message: str) -> Dict:
+        """
+        사용자 의도 파악
+
+        Returns:
+            {"type": "quiz", "topic": str}
+            {"type": "guide", "topic": str, "guide_topic": str}  (guide_topic은 있을 때만)
+            {"type": "chat"}
+        """
+        found = self.matcher.search(message)
+        if not found:
+            return {"type": "chat"}
+
+        if ("quiz", REQUEST_KEYWORD) in found:
+            index = self._best(found, "quiz")
+            topic = self.quiz_default_topic if index is None else self.quiz_topics[index]["topic"]
+            return {"type": "quiz", "topic": topic}
+
+        if ("guide", REQUEST_KEYWORD) in found:
+            index = self._best(found, "guide")
+            if index is not None:
+                entry = self.guide_topics[index]
+                intent = {"type": "guide", "topic": entry["topic"]}
+                if "guide_topic" in entry:
+                    intent["guide_topic"] = entry["guide_topic"]
+                return intent
+
+        return {"type": "chat"}
+
+    def is_how_to(self, message: str) -> bool:
+        """방법을 묻는 질문인지 (가이드 요청 키워드 포함, 주제 매칭과 무관 - 유사 질문 캐시 대상)"""
+        return ("guide", REQUEST_KEYWORD) in self.matcher.search(message)
+
+    def topic_signature(self, message: str) -> frozenset:
+        """메시지에 등장한 주제 라벨 집합 (요청 키워드 제외, 유사 질문 캐시용)"""
+        return frozenset(
+            label for label in self.matcher.search(message) if label[1] != REQUEST_KEYWORD
+        )
+
+    @staticmethod
+    def _best(found: Set[Label], group: str) -> Optional[int]:
+        indexes = [i for g, i in found if g == group and i != REQUEST_KEYWORD]
+        return min(indexes) if indexes else None
+
+
+_default_detector: Optional[IntentDetector] = None
+
+
+def get_detector() -> IntentDetector:
+    """기본 테이블로 컴파일된 감지기 (최초 1회만 컴파일)"""
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = IntentDetector.from_file()
+    return _default_detector
+
+
+def detect_intent(message: str) -> Dict:
+    """사용자 의도 파악 (기본 테이블 사용)"""
+    return get_detector().detect(message)
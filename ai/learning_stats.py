@@ -0,0 +1,399 @@
+"""
+학습 이벤트 수집 + (사용자, 레슨)별 누적 집계
+
+generate_analysis()에 넘길 avg_time / accuracy / errors를 원본 로그를 매번 다시 훑어서 계산하지 않도록,
+레슨 단계 이벤트(사용자, 레슨, 단계·버튼, 소요 시간, 정답 여부)가 들어올 때마다 집계만 갱신합니다.
+
+- 사용자·레슨·단계 이름은 정수 ID로 바꿔서(interning) 한 번만 저장
+- (사용자, 레슨) 한 쌍 = 칸(slot) 하나, 칸별 값은 array 열(column)에 나란히 저장
+  (이벤트 수, 정답 수, 소요 시간 합, 처음/마지막 이벤트 시각)
+- 틀린 단계 횟수: (칸, 단계) → 카운터 배열 위치, 칸마다 자기 카운터 위치 목록을 가짐
+- 조회: 평균·정확도는 O(1), 자주 틀린 단계는 그 레슨에서 틀린 단계 종류 수만큼
+- snapshot_path를 주면 집계를 저장하고 시작할 때 불러옴 (JSON)
+  - 반영한 이벤트는 "{snapshot_path}.log"에 묶음마다 한 줄씩 바로 덧붙임 (비정상 종료에도 남도록)
+  - save()는 스냅샷을 쓰고 그때까지의 로그를 비움, 시작 시 스냅샷 + 그 뒤의 로그를 다시 반영
+  - 묶음마다 일련번호(seq)를 붙여 스냅샷에 이미 들어간 로그 줄은 건너뜀
+"""
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+
+class _Names:
+    """문자열 ↔ 정수 ID"""
+
+    __slots__ = ("ids", "names")
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name: str) -> int:
+        index = self.ids.get(name)
+        if index is None:
+            index = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+
+def _pair(a: int, b: int) -> int:
+    return (a << 32) | b
+
+
+class LearningStats:
+    def __init__(self, top_errors: int = 3, snapshot_path: Optional[str] = None):
+        """
+        Args:
+            top_errors: learning_data()의 errors에 넣을 자주 틀린 단계 수
+            snapshot_path: 집계 저장 파일 (None이면 메모리에만)
+        """
+        self.top_errors = top_errors
+        self.snapshot_path = snapshot_path
+
+        self._users = _Names()
+        self._lessons = _Names()
+        self._steps = _Names()
+
+        # (사용자 ID, 레슨 ID) → 칸
+        self._slots: Dict[int, int] = {}
+        self._user_slots: Dict[int, array] = {}
+
+        # 칸별 열
+        self._slot_user = array("I")
+        self._slot_lesson = array("I")
+        self._events = array("I")
+        self._correct = array("I")
+        self._duration = array("d")
+        self._first_at = array("d")
+        self._last_at = array("d")
+
+        # 틀린 단계 카운터: (칸, 단계 ID) → 위치
+        self._error_positions: Dict[int, int] = {}
+        self._error_step = array("I")
+        self._error_count = array("I")
+        self._slot_errors: List[array] = []
+
+        self._lock = threading.Lock()
+        self._stats = {"accepted": 0, "rejected": 0, "log_errors": 0}
+
+        # 이벤트 로그 (마지막으로 반영한 묶음 번호, 덧붙이기용 파일)
+        self._seq = 0
+        self._log = None
+
+        if snapshot_path:
+            if os.path.exists(snapshot_path):
+                self.load(snapshot_path)
+            self._replay(self._log_path(snapshot_path))
+            self._log = self._open_log()
+
+    # ========== 수집 ==========
+
+    def ingest(self, events: Iterable[Dict]) -> Tuple[int, int]:
+        """
+        이벤트 묶음 반영
+
+        Args:
+            events: [{"user_id", "lesson", "step", "duration"(초), "correct"(bool), "timestamp"(선택, epoch 초)}]
+
+        Returns:
+            (반영한 수, 형식이 잘못돼 버린 수)
+        """
+        now = time.time()
+        rows = []
+        rejected = 0
+        for event in events:
+            try:
+                row = [
+                    str(event["user_id"]),
+                    str(event["lesson"]),
+                    str(event["step"]),
+                    float(event["duration"]),
+                    bool(event["correct"]),
+                    float(event.get("timestamp") or now)
+                ]
+            except (KeyError, TypeError, ValueError):
+                rejected += 1
+                continue
+            if row[3] < 0 or row[3] != row[3]:
+                rejected += 1
+                continue
+            rows.append(row)
+
+        with self._lock:
+            for row in rows:
+                self._apply(*row)
+            if rows:
+                self._seq += 1
+                self._append_log(rows)
+            self._stats["accepted"] += len(rows)
+            self._stats["rejected"] += rejected
+        return len(rows), rejected
+
+    # ========== 조회 ==========
+
+    def aggregate(self, user_id: str, lesson: str) -> Optional[Dict]:
+        """(사용자, 레슨) 누적 집계 (이벤트가 없으면 None)"""
+        with self._lock:
+            slot = self._find(user_id, lesson)
+            if slot is None:
+                return None
+            events = self._events[slot]
+            return {
+                "user_id": user_id,
+                "lesson": lesson,
+                "events": events,
+                "correct": self._correct[slot],
+                "accuracy": self._correct[slot] / events if events else 0.0,
+                "avg_time": self._duration[slot] / events if events else 0.0,
+                "total_time": self._duration[slot],
+                "first_at": self._first_at[slot],
+                "last_at": self._last_at[slot],
+                "errors": [{"step": step, "count": count} for step, count in self._top_errors(slot, None)]
+            }
+
+    def learning_data(self, user_id: str, lesson: str) -> Optional[Dict]:
+        """generate_analysis()에 바로 넘길 형태 (avg_time: 단계당 평균 초, accuracy: 0~1)"""
+        with self._lock:
+            slot = self._find(user_id, lesson)
+            if slot is None or not self._events[slot]:
+                return None
+            events = self._events[slot]
+            return {
+                "lesson": lesson,
+                "avg_time": round(self._duration[slot] / events, 1),
+                "accuracy": round(self._correct[slot] / events, 2),
+                "errors": [step for step, _ in self._top_errors(slot, self.top_errors)]
+            }
+
+    def lessons(self, user_id: str) -> List[str]:
+        """사용자가 이벤트를 남긴 레슨 목록"""
+        with self._lock:
+            user = self._users.ids.get(user_id)
+            if user is None:
+                return []
+            return [self._lessons.names[self._slot_lesson[slot]] for slot in self._user_slots[user]]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            columns = (
+                self._slot_user, self._slot_lesson, self._events, self._correct,
+                self._duration, self._first_at, self._last_at, self._error_step, self._error_count
+            )
+            return {
+                **self._stats,
+                "users": len(self._users.names),
+                "lessons": len(self._lessons.names),
+                "slots": len(self._events),
+                "error_counters": len(self._error_count),
+                "array_bytes": sum(len(c) * c.itemsize for c in columns)
+            }
+
+    # ========== 저장 / 복구 ==========
+
+    def save(self, path: Optional[str] = None):
+        """집계 저장 (임시 파일에 쓰고 교체, 스냅샷 경로면 이미 반영된 이벤트 로그를 비움)"""
+        path = path or self.snapshot_path
+        if not path:
+            return
+        with self._lock:
+            seq = self._seq
+            data = {
+                "version": SNAPSHOT_VERSION,
+                "seq": seq,
+                "users": self._users.names,
+                "lessons": self._lessons.names,
+                "steps": self._steps.names,
+                "slots": {
+                    name: column.tolist()
+                    for name, column in self._columns().items()
+                },
+                "errors": [
+                    [slot, self._error_step[position], self._error_count[position]]
+                    for slot, positions in enumerate(self._slot_errors)
+                    for position in positions
+                ]
+            }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        if path == self.snapshot_path:
+            with self._lock:
+                # 저장하는 동안 새로 덧붙은 묶음이 없을 때만 비움 (있으면 다음 저장 때, 복구 시 seq로 건너뜀)
+                if self._seq == seq and self._log is not None:
+                    self._log.truncate(0)
+
+    def close(self):
+        """스냅샷 저장 후 이벤트 로그 닫기"""
+        self.save()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def load(self, path: str):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") not in (1, SNAPSHOT_VERSION):
+                raise ValueError(f"버전 {data.get('version')}")
+            with self._lock:
+                self._restore(data)
+                self._seq = data.get("seq", 0)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"학습 집계 불러오기 실패 ({path}): {e}")
+            return
+        logger.info(f"학습 집계 불러옴 - 칸 {len(self._events)}개")
+
+    # ========== 이벤트 로그 ==========
+
+    @staticmethod
+    def _log_path(snapshot_path: str) -> str:
+        return f"{snapshot_path}.log"
+
+    def _open_log(self):
+        try:
+            log = open(self._log_path(self.snapshot_path), "a", encoding="utf-8")
+            if log.tell() > 0:
+                # 잘린 마지막 줄 뒤에 다음 묶음이 이어 붙지 않게 줄을 끊어 둠
+                with open(self._log_path(self.snapshot_path), "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read() != b"\n":
+                        log.write("\n")
+            return log
+        except OSError as e:
+            logger.warning(f"학습 이벤트 로그를 열 수 없음 - 종료 시 저장만 함: {e}")
+            return None
+
+    def _append_log(self, rows: List[list]):
+        """반영한 묶음을 로그에 한 줄로 덧붙임 (self._lock 안에서 호출)"""
+        if self._log is None:
+            return
+        try:
+            self._log.write(json.dumps({"seq": self._seq, "events": rows}, ensure_ascii=False) + "\n")
+            self._log.flush()
+        except OSError as e:
+            self._stats["log_errors"] += 1
+            logger.warning(f"학습 이벤트 로그 쓰기 실패: {e}")
+
+    def _replay(self, path: str):
+        """스냅샷 뒤에 쌓인 로그 반영 (마지막 줄이 잘렸으면 그 줄만 버림)"""
+        if not os.path.exists(path):
+            return
+        replayed = 0
+        with open(path, encoding="utf-8") as f, self._lock:
+            for line in f:
+                try:
+                    batch = json.loads(line)
+                    seq, rows = batch["seq"], batch["events"]
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"학습 이벤트 로그의 깨진 줄을 건너뜀 ({path})")
+                    continue
+                if seq <= self._seq:
+                    continue
+                for row in rows:
+                    self._apply(*row)
+                self._seq = seq
+                replayed += len(rows)
+        if replayed:
+            logger.info(f"학습 이벤트 로그 반영 - 이벤트 {replayed}개")
+
+    # ========== 내부 (self._lock 안에서 호출) ==========
+
+    def _apply(self, user_id: str, lesson: str, step: str, duration: float, correct: bool, at: float):
+        slot = self._slot(user_id, lesson, at)
+        self._events[slot] += 1
+        self._duration[slot] += duration
+        if at < self._first_at[slot]:
+            self._first_at[slot] = at
+        if at > self._last_at[slot]:
+            self._last_at[slot] = at
+        if correct:
+            self._correct[slot] += 1
+        else:
+            self._error(slot, self._steps.intern(step))
+
+    def _columns(self) -> Dict[str, array]:
+        return {
+            "user": self._slot_user,
+            "lesson": self._slot_lesson,
+            "events": self._events,
+            "correct": self._correct,
+            "duration": self._duration,
+            "first_at": self._first_at,
+            "last_at": self._last_at
+        }
+
+    def _find(self, user_id: str, lesson: str) -> Optional[int]:
+        user = self._users.ids.get(user_id)
+        lesson_id = self._lessons.ids.get(lesson)
+        if user is None or lesson_id is None:
+            return None
+        return self._slots.get(_pair(user, lesson_id))
+
+    def _slot(self, user_id: str, lesson: str, at: float) -> int:
+        user = self._users.intern(user_id)
+        lesson_id = self._lessons.intern(lesson)
+        key = _pair(user, lesson_id)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self._events)
+            self._user_slots.setdefault(user, array("I")).append(slot)
+            self._slot_user.append(user)
+            self._slot_lesson.append(lesson_id)
+            self._events.append(0)
+            self._correct.append(0)
+            self._duration.append(0.0)
+            self._first_at.append(at)
+            self._last_at.append(at)
+            self._slot_errors.append(array("I"))
+        return slot
+
+    def _error(self, slot: int, step: int):
+        key = _pair(slot, step)
+        position = self._error_positions.get(key)
+        if position is None:
+            position = self._error_positions[key] = len(self._error_count)
+            self._error_step.append(step)
+            self._error_count.append(0)
+            self._slot_errors[slot].append(position)
+        self._error_count[position] += 1
+
+    def _top_errors(self, slot: int, limit: Optional[int]) -> List[Tuple[str, int]]:
+        ranked = sorted(self._slot_errors[slot], key=lambda p: self._error_count[p], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self._steps.names[self._error_step[p]], self._error_count[p]) for p in ranked]
+
+    def _restore(self, data: Dict):
+        self._users = _Names(data["users"])
+        self._lessons = _Names(data["lessons"])
+        self._steps = _Names(data["steps"])
+        for name, column in self._columns().items():
+            del column[:]
+            column.extend(data["slots"][name])
+
+        self._slots.clear()
+        self._user_slots.clear()
+        for slot, (user, lesson_id) in enumerate(zip(self._slot_user, self._slot_lesson)):
+            self._slots[_pair(user, lesson_id)] = slot
+            self._user_slots.setdefault(user, array("I")).append(slot)
+
+        self._error_positions.clear()
+        del self._error_step[:]
+        del self._error_count[:]
+        self._slot_errors = [array("I") for _ in range(len(self._events))]
+        for slot, step, count in data["errors"]:
+            self._error(slot, step)
+            self._error_count[-1] = count
@@ -1,16 +1,15 @@
 #기본 테스트 챗봇입니다 손주톡톡 기능과 상관 x
 
-from openai import OpenAI, APIConnectionError, AuthenticationError, RateLimitError
-from dotenv import load_dotenv
-import os
+from openai import APIConnectionError, AuthenticationError, RateLimitError
+
+from history import trim_history
+from http_clients import get_client_factory
 
-# .env 파일 로드
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
 MODEL_NAME = "gpt-4o-mini" #gpt-3.5-turbo
+HISTORY_TOKEN_BUDGET = 1200
 
-# OpenAI 클라이언트 초기화
-client = OpenAI(api_key=api_key)
+# OpenAI 클라이언트 (공용 연결 풀, .env는 config가 로드, SDK 기본 재시도 2회 유지)
+client = get_client_factory().sync_client().with_options(max_retries=2)
 
 
 def get_system_prompt():
@@ -56,9 +55,8 @@ def run_chatbot():
             # 대화 히스토리 저장
             messages.append({"role": "assistant", "content": reply})
 
-            # 최근 대화 10개까지만 유지
-            if len(messages) > 21:
-                messages = [messages[0]] + messages[-20:]
+            # 시스템 프롬프트 + 토큰 예산 안의 최근 대화만 유지
+            messages = [messages[0]] + trim_history(messages[1:], HISTORY_TOKEN_BUDGET)
 
         except AuthenticationError:
             print("\n오류: OpenAI API 키가 올바르지 않습니다. .env 파일을 확인하세요.\n")
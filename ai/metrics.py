@@ -0,0 +1,189 @@
+"""
+SonjuAI 계측 (지연 히스토그램, 토큰·오류·캐시 카운터)
+
+- 프로세스 공용 레지스트리 하나에 기록 (get_metrics())
+- snapshot(): 프로세스 안에서 바로 보는 dict
+- render_prometheus(): /metrics 엔드포인트용 Prometheus 텍스트 포맷
+
+기록 비용은 잠금 한 번 + 버킷 이분 탐색 정도라 핫 패스에 부담이 없습니다.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 초 단위 지연 버킷 (Prometheus 기본값 + 긴 completion 구간)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 마지막 칸: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """버킷 경계 기준 분위수 근사 (해당 분위가 속한 버킷의 상한)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    # ========== 기록 ==========
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = _labels(**labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels: str):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(**labels)] = value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = _labels(**labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """with 블록 소요 시간(초)을 히스토그램에 기록"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    # ========== 조회 ==========
+
+    def snapshot(self) -> Dict:
+        """현재 값 전체 (라벨은 "k=v,k=v" 문자열 키)"""
+        def label_key(labels: Labels) -> str:
+            return ",".join(f"{k}={v}" for k, v in labels)
+
+        with self._lock:
+            return {
+                "counters": {
+                    name: {label_key(k): v for k, v in series.items()}
+                    for name, series in self._counters.items()
+                },
+                "gauges": {
+                    name: {label_key(k): v for k, v in series.items()}
+                    for name, series in self._gauges.items()
+                },
+                "histograms": {
+                    name: {
+                        label_key(k): {
+                            "count": h.count,
+                            "sum": h.sum,
+                            "p50": h.quantile(0.5),
+                            "p95": h.quantile(0.95),
+                            "p99": h.quantile(0.99)
+                        }
+                        for k, h in series.items()
+                    }
+                    for name, series in self._histograms.items()
+                }
+            }
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            for name, series in sorted(self._gauges.items()):
+                header(name, "gauge")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for labels, h in series.items():
+                    cumulative = 0
+                    for bound, n in zip(h.buckets, h.counts):
+                        cumulative += n
+                        le = _format_labels(labels, 'le="%s"' % bound)
+                        lines.append(f"{name}_bucket{le} {cumulative}")
+                    le = _format_labels(labels, 'le="+Inf"')
+                    lines.append(f"{name}_bucket{le} {h.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {h.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+_shared: Optional[Metrics] = None
+_shared_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """프로세스 공용 레지스트리"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Metrics()
+            _shared.describe("sonju_method_seconds", "SonjuAI 메서드 전체 소요 시간")
+            _shared.describe("sonju_phase_seconds", "단계별 소요 시간 (build / upstream / parse)")
+            _shared.describe("sonju_ttft_seconds", "스트리밍 첫 토큰까지 시간")
+            _shared.describe("sonju_first_sentence_seconds", "문장 단위 스트리밍(읽어 주기) 첫 문장까지 시간")
+            _shared.describe("sonju_requests_total", "메서드 호출 수 (outcome=success/error)")
+            _shared.describe("sonju_prompt_tokens_total", "프롬프트 토큰 합계")
+            _shared.describe("sonju_completion_tokens_total", "응답 토큰 합계")
+            _shared.describe("sonju_parse_failures_total", "퀴즈 JSON 파싱·검증 실패 수")
+            _shared.describe("sonju_quiz_repairs_total", "재요청 없이 보정한 퀴즈 응답 수 (repair=보정 종류)")
+            _shared.describe("sonju_quiz_retries_total", "보정 실패로 다시 요청한 퀴즈 수")
+            _shared.describe("sonju_cache_hits_total", "캐시 히트 수 (cache=guide/semantic/quiz_pool)")
+        return _shared
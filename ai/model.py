@@ -6,15 +6,18 @@ from datetime import datetime
 class ChatRequest(BaseModel):
     message: str = Field(..., description="사용자 메시지")
     user_id: str = Field(..., description="사용자 ID")
+    session_id: Optional[str] = Field(default=None, description="세션 ID (없으면 user_id, 히스토리는 서버가 보관)")
     conversation_history: Optional[List[Dict[str, str]]] = Field(
         default=None, 
-        description="대화 히스토리 [{'role': 'user/assistant', 'content': '내용'}]"
+        description="대화 히스토리 [{'role': 'user/assistant', 'content': '내용'}] (보내면 서버 세션 대신 사용)"
     )
 
 class ChatResponse(BaseModel):
     success: bool
     message: Optional[str] = None
     tokens_used: Optional[int] = None
+    cached: bool = False
+    session_id: Optional[str] = None
     error: Optional[str] = None
     timestamp: str
 
@@ -23,6 +26,7 @@ class QuizGenerateRequest(BaseModel):
     topic: str = Field(..., description="퀴즈 주제 (예: 토스_송금)")
     difficulty: str = Field(default="쉬움", description="난이도")
     user_id: str = Field(..., description="사용자 ID")
+    session_id: Optional[str] = Field(default=None, description="세션 ID (없으면 user_id)")
 
 class QuizData(BaseModel):
     question: str
@@ -35,13 +39,18 @@ class QuizGenerateResponse(BaseModel):
     success: bool
     quiz: Optional[QuizData] = None
     tokens_used: Optional[int] = None
+    pooled: bool = False
+    quiz_id: Optional[str] = None
+    session_id: Optional[str] = None
     error: Optional[str] = None
     timestamp: str
 
 class QuizCheckRequest(BaseModel):
-    quiz_data: Dict = Field(..., description="퀴즈 데이터 (generate_quiz 응답의 quiz)")
+    quiz_id: Optional[str] = Field(default=None, description="퀴즈 ID (quiz/generate 응답의 quiz_id)")
+    quiz_data: Optional[Dict] = Field(default=None, description="퀴즈 데이터 (quiz_id 대신 직접 보낼 때)")
     user_answer: int = Field(..., ge=1, le=4, description="사용자 답변 (1-4)")
     user_id: str = Field(..., description="사용자 ID")
+    session_id: Optional[str] = Field(default=None, description="세션 ID (없으면 user_id)")
 
 class QuizCheckResponse(BaseModel):
     correct: bool
@@ -49,20 +58,67 @@ class QuizCheckResponse(BaseModel):
     explanation: str
     correct_answer: int
 
+# ========== 세션 ==========
+class SessionClearRequest(BaseModel):
+    user_id: str = Field(..., description="사용자 ID")
+    session_id: Optional[str] = Field(default=None, description="세션 ID (없으면 user_id)")
+
+# ========== 학습 이벤트 ==========
+class LearningEvent(BaseModel):
+    user_id: str = Field(..., description="사용자 ID")
+    lesson: str = Field(..., description="레슨 (예: 토스_송금)")
+    step: str = Field(..., description="단계 또는 누른 버튼 (예: 버튼3)")
+    duration: float = Field(..., ge=0, description="단계 소요 시간(초)")
+    correct: bool = Field(..., description="올바르게 수행했는지")
+    timestamp: Optional[float] = Field(default=None, description="발생 시각 (epoch 초, 없으면 수신 시각)")
+
+class EventIngestRequest(BaseModel):
+    events: List[LearningEvent]
+
+class EventIngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+    timestamp: str
+
+class LessonStatsResponse(BaseModel):
+    user_id: str
+    lesson: str
+    events: int
+    correct: int
+    accuracy: float
+    avg_time: float
+    total_time: float
+    first_at: float
+    last_at: float
+    errors: List[Dict] = Field(default_factory=list, description="[{'step': 단계, 'count': 틀린 횟수}] 많은 순")
+
 # ========== 분석 관련 ==========
 class AnalysisRequest(BaseModel):
     user_id: str = Field(..., description="사용자 ID")
-    learning_data: Dict = Field(..., description="학습 데이터 (시간, 정확성 등)")
+    learning_data: Optional[Dict] = Field(default=None, description="학습 데이터 (시간, 정확성 등)")
     # 예시: {"lesson": "토스_송금", "avg_time": 15.5, "accuracy": 0.8, "errors": ["버튼3"]}
+    lesson: Optional[str] = Field(default=None, description="learning_data 대신 /events로 모은 집계를 쓸 레슨")
+    use_llm: bool = Field(default=False, description="템플릿 대신 항상 모델로 작성")
 
 class AnalysisResponse(BaseModel):
     success: bool
     summary_text: Optional[str] = None
     tokens_used: Optional[int] = None
+    template: Optional[str] = Field(default=None, description="템플릿으로 작성했으면 유형 이름")
     error: Optional[str] = None
     timestamp: str
 
 # ========== 주제별 가이드 ==========
 class GuideRequest(BaseModel):
     topic: str = Field(..., description="가이드 주제")
-    user_id: str = Field(..., description="사용자 ID")
\ No newline at end of file
+    user_id: str = Field(..., description="사용자 ID")
+
+# ========== 의도 파악 ==========
+class IntentRequest(BaseModel):
+    message: str = Field(..., description="사용자 메시지")
+    user_id: str = Field(..., description="사용자 ID")
+
+class IntentResponse(BaseModel):
+    type: str = Field(..., description="quiz / guide / chat")
+    topic: Optional[str] = None
+    guide_topic: Optional[str] = Field(default=None, description="get_topic_guide에 넘길 주제")
@@ -0,0 +1,144 @@
+"""
+작업·의도별 모델 라우팅 + 지연·오류 기반 대체 모델 전환
+
+- 라우팅 표(config.MODEL_ROUTES): "작업:의도" → "작업" → "default" 순서로 찾음
+  (예: "chat:guide" = 채팅 중 사용법 질문, "chat:chat" = 일상 대화)
+- 각 경로: model, max_tokens, temperature, fallback(대체 모델, 없으면 None)
+- 모델별 최근 window건의 지연·성공 여부를 기록해 p95 지연이나 오류율이 기준을 넘으면
+  cooldown 초 동안 대체 모델로 보내고, 이후 기록을 비우고 기본 모델을 다시 시도
+- 오류는 재시도를 마친 최종 결과만, 그중 모델 상태를 나타내는 것(시간 초과·연결 오류·5xx)만 셈
+  (429는 요청량 문제라 대체 모델로 보내도 나아지지 않음)
+"""
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+ROUTE_FIELDS = ("model", "max_tokens", "temperature")
+
+
+def is_degradation(error: Exception) -> bool:
+    """모델이 나빠졌다고 볼 오류인지 (시간 초과·연결 오류·5xx, openai import는 실패했을 때만)"""
+    if isinstance(error, TimeoutError):
+        return True
+    from openai import APIConnectionError  # APITimeoutError 포함
+    if isinstance(error, APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        routes: Dict[str, Dict],
+        window: int = 50,
+        min_samples: int = 10,
+        p95_seconds: float = 8.0,
+        error_rate: float = 0.2,
+        cooldown: float = 60.0
+    ):
+        """
+        Args:
+            routes: 라우팅 표 ("default" 항목 필수)
+            window: 모델별로 유지할 최근 호출 수
+            min_samples: 판단에 필요한 최소 호출 수
+            p95_seconds: 이 값을 넘으면 대체 모델로 전환
+            error_rate: 이 비율을 넘으면 대체 모델로 전환
+            cooldown: 전환 유지 시간(초)
+        """
+        if "default" not in routes:
+            raise ValueError("routes에 'default' 항목이 필요합니다.")
+        self.routes = routes
+        self.window = window
+        self.min_samples = min_samples
+        self.p95_seconds = p95_seconds
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+
+        self._samples: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._tripped_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"routed": 0, "fallbacks": 0, "trips": 0}
+
+    def route(self, operation: str, intent: Optional[str] = None) -> Dict:
+        """라우팅 표 항목 (대체 모델 전환 전, 캐시 키 등 고정값이 필요할 때)"""
+        if intent:
+            route = self.routes.get(f"{operation}:{intent}")
+            if route:
+                return route
+        return self.routes.get(operation) or self.routes["default"]
+
+    def select(self, operation: str, intent: Optional[str] = None) -> Dict:
+        """
+        이번 요청에 쓸 model / max_tokens / temperature
+
+        기본 모델이 느리거나 오류가 많으면 대체 모델로 바꿔서 반환합니다.
+        """
+        route = self.route(operation, intent)
+        params = {field: route[field] for field in ROUTE_FIELDS}
+        fallback = route.get("fallback")
+
+        with self._lock:
+            self._stats["routed"] += 1
+            if fallback and self._tripped(route["model"]):
+                params["model"] = fallback
+                self._stats["fallbacks"] += 1
+        return params
+
+    def record(self, model: str, seconds: float, ok: bool):
+        """업스트림 호출 결과 기록"""
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append((seconds, ok))
+
+            if model not in self._tripped_until and self._degraded(samples):
+                self._tripped_until[model] = time.monotonic() + self.cooldown
+                self._stats["trips"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                **self._stats,
+                "models": {
+                    model: {
+                        **self._summary(samples),
+                        "fallback_active": self._tripped_until.get(model, 0) > now
+                    }
+                    for model, samples in self._samples.items()
+                }
+            }
+
+    # ========== 내부 (self._lock 안에서 호출) ==========
+
+    def _tripped(self, model: str) -> bool:
+        until = self._tripped_until.get(model)
+        if until is None:
+            return False
+        if time.monotonic() < until:
+            return True
+        # 전환 기간이 끝나면 예전 기록은 버리고 기본 모델을 다시 시도
+        del self._tripped_until[model]
+        self._samples.pop(model, None)
+        return False
+
+    def _degraded(self, samples: Deque[Tuple[float, bool]]) -> bool:
+        if len(samples) < self.min_samples:
+            return False
+        summary = self._summary(samples)
+        return summary["p95_seconds"] > self.p95_seconds or summary["error_rate"] > self.error_rate
+
+    @staticmethod
+    def _summary(samples: Deque[Tuple[float, bool]]) -> Dict:
+        if not samples:
+            return {"samples": 0, "p95_seconds": 0.0, "error_rate": 0.0}
+        latencies = sorted(seconds for seconds, _ in samples)
+        errors = sum(1 for _, ok in samples if not ok)
+        return {
+            "samples": len(samples),
+            "p95_seconds": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "error_rate": errors / len(samples)
+        }
@@ -0,0 +1,292 @@
+"""
+다음 요청 미리 준비 (사용자가 읽는 동안 다음 퀴즈·가이드를 백그라운드에서 생성)
+
+콘솔 챗봇에서 가이드를 본 어르신은 대개 같은 주제 퀴즈를, 퀴즈를 푼 뒤에는 다음 퀴즈를 청합니다.
+방금 보여준 것(상태) → 다음 요청(행동) 전이 횟수를 세어 가장 가능성 높은 행동을 미리 실행하고,
+실제 요청이 같으면 준비된 결과를 바로 씁니다.
+
+상태: "guide:<가이드 주제>", "answered:<퀴즈 주제>", "chat"
+행동: "quiz:<퀴즈 주제>", "guide:<가이드 주제>", "chat" (chat은 미리 준비하지 않음)
+
+- 기본 예측: 가이드 → 주제 이름이 겹치는 퀴즈 (토스_송금 → 토스), 퀴즈 풀이 → 같은 주제 퀴즈
+  (prior만큼의 가상 횟수로 시작, 실제 전이가 쌓이면 그쪽을 따름)
+- 확률이 min_probability 이상일 때만 준비, 준비 중인 것은 한 번에 하나
+- 예산: 요청 1건마다 budget_ratio만큼 크레딧이 쌓이고 준비 1건에 1을 씀, 적중하면 돌려받음
+  (빗나간 준비로 늘어나는 호출은 요청 수 × budget_ratio 이하)
+- 시작 지연: 예측 후 start_delay초(읽는 시간) 동안은 호출하지 않고 기다림
+  → 그 사이 다른 요청이 오면 호출 없이 취소(skipped, 크레딧 반환), 예측한 요청이 오면 바로 시작
+- 예측이 빗나가면 준비를 취소 (이미 실행 중이면 끝난 뒤 결과를 returns로 되돌리고(returned),
+  되돌릴 수 없으면 버리고 토큰을 wasted_tokens로 집계)
+  → 빗나간 퀴즈도 풀로 돌아가고 본 문제 기록에서 빠지므로 없어지지 않음
+- 준비 호출은 background 등급 (priority_scheduler), 사용자가 그 결과를 청하면 interactive로 올림
+  (기다리는 동안 background 대기열에 남지 않게)
+- stats_path를 주면 전이 횟수를 저장해 다음 실행에서 이어 씀
+"""
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import get_metrics
+from priority_scheduler import PriorityHandle, priority
+
+logger = logging.getLogger(__name__)
+
+
+def related_quiz_topic(guide_topic: str, quiz_topics: List[str]) -> Optional[str]:
+    """가이드 주제와 이름이 겹치는 퀴즈 주제 (토스_송금 → 토스, app_카카오톡 → 카카오톡, 전화걸기 → 전화)"""
+    for topic in quiz_topics:
+        if topic in guide_topic:
+            return topic
+    return None
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        fetchers: Dict[str, Callable[[str], Dict]],
+        quiz_topics: List[str],
+        min_probability: float = 0.5,
+        prior: float = 2.0,
+        budget_ratio: float = 0.5,
+        burst: float = 3.0,
+        wait_seconds: float = 30.0,
+        start_delay: float = 3.0,
+        stats_path: Optional[str] = None,
+        returns: Optional[Dict[str, Callable[[str, Dict], object]]] = None
+    ):
+        """
+        Args:
+            fetchers: 행동 종류 → 주제를 받아 결과 dict를 만드는 함수 ({"quiz": ai.generate_quiz, ...})
+            quiz_topics: 기본 예측에 쓸 퀴즈 주제 목록
+            min_probability: 이 확률 이상으로 예상될 때만 준비
+            prior: 기본 예측에 주는 가상 전이 횟수
+            budget_ratio: 요청 1건마다 쌓이는 준비 크레딧
+            burst: 쌓아 둘 수 있는 크레딧 최대치
+            wait_seconds: 준비 중인 결과를 기다리는 최대 시간(초)
+            start_delay: 예측 후 실제 호출을 시작하기까지 기다리는 시간(초, 이 안에 빗나가면 비용 없음)
+            stats_path: 전이 횟수 저장 파일 (None이면 메모리에만)
+            returns: 행동 종류 → 쓰지 않은 결과를 되돌리는 함수 (주제, 결과) ({"quiz": ai.return_quiz})
+        """
+        self.fetchers = fetchers
+        self.quiz_topics = quiz_topics
+        self.min_probability = min_probability
+        self.prior = prior
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.wait_seconds = wait_seconds
+        self.start_delay = start_delay
+        self.stats_path = stats_path
+        self.returns = returns or {}
+
+        self._transitions: Dict[str, Counter] = {}
+        self._state: Optional[str] = None
+        self._pending: Optional[Tuple[str, Future, threading.Event, PriorityHandle]] = None
+        self._credits = burst
+        self._lock = threading.Lock()
+        self._metrics = get_metrics()
+        self._stats = {"started": 0, "hits": 0, "misses": 0, "cancelled": 0, "denied": 0, "failed": 0, "skipped": 0, "returned": 0, "wasted_tokens": 0}
+
+        if stats_path and os.path.exists(stats_path):
+            self.load(stats_path)
+
+    # ========== 사용 ==========
+
+    def take(self, action: str) -> Optional[Dict]:
+        """
+        사용자가 action을 요청함 - 전이를 기록하고, 미리 준비한 결과가 맞으면 반환
+
+        Returns:
+            준비된 성공 결과 (실행 중이면 끝날 때까지 기다림) 또는 None (직접 호출해야 함)
+        """
+        with self._lock:
+            if self._state is not None:
+                self._transitions.setdefault(self._state, Counter())[action] += 1
+            self._credits = min(self.burst, self._credits + self.budget_ratio)
+            pending, self._pending = self._pending, None
+
+        if pending is None:
+            return None
+        if pending[0] != action:
+            self._discard(pending, "misses")
+            return None
+
+        # 사용자가 기다리기 시작함 - 시작 지연 중이면 바로 시작, 대기열에 있으면 interactive로
+        _, future, go, level = pending
+        level.raise_to("interactive")
+        go.set()
+        try:
+            result = future.result(timeout=self.wait_seconds)
+        except Exception as e:
+            logger.warning(f"Prefetch failed ({action}): {e}")
+            self._discard(pending, "failed")
+            return None
+        if not result.get("success"):
+            self._count("failed")
+            return None
+
+        self._count("hits")
+        with self._lock:
+            self._credits = min(self.burst, self._credits + 1)
+        return result
+
+    def served(self, state: str):
+        """state를 보여줌 - 다음 요청을 예측해 미리 준비 시작"""
+        with self._lock:
+            self._state = state
+        action, probability = self.predict(state)
+        if action is None or action == "chat" or probability < self.min_probability:
+            return
+
+        kind, _, topic = action.partition(":")
+        fetch = self.fetchers.get(kind)
+        if fetch is None:
+            return
+        with self._lock:
+            if self._credits < 1:
+                self._stats["denied"] += 1
+                self._metrics.inc("sonju_prefetch_total", outcome="denied")
+                return
+            self._credits -= 1
+            self._stats["started"] += 1
+            pending, self._pending = self._pending, (action, *self._start(fetch, topic))
+        self._metrics.inc("sonju_prefetch_total", outcome="started")
+        if pending is not None:
+            self._discard(pending, "cancelled")
+
+    def predict(self, state: str) -> Tuple[Optional[str], float]:
+        """state 다음에 올 가능성이 가장 높은 행동과 그 확률"""
+        with self._lock:
+            counts = Counter(self._transitions.get(state, ()))
+        default = self._default_action(state)
+        if default is not None:
+            counts[default] += self.prior
+        total = sum(counts.values())
+        if not total:
+            return None, 0.0
+        action, count = counts.most_common(1)[0]
+        return action, count / total
+
+    # ========== 조회 / 저장 ==========
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self._stats["started"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / started if started else 0.0,
+                "credits": round(self._credits, 2),
+                "states": len(self._transitions)
+            }
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.stats_path
+        if not path:
+            return
+        with self._lock:
+            data = {"transitions": {state: dict(counts) for state, counts in self._transitions.items()}}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            transitions = {state: Counter(counts) for state, counts in data["transitions"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"미리 준비 통계 불러오기 실패 ({path}): {e}")
+            return
+        with self._lock:
+            self._transitions = transitions
+
+    def close(self):
+        """준비 중인 작업 취소 + 통계 저장"""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            self._discard(pending, "cancelled")
+        stats = self.stats()
+        logger.info(f"Prefetch - started {stats['started']}, hits {stats['hits']} "
+                    f"({stats['hit_rate'] * 100:.0f}%), skipped {stats['skipped']}, returned {stats['returned']}, "
+                    f"wasted tokens {stats['wasted_tokens']}")
+        self.save()
+
+    # ========== 내부 ==========
+
+    def _default_action(self, state: str) -> Optional[str]:
+        kind, _, topic = state.partition(":")
+        if kind == "guide":
+            quiz_topic = related_quiz_topic(topic, self.quiz_topics)
+            return f"quiz:{quiz_topic}" if quiz_topic else None
+        if kind == "answered":
+            return f"quiz:{topic}"
+        return None
+
+    def _start(self, fetch: Callable[[str], Dict], topic: str) -> Tuple[Future, threading.Event, PriorityHandle]:
+        """
+        데몬 스레드에서 start_delay 뒤에 실행 (종료할 때 진행 중인 준비를 기다리지 않음)
+
+        Returns:
+            (결과, 바로 시작 신호, 호출 등급) - 시작 전에는 future.cancel()이 성공함
+        """
+        future: Future = Future()
+        go = threading.Event()
+        # 실제 요청보다 뒤로 (같은 프로세스의 다른 호출을 막지 않음), take()가 맞으면 올림
+        level = PriorityHandle("background")
+
+        def run():
+            go.wait(self.start_delay)
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                with priority(level):
+                    future.set_result(fetch(topic))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="sonju-prefetch", daemon=True).start()
+        return future, go, level
+
+    def _discard(self, pending: Tuple[str, Future, threading.Event, PriorityHandle], outcome: str):
+        """
+        쓰지 않을 준비 결과 정리
+
+        시작 전이면 취소하고 크레딧 반환, 실행 중이면 끝난 뒤 결과를 되돌리거나(returns) 토큰을 낭비로 집계
+        """
+        action, future, go, _ = pending
+        self._count(outcome)
+        if future.cancel():
+            go.set()
+            self._count("skipped")
+            with self._lock:
+                self._credits = min(self.burst, self._credits + 1)
+        else:
+            future.add_done_callback(lambda f: self._unused(action, f))
+
+    def _unused(self, action: str, future: Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        kind, _, topic = action.partition(":")
+        giveback = self.returns.get(kind)
+        if giveback is not None and result.get("success"):
+            try:
+                if giveback(topic, result) is not False:
+                    self._count("returned")
+                    return
+            except Exception as e:
+                logger.warning(f"Prefetch return failed ({action}): {e}")
+        tokens = result.get("tokens_used") or 0
+        with self._lock:
+            self._stats["wasted_tokens"] += tokens
+        self._metrics.inc("sonju_prefetch_wasted_tokens_total", tokens)
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._stats[outcome] += 1
+        self._metrics.inc("sonju_prefetch_total", outcome=outcome)
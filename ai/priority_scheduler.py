@@ -0,0 +1,427 @@
+"""
+업스트림 호출 우선순위 스케줄러
+
+라이브 대화와 퀴즈 풀 채우기·주간 분석·가이드 팩 빌드가 같은 OpenAI 한도를 나눠 씁니다.
+모든 SonjuAI 업스트림 호출은 이 스케줄러에서 입장 허가(rate limiter 예약)를 받은 뒤 나갑니다.
+
+등급 (config.PRIORITY_*)
+    interactive    : 사용자가 화면 앞에서 기다리는 대화·가이드
+    near_real_time : 퀴즈·분석·대화 요약처럼 곧 필요하지만 몇 초는 기다릴 수 있는 작업
+    background     : 풀 채우기·일괄 분석·팩 빌드
+
+- 입장: 요청량 한도(rate limiter)에 지금 여유가 있을 때만 예약을 내줌
+  → 한도를 넘는 요청은 rate limiter의 선착순 대기열이 아니라 이 스케줄러의 등급별 대기열에서 기다림
+  (입장 후 호출·재시도·응답 수신은 스케줄러 밖 - 동시 호출 수는 분당 한도가 정하고, 느린 응답이 대기열을 막지 않음)
+- 순서: 가중 공정 큐(WFQ) - 등급별 가중치에 비례해 토큰 한도를 나눔, 같은 등급 안에서는 도착 순
+- 몫 남겨 두기: 요청량 한도의 reserved_quota 비율은 interactive만 씀
+  (밀린 일괄 작업이 한 번에 분당 한도를 다 써 버려도 대화는 바로 나갈 수 있게)
+- 마감: 등급별 대기 시간 상한을 넘기면 SchedulerRejected(reason="expired")
+- 부하 차단: 대기열 전체 길이가 등급별 한도를 넘으면 새 요청을 거절하고,
+  높은 등급이 들어올 때 background 한도를 넘어 있으면 가장 늦게 들어온 background 요청부터 돌려보냄
+  (돌려받은 쪽은 실패로 처리 - 퀴즈 풀은 retry_delay 뒤에 다시 시도)
+
+등급은 메서드별 기본값(config.METHOD_PRIORITIES)을 쓰고, 일괄 작업은 priority("background") 안에서 호출합니다.
+나중에 등급을 올려야 하는 작업(미리 준비하던 결과를 사용자가 기다리기 시작함)은 PriorityHandle을 넘기고
+handle.raise_to("interactive")로 대기 중인 입장과 이후 호출의 등급을 올립니다.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from config import config
+from rate_limiter import RateLimitScheduler, Ticket, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("interactive", "near_real_time", "background")
+
+_current: contextvars.ContextVar = contextvars.ContextVar("sonju_priority", default=None)
+
+
+class PriorityHandle:
+    """priority()에 넘기면 블록 안 호출의 등급을 나중에 올릴 수 있는 등급 (올리기만 가능)"""
+
+    def __init__(self, name: str):
+        if name not in PRIORITIES:
+            raise ValueError(f"알 수 없는 우선순위: {name}")
+        self.name = name
+        self._lock = threading.Lock()
+        self._waiting: List[Tuple["PriorityScheduler", "_Waiter"]] = []
+
+    def raise_to(self, name: str):
+        """등급을 name으로 올림 (이미 같거나 높으면 그대로) - 대기 중인 입장도 새 등급 대기열로 옮김"""
+        if name not in PRIORITIES:
+            raise ValueError(f"알 수 없는 우선순위: {name}")
+        with self._lock:
+            if PRIORITIES.index(name) >= PRIORITIES.index(self.name):
+                return
+            self.name = name
+            waiting = list(self._waiting)
+        for scheduler, waiter in waiting:
+            scheduler._promote(waiter, name)
+
+    def _track(self, scheduler: "PriorityScheduler", waiter: "_Waiter") -> str:
+        with self._lock:
+            self._waiting.append((scheduler, waiter))
+            return self.name
+
+    def _untrack(self, scheduler: "PriorityScheduler", waiter: "_Waiter"):
+        with self._lock:
+            self._waiting.remove((scheduler, waiter))
+
+
+@contextmanager
+def priority(name: Union[str, PriorityHandle]) -> Iterator[None]:
+    """이 블록 안의 업스트림 호출 등급을 지정 (스레드·asyncio 작업마다 따로 적용, PriorityHandle이면 나중에 올릴 수 있음)"""
+    if not isinstance(name, PriorityHandle) and name not in PRIORITIES:
+        raise ValueError(f"알 수 없는 우선순위: {name}")
+    token = _current.set(name)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_priority(default: str) -> str:
+    """priority()로 지정한 등급 (없으면 default)"""
+    value = _current.get()
+    if isinstance(value, PriorityHandle):
+        return value.name
+    return value or default
+
+
+def _handle() -> Optional[PriorityHandle]:
+    value = _current.get()
+    return value if isinstance(value, PriorityHandle) else None
+
+
+class SchedulerRejected(Exception):
+    """대기열이 넘쳐 돌려보냈거나(shed) 마감 시간 안에 자리를 못 받은 요청"""
+
+    def __init__(self, priority: str, reason: str):
+        super().__init__(f"{priority} 요청 거절 ({reason})")
+        self.priority = priority
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "enqueued", "deadline", "finish", "state", "ticket", "error", "event", "loop", "future")
+
+    def __init__(self, priority: str, tokens: int, enqueued: float, deadline: Optional[float]):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = enqueued
+        self.deadline = deadline
+        self.finish = 0.0
+        self.state = "queued"  # queued → granted / rejected / cancelled
+        self.ticket: Optional[Ticket] = None
+        self.error: Optional[SchedulerRejected] = None
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def wake(self):
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+        else:
+            self.event.set()
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        limiter: Optional[RateLimitScheduler] = None,
+        reserved_quota: float = 0.2,
+        weights: Optional[Dict[str, float]] = None,
+        deadlines: Optional[Dict[str, float]] = None,
+        queue_limits: Optional[Dict[str, int]] = None,
+        window: int = 1000
+    ):
+        """
+        Args:
+            limiter: 요청량 한도 (None이면 기다리지 않고 바로 입장)
+            reserved_quota: 분당 요청·토큰 한도 중 interactive만 쓸 수 있는 비율
+            weights: 등급별 WFQ 가중치 (클수록 한도를 많이 가져감)
+            deadlines: 등급별 최대 대기 시간(초, 0이면 무제한)
+            queue_limits: 대기열 전체 길이가 이 값 이상이면 해당 등급 새 요청 거절
+            window: 등급별로 유지할 최근 대기 시간 수
+        """
+        self.limiter = limiter
+        self.reserved_quota = min(max(reserved_quota, 0.0), 0.9)
+        self.weights = {p: float((weights or {}).get(p, 1.0)) for p in PRIORITIES}
+        self.deadlines = {p: float((deadlines or {}).get(p, 0.0)) for p in PRIORITIES}
+        self.queue_limits = {p: (queue_limits or {}).get(p) for p in PRIORITIES}
+
+        self._queues: Dict[str, Deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self._last_finish = {p: 0.0 for p in PRIORITIES}
+        self._virtual_time = 0.0
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self._waits_ms: Dict[str, Deque[float]] = {p: deque(maxlen=window) for p in PRIORITIES}
+        self._stats = {
+            p: {"granted": 0, "queued": 0, "promoted": 0, "shed": 0, "expired": 0, "cancelled": 0, "max_wait_ms": 0.0}
+            for p in PRIORITIES
+        }
+
+    # ========== 입장 ==========
+
+    def admit(self, priority: str, tokens: int) -> Optional[Ticket]:
+        """
+        업스트림 호출 한 건의 입장 (차례가 오고 한도에 여유가 생길 때까지 기다림)
+
+        Returns:
+            rate limiter 예약 (limiter.call(..., admit=)이 시도마다 부름, limiter가 없으면 None)
+
+        Raises:
+            SchedulerRejected: 대기열이 넘쳐 거절됐거나 마감 시간을 넘김
+        """
+        handle = _handle()
+        waiter = self._submit(self._raised(priority, handle), tokens)
+        if waiter.state == "queued":
+            self._follow(handle, waiter)
+            try:
+                waiter.event.wait()
+            finally:
+                if handle is not None:
+                    handle._untrack(self, waiter)
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.ticket
+
+    async def aadmit(self, priority: str, tokens: int) -> Optional[Ticket]:
+        """admit()의 비동기 버전 (기다리는 동안 이벤트 루프를 막지 않음, 취소되면 대기열에서 빠짐)"""
+        handle = _handle()
+        waiter = self._submit(self._raised(priority, handle), tokens, asyncio.get_running_loop())
+        if waiter.state == "queued":
+            self._follow(handle, waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self._cancel(waiter)
+                raise
+            finally:
+                if handle is not None:
+                    handle._untrack(self, waiter)
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.ticket
+
+    # ========== 조회 / 종료 ==========
+
+    def stats(self) -> Dict:
+        with self._cond:
+            classes = {}
+            for p in PRIORITIES:
+                waits = sorted(self._waits_ms[p])
+                classes[p] = {
+                    **self._stats[p],
+                    "waiting": len(self._queues[p]),
+                    "wait_ms_p50": waits[len(waits) // 2] if waits else 0.0,
+                    "wait_ms_p95": waits[int(len(waits) * 0.95)] if waits else 0.0
+                }
+            return {
+                "waiting": self._queued,
+                "classes": classes
+            }
+
+    def shutdown(self):
+        """대기 중인 요청은 모두 거절하고 디스패처 종료"""
+        with self._cond:
+            self._stopping = True
+            for p in PRIORITIES:
+                while self._queues[p]:
+                    self._reject(self._queues[p].popleft(), "shutdown")
+            self._cond.notify_all()
+
+    # ========== 내부 ==========
+
+    @staticmethod
+    def _raised(priority: str, handle: Optional[PriorityHandle]) -> str:
+        """handle이 이미 더 높은 등급으로 올라가 있으면 그 등급"""
+        if handle is not None and PRIORITIES.index(handle.name) < PRIORITIES.index(priority):
+            return handle.name
+        return priority
+
+    def _follow(self, handle: Optional[PriorityHandle], waiter: _Waiter):
+        """대기 중인 입장을 handle에 연결 (연결하기 전에 올라갔으면 바로 옮김)"""
+        if handle is not None:
+            self._promote(waiter, handle._track(self, waiter))
+
+    def _promote(self, waiter: _Waiter, priority: str):
+        """대기 중인 요청을 더 높은 등급 대기열 맨 뒤로 옮김 (가상 완료 시각·마감도 새 등급 기준)"""
+        with self._cond:
+            if waiter.state != "queued" or PRIORITIES.index(priority) >= PRIORITIES.index(waiter.priority):
+                return
+            self._queues[waiter.priority].remove(waiter)
+            waiter.priority = priority
+            deadline = self.deadlines[priority]
+            waiter.deadline = waiter.enqueued + deadline if deadline else None
+            start = max(self._virtual_time, self._last_finish[priority])
+            waiter.finish = self._last_finish[priority] = start + max(waiter.tokens, 1) / self.weights[priority]
+            self._queues[priority].append(waiter)
+            self._stats[priority]["promoted"] += 1
+            self._cond.notify()
+
+    def _submit(self, priority: str, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None) -> _Waiter:
+        now = time.monotonic()
+        deadline = self.deadlines[priority]
+        waiter = _Waiter(priority, tokens, now, now + deadline if deadline else None)
+
+        with self._cond:
+            if self._stopping:
+                self._reject(waiter, "shutdown", queued=False)
+                return waiter
+
+            # 기다리는 요청이 없고 한도에 여유가 있으면 디스패처를 거치지 않고 바로 내줌
+            if not self._queued:
+                ticket, _ = self._try_reserve(priority, tokens)
+                if self.limiter is None or ticket is not None:
+                    self._grant(waiter, ticket, now)
+                    return waiter
+
+            limit = self.queue_limits[priority]
+            if limit is not None and self._queued >= limit:
+                self._reject(waiter, "shed", queued=False)
+                return waiter
+            if priority != "background":
+                self._shed_background()
+
+            if loop is not None:
+                waiter.loop = loop
+                waiter.future = loop.create_future()
+            else:
+                waiter.event = threading.Event()
+            start = max(self._virtual_time, self._last_finish[priority])
+            waiter.finish = self._last_finish[priority] = start + max(tokens, 1) / self.weights[priority]
+            self._queues[priority].append(waiter)
+            self._queued += 1
+            self._stats[priority]["queued"] += 1
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="priority-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return waiter
+
+    def _run(self):
+        with self._cond:
+            while not self._stopping:
+                now = time.monotonic()
+                self._expire(now)
+                waiter, ticket, delay = self._next()
+                if waiter is None:
+                    # 한도에 자리가 날 때까지, 또는 새 요청·취소·마감까지 기다렸다가 다시 고름
+                    until = self._until_deadline(now)
+                    timeouts = [t for t in (delay, until) if t is not None]
+                    self._cond.wait(min(timeouts) if timeouts else None)
+                    continue
+
+                self._queues[waiter.priority].popleft()
+                self._queued -= 1
+                self._virtual_time = max(self._virtual_time, waiter.finish)
+                self._grant(waiter, ticket, now)
+                waiter.wake()
+
+    def _next(self) -> Tuple[Optional[_Waiter], Optional[Ticket], Optional[float]]:
+        """
+        각 등급 맨 앞 요청을 가상 완료 시각 순으로 보며 지금 예약을 받을 수 있는 첫 요청
+        (앞 등급이 한도 몫에 막혀 있어도 뒤 등급은 나갈 수 있음)
+
+        Returns:
+            (요청, 예약, None) 또는 (None, None, 한도에 자리가 나기까지 남은 초 또는 None)
+        """
+        heads = sorted(
+            (self._queues[p][0] for p in PRIORITIES if self._queues[p]),
+            key=lambda w: w.finish
+        )
+        delay = None
+        for waiter in heads:
+            ticket, wait = self._try_reserve(waiter.priority, waiter.tokens)
+            if self.limiter is None or ticket is not None:
+                return waiter, ticket, None
+            delay = wait if delay is None else min(delay, wait)
+        return None, None, delay
+
+    def _try_reserve(self, priority: str, tokens: int) -> Tuple[Optional[Ticket], float]:
+        if self.limiter is None:
+            return None, 0.0
+        return self.limiter.try_reserve(tokens, 1.0 if priority == "interactive" else 1.0 - self.reserved_quota)
+
+    def _grant(self, waiter: _Waiter, ticket: Optional[Ticket], now: float):
+        waiter.state = "granted"
+        waiter.ticket = ticket
+        stats = self._stats[waiter.priority]
+        stats["granted"] += 1
+        wait_ms = (now - waiter.enqueued) * 1000
+        self._waits_ms[waiter.priority].append(wait_ms)
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+
+    def _reject(self, waiter: _Waiter, reason: str, queued: bool = True):
+        waiter.state = "rejected"
+        waiter.error = SchedulerRejected(waiter.priority, reason)
+        if reason in ("shed", "expired"):
+            self._stats[waiter.priority][reason] += 1
+        if queued:
+            self._queued -= 1
+            waiter.wake()
+
+    def _cancel(self, waiter: _Waiter):
+        """기다리다 취소된 비동기 요청 정리 (이미 입장했으면 예약 반납)"""
+        with self._cond:
+            if waiter.state == "queued":
+                self._queues[waiter.priority].remove(waiter)
+                self._queued -= 1
+                waiter.state = "cancelled"
+                self._stats[waiter.priority]["cancelled"] += 1
+            elif waiter.state == "granted" and waiter.ticket is not None:
+                self.limiter.release(waiter.ticket)
+                self._cond.notify()
+
+    def _shed_background(self):
+        """background 한도를 넘은 만큼 가장 늦게 들어온 background 요청부터 돌려보냄"""
+        limit = self.queue_limits["background"]
+        queue = self._queues["background"]
+        while limit is not None and queue and self._queued >= limit:
+            self._reject(queue.pop(), "shed")
+
+    def _expire(self, now: float):
+        # 등급마다 마감 시간이 같으므로 맨 앞부터 확인하면 됨 (등급이 올라온 요청은 차례가 되어야 확인됨)
+        for p in PRIORITIES:
+            queue = self._queues[p]
+            while queue and queue[0].deadline is not None and queue[0].deadline <= now:
+                self._reject(queue.popleft(), "expired")
+
+    def _until_deadline(self, now: float) -> Optional[float]:
+        deadlines = [q[0].deadline for q in self._queues.values() if q and q[0].deadline is not None]
+        return max(0.0, min(deadlines) - now) if deadlines else None
+
+
+_shared: Optional[PriorityScheduler] = None
+_shared_lock = threading.Lock()
+
+
+def get_scheduler() -> PriorityScheduler:
+    """프로세스 공용 스케줄러 (rate limiter와 마찬가지로 모든 SonjuAI가 공유)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PriorityScheduler(
+                limiter=get_rate_limiter(),
+                reserved_quota=config.SCHEDULER_RESERVED_QUOTA,
+                weights=config.PRIORITY_WEIGHTS,
+                deadlines=config.PRIORITY_DEADLINES,
+                queue_limits=config.PRIORITY_QUEUE_LIMITS
+            )
+        return _shared
@@ -0,0 +1,183 @@
+"""
+퀴즈 응답 파서 (추출·검증·보정을 한 번에)
+
+- 요청: model.QuizData에서 만든 JSON 스키마로 JSON 모드 / structured output 지정
+- 추출: 첫 '{'부터 JSONDecoder.raw_decode 한 번 (코드 블록·앞뒤 설명 문장은 자연히 무시)
+- 보정: 자주 나오는 결함은 다시 호출하지 않고 고침
+    - 끝에 남은 쉼표 (`, }`)
+    - 문자열 정답 ("2", "2번", "②", 선택지 문장 그대로)
+    - 번호 없는/형식이 다른 선택지 ("송금", "1) 송금", "A. 송금" → "1. 송금")
+    - 선택지가 {"1": ...} dict, 필드 이름 별칭 (answer, choices), 빠진 칭찬 멘트
+- 고칠 수 없으면 예외 (json.JSONDecodeError / KeyError / ValueError) → 호출 쪽에서 재시도
+"""
+import functools
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+REQUIRED_FIELDS = ("question", "options", "correct_answer", "explanation", "encouragement")
+
+FIELD_ALIASES = {
+    "answer": "correct_answer",
+    "correct": "correct_answer",
+    "choices": "options",
+    "explain": "explanation",
+    "praise": "encouragement",
+}
+
+DEFAULT_ENCOURAGEMENT = "정말 잘하셨어요!"
+
+CIRCLED = {"①": 1, "②": 2, "③": 3, "④": 4}
+
+_decoder = json.JSONDecoder()
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_OPTION_PREFIX = re.compile(
+    r"^\s*(?:\(?(?:[1-4]|[A-Da-d]|[가나다라])[.)](?=\s|$)|[1-4]번[.)]?(?=\s|$)|[①②③④][.)]?)\s*"
+)
+_ANSWER_NUMBER = re.compile(r"^\s*\(?([1-4①②③④])(?:\s*번|[.)]|\s*$)")
+
+
+@functools.lru_cache(maxsize=1)
+def quiz_json_schema() -> Dict:
+    """model.QuizData 기반 JSON 스키마 (structured output strict 모드 규칙에 맞춤)"""
+    from model import QuizData
+
+    schema = QuizData.model_json_schema()
+    schema.pop("title", None)
+    schema["additionalProperties"] = False
+    schema["required"] = list(schema["properties"])
+    for prop in schema["properties"].values():
+        prop.pop("title", None)
+    schema["properties"]["options"]["description"] = '선택지 4개, "1. 내용" 형식'
+    schema["properties"]["correct_answer"]["enum"] = [1, 2, 3, 4]
+    return schema
+
+
+def quiz_response_format(mode: str) -> Optional[Dict]:
+    """
+    요청의 response_format 값
+
+    Args:
+        mode: "json_schema" (structured output, gpt-4o 계열) / "json_object" (JSON 모드) / "none"
+    """
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "quiz", "strict": True, "schema": quiz_json_schema()}
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def parse_quiz(text: str) -> Tuple[Dict, List[str]]:
+    """
+    응답 텍스트 → (검증된 퀴즈 dict, 적용한 보정 목록)
+
+    Raises:
+        json.JSONDecodeError: JSON 객체를 찾지 못했거나 고칠 수 없는 문법 오류
+        KeyError, ValueError: 필드 검증 실패
+    """
+    repairs: List[str] = []
+    return validate_quiz(_decode(text, repairs), repairs), repairs
+
+
+def validate_quiz(data: Dict, repairs: Optional[List[str]] = None) -> Dict:
+    """
+    필드 검증 + 보정 (QuizData 필드만 남긴 새 dict 반환)
+
+    Raises:
+        KeyError, ValueError: 필드 검증 실패
+    """
+    if repairs is None:
+        repairs = []
+    if not isinstance(data, dict):
+        raise ValueError(f"퀴즈가 객체가 아닙니다: {type(data).__name__}")
+
+    data = dict(data)
+    for alias, field in FIELD_ALIASES.items():
+        if field not in data and alias in data:
+            data[field] = data.pop(alias)
+            repairs.append("field_alias")
+    if not data.get("encouragement"):
+        data["encouragement"] = DEFAULT_ENCOURAGEMENT
+        repairs.append("default_encouragement")
+
+    missing_fields = [f for f in REQUIRED_FIELDS if f not in data]
+    if missing_fields:
+        raise KeyError(f"필수 필드 누락: {', '.join(missing_fields)}")
+
+    for field in ("question", "explanation", "encouragement"):
+        if not isinstance(data[field], str) or not data[field].strip():
+            raise ValueError(f"{field}가 비어 있거나 문자열이 아닙니다.")
+
+    options = _options(data["options"], repairs)
+    return {
+        "question": data["question"].strip(),
+        "options": options,
+        "correct_answer": _answer(data["correct_answer"], options, repairs),
+        "explanation": data["explanation"].strip(),
+        "encouragement": data["encouragement"].strip()
+    }
+
+
+def _decode(text: str, repairs: List[str]):
+    start = text.find("{")
+    if start < 0:
+        raise json.JSONDecodeError("JSON 객체가 없습니다", text, 0)
+
+    try:
+        return _decoder.raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        fixed = _TRAILING_COMMA.sub(r"\1", text[start:])
+        if fixed == text[start:]:
+            raise
+        data = _decoder.raw_decode(fixed)[0]
+        repairs.append("trailing_comma")
+        return data
+
+
+def _options(options, repairs: List[str]) -> List[str]:
+    if isinstance(options, dict):
+        options = [options[k] for k in sorted(options, key=str)]
+        repairs.append("options_dict")
+
+    if not isinstance(options, list):
+        raise ValueError("options는 리스트가 아닙니다.")
+    if len(options) != 4:
+        raise ValueError(f"options가 {len(options)}개입니다. (4개 필요)")
+
+    normalized = []
+    for i, option in enumerate(options, 1):
+        if not isinstance(option, (str, int, float)):
+            raise ValueError(f"{i}번 선택지가 문자열이 아닙니다.")
+        option = str(option)
+        text = _OPTION_PREFIX.sub("", option, count=1).strip()
+        if not text:
+            raise ValueError(f"{i}번 선택지가 비어 있습니다.")
+        fixed = f"{i}. {text}"
+        if fixed != option:
+            repairs.append("option_numbering")
+        normalized.append(fixed)
+    return normalized
+
+
+def _answer(answer, options: List[str], repairs: List[str]) -> int:
+    if isinstance(answer, int) and not isinstance(answer, bool) and 1 <= answer <= 4:
+        return answer
+
+    if isinstance(answer, str):
+        match = _ANSWER_NUMBER.match(answer)
+        if match:
+            repairs.append("answer_string")
+            digit = match.group(1)
+            return CIRCLED.get(digit) or int(digit)
+
+        # 선택지 문장을 그대로 정답으로 쓴 경우
+        text = _OPTION_PREFIX.sub("", answer, count=1).strip()
+        for i, option in enumerate(options, 1):
+            if text and option[len(f"{i}. "):] == text:
+                repairs.append("answer_text")
+                return i
+
+    raise ValueError(f"correct_answer가 '{answer}'입니다. (1~4 필요)")
@@ -0,0 +1,254 @@
+"""
+주제·난이도별 퀴즈 사전 생성 풀
+
+백그라운드 워커가 (topic, difficulty)별 퀴즈를 low_water 아래로 떨어질 때마다
+target 개수까지 미리 만들어 둡니다. generate_quiz는 풀에서 바로 꺼내 쓰고,
+풀이 비었거나 등록하지 않은 주제·난이도(register)일 때만 실시간 생성으로 넘어갑니다.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str]
+
+
+def quiz_fingerprint(quiz: Dict) -> str:
+    """같은 문제인지 판별하기 위한 지문 (공백 무시한 질문 해시)"""
+    question = "".join(str(quiz.get("question", "")).split())
+    return hashlib.sha1(question.encode("utf-8")).hexdigest()
+
+
+class QuizPool:
+    def __init__(
+        self,
+        generate: Callable[[str, str], Dict],
+        validate: Callable[[Dict], Dict],
+        low_water: int = 2,
+        target: int = 4,
+        max_seen_per_user: int = 200,
+        max_users: int = 10000,
+        retry_delay: float = 5.0
+    ):
+        """
+        Args:
+            generate: (topic, difficulty) → generate_quiz 형식의 결과 dict
+            validate: 퀴즈 dict 검증 함수 (실패 시 KeyError/ValueError)
+            low_water: 이 개수 미만이면 워커가 채우기 시작
+            target: 한 번 채울 때 목표 개수
+            max_seen_per_user: 사용자별로 기억할 푼 문제 수
+            max_users: 푼 문제 기록을 유지할 최대 사용자 수
+            retry_delay: 생성 실패 후 다시 시도하기까지 대기 시간(초)
+        """
+        self.generate = generate
+        self.validate = validate
+        self.low_water = low_water
+        self.target = max(target, low_water)
+        self.max_seen_per_user = max_seen_per_user
+        self.max_users = max_users
+        self.retry_delay = retry_delay
+
+        self._pools: Dict[PoolKey, Deque[Dict]] = {}
+        self._seen: "OrderedDict[str, Tuple[Deque[str], Set[str]]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "generated": 0,
+            "rejected": 0,
+            "duplicates": 0,
+            "generate_failures": 0
+        }
+
+    # ========== 풀 조작 ==========
+
+    def register(self, topic: str, difficulty: str):
+        """워커가 채울 대상으로 등록"""
+        with self._cond:
+            if (topic, difficulty) not in self._pools:
+                self._pools[(topic, difficulty)] = deque()
+                self._cond.notify()
+
+    def put(self, topic: str, difficulty: str, quiz: Dict, front: bool = False) -> bool:
+        """검증 후 풀에 추가 (등록하지 않은 주제·검증 실패·중복이면 False, front: 다음에 바로 꺼내도록 맨 앞에)"""
+        try:
+            quiz = self.validate(quiz)
+        except (KeyError, ValueError, TypeError) as e:
+            logger.warning(f"퀴즈 풀 검증 실패: {e}")
+            with self._cond:
+                self._stats["rejected"] += 1
+            return False
+
+        fingerprint = quiz_fingerprint(quiz)
+        with self._cond:
+            pool = self._pools.get((topic, difficulty))
+            if pool is None:
+                return False
+            if any(quiz_fingerprint(q) == fingerprint for q in pool):
+                self._stats["duplicates"] += 1
+                return False
+            if front:
+                pool.appendleft(quiz)
+            else:
+                pool.append(quiz)
+            return True
+
+    def pop(self, topic: str, difficulty: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """사용자가 아직 안 본 퀴즈 하나를 꺼냄 (없으면 None)"""
+        with self._cond:
+            pool = self._pools.get((topic, difficulty))
+            if pool is None:
+                # 등록하지 않은 주제·난이도는 실시간 생성 (요청마다 풀·워커 작업을 새로 만들지 않음)
+                self._stats["misses"] += 1
+                return None
+
+            seen = self._seen_set(user_id)
+            quiz = None
+            for i, candidate in enumerate(pool):
+                if quiz_fingerprint(candidate) not in seen:
+                    quiz = candidate
+                    del pool[i]
+                    break
+
+            if len(pool) < self.low_water:
+                self._cond.notify()
+
+            if quiz is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            self._mark_seen_locked(user_id, quiz)
+            return quiz
+
+    def mark_seen(self, user_id: Optional[str], quiz: Dict):
+        """실시간 생성으로 받은 퀴즈도 푼 문제로 기록"""
+        with self._cond:
+            self._mark_seen_locked(user_id, quiz)
+
+    def unsee(self, user_id: Optional[str], quiz: Dict):
+        """푼 문제 기록에서 뺌 (꺼냈지만 보여 주지 않은 퀴즈)"""
+        if user_id is None:
+            return
+        with self._cond:
+            if user_id not in self._seen:
+                return
+            order, seen = self._seen[user_id]
+            fingerprint = quiz_fingerprint(quiz)
+            if fingerprint in seen:
+                seen.discard(fingerprint)
+                order.remove(fingerprint)
+
+    def size(self, topic: str, difficulty: str) -> int:
+        with self._cond:
+            return len(self._pools.get((topic, difficulty), ()))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            served = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / served if served else 0.0,
+                "pool_sizes": {
+                    f"{topic}/{difficulty}": len(pool)
+                    for (topic, difficulty), pool in self._pools.items()
+                }
+            }
+
+    # ========== 백그라운드 워커 ==========
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="quiz-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._cond:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def _next_key(self) -> Optional[PoolKey]:
+        """가장 많이 비어있는 풀 선택"""
+        lacking = [
+            (len(pool), key)
+            for key, pool in self._pools.items()
+            if len(pool) < self.low_water
+        ]
+        return min(lacking)[1] if lacking else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                key = self._next_key()
+                while key is None and not self._stopping:
+                    self._cond.wait()
+                    key = self._next_key()
+                if self._stopping:
+                    return
+
+            if not self._fill(*key):
+                with self._cond:
+                    if not self._stopping:
+                        self._cond.wait(self.retry_delay)
+
+    def _fill(self, topic: str, difficulty: str) -> bool:
+        """target 개수까지 채움 (연속 실패 시 False)"""
+        failures = 0
+        while self.size(topic, difficulty) < self.target and failures < 3:
+            if self._stopping:
+                return True
+
+            result = self.generate(topic, difficulty)
+            if not result.get("success"):
+                failures += 1
+                with self._cond:
+                    self._stats["generate_failures"] += 1
+                continue
+
+            if self.put(topic, difficulty, result["quiz"]):
+                with self._cond:
+                    self._stats["generated"] += 1
+            else:
+                failures += 1
+
+        return failures < 3
+
+    # ========== 내부 ==========
+
+    def _seen_set(self, user_id: Optional[str]) -> Set[str]:
+        if user_id is None or user_id not in self._seen:
+            return set()
+        self._seen.move_to_end(user_id)
+        return self._seen[user_id][1]
+
+    def _mark_seen_locked(self, user_id: Optional[str], quiz: Dict):
+        if user_id is None:
+            return
+
+        if user_id not in self._seen:
+            self._seen[user_id] = (deque(), set())
+            while len(self._seen) > self.max_users:
+                self._seen.popitem(last=False)
+
+        order, seen = self._seen[user_id]
+        fingerprint = quiz_fingerprint(quiz)
+        if fingerprint in seen:
+            return
+        order.append(fingerprint)
+        seen.add(fingerprint)
+        while len(order) > self.max_seen_per_user:
+            seen.discard(order.popleft())
@@ -0,0 +1,328 @@
+"""
+클라이언트 측 요청량 조절 + 재시도 스케줄러
+
+모든 SonjuAI 인스턴스가 프로세스 안에서 하나의 스케줄러를 공유합니다.
+
+- 최근 60초 동안의 요청 수(RPM)와 토큰 수(TPM)를 추적
+- 한도를 넘을 요청은 실패시키지 않고 자리가 날 때까지 대기열에서 기다림
+- 호출 전에는 (프롬프트 추정 + max_tokens)로 예약하고, 응답 후 실제 tokens_used로 보정
+- 429 / 일시적 오류는 retry-after 헤더를 지키면서 지터가 섞인 지수 백오프로 재시도
+  (재시도도 첫 시도와 같은 입장 절차(admit)를 거침 - 우선순위 대기열을 건너뛰지 않게)
+- 거절된 요청(429 등)은 예약을 돌려주고, 시간 초과는 이미 처리됐을 수 있으므로 추정치를 그대로 셈
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WINDOW_SECONDS = 60.0
+
+
+def _retryable_errors() -> tuple:
+    """재시도 대상 예외 (openai import를 실제 호출 시점으로 미룸)"""
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def _maybe_processed(error: Exception) -> bool:
+    """서버가 요청을 받아 토큰을 썼을 수 있는 오류 (시간 초과: 응답만 못 받았을 수 있음)"""
+    from openai import APITimeoutError
+    return isinstance(error, APITimeoutError)
+
+
+class Ticket:
+    """예약 한 건 (at: 시작 허용 시각, tokens: 차지하는 토큰 수)"""
+
+    __slots__ = ("at", "tokens")
+
+    def __init__(self, at: float, tokens: int):
+        self.at = at
+        self.tokens = tokens
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """응답 헤더의 retry-after-ms / retry-after 값 (초)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class RateLimitScheduler:
+    def __init__(
+        self,
+        rpm: int = 3500,
+        tpm: int = 90000,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0
+    ):
+        """
+        Args:
+            rpm: 분당 최대 요청 수
+            tpm: 분당 최대 토큰 수
+            max_retries: 재시도 최대 횟수
+            backoff_base: 첫 재시도 대기 시간(초), 이후 2배씩 증가
+            backoff_max: 재시도 대기 시간 상한(초)
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tickets: Deque[Ticket] = deque()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self._waiting = 0
+        self._waits_ms: Deque[float] = deque(maxlen=1000)
+        self._stats = {
+            "requests": 0,
+            "queued": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failed": 0,
+            "max_queue_depth": 0
+        }
+
+    # ========== 예약 ==========
+
+    def reserve(self, tokens: int) -> Ticket:
+        """한도 안에서 가장 이른 시작 시각을 예약 (대기열 순서 보장)"""
+        tokens = min(max(tokens, 0), self.tpm)
+
+        with self._lock:
+            now = time.monotonic()
+            ticket = Ticket(self._earliest(tokens, now, self.rpm, self.tpm), tokens)
+            self._tickets.append(ticket)
+            self._stats["requests"] += 1
+            return ticket
+
+    def try_reserve(self, tokens: int, share: float = 1.0) -> Tuple[Optional[Ticket], float]:
+        """
+        지금 바로 시작할 수 있을 때만 예약 (우선순위 스케줄러용)
+
+        Args:
+            share: 한도 중 이 비율까지만 채움 (나머지는 더 급한 요청 몫으로 남겨 둠)
+
+        Returns:
+            (예약 또는 None, None이면 자리가 나기까지 남은 초)
+        """
+        rpm = max(1, int(self.rpm * share))
+        tpm = max(1, int(self.tpm * share))
+        tokens = min(max(tokens, 0), tpm)
+
+        with self._lock:
+            now = time.monotonic()
+            start = self._earliest(tokens, now, rpm, tpm)
+            if start > now:
+                return None, start - now
+            ticket = Ticket(now, tokens)
+            self._tickets.append(ticket)
+            self._stats["requests"] += 1
+            return ticket, 0.0
+
+    def record(self, ticket: Ticket, tokens_used: Optional[int]):
+        """실제 사용 토큰으로 예약 보정 (None이면 추정치 유지)"""
+        if tokens_used is not None:
+            with self._lock:
+                ticket.tokens = tokens_used
+
+    def release(self, ticket: Ticket):
+        """거절된 요청(429 등)은 토큰을 쓰지 않았으므로 0으로"""
+        with self._lock:
+            ticket.tokens = 0
+
+    def penalize(self, seconds: float):
+        """서버가 알려준 시간 동안 새 요청 시작을 막음"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    # ========== 호출 ==========
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        estimated_tokens: int,
+        tokens_of: Callable[[T], Optional[int]] = None,
+        admit: Optional[Callable[[], Optional[Ticket]]] = None
+    ) -> T:
+        """
+        한도 대기 + 재시도를 적용해 fn() 호출
+
+        Args:
+            fn: 업스트림 호출
+            estimated_tokens: 예약할 토큰 수 (프롬프트 추정 + max_tokens)
+            tokens_of: 결과에서 실제 사용 토큰을 꺼내는 함수
+            admit: 시도마다 예약을 받아 오는 함수 (우선순위 스케줄러 입장, None이면 순서대로 예약)
+        """
+        attempt = 0
+        while True:
+            ticket = (admit() if admit else None) or self.reserve(estimated_tokens)
+            self._wait(ticket, time.sleep)
+            try:
+                result = fn()
+            except Exception as e:
+                if not isinstance(e, _retryable_errors()):
+                    raise
+                delay = self._on_error(ticket, e, attempt)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.record(ticket, tokens_of(result) if tokens_of else None)
+            return result
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        estimated_tokens: int,
+        tokens_of: Callable[[T], Optional[int]] = None,
+        admit: Optional[Callable[[], Awaitable[Optional[Ticket]]]] = None
+    ) -> T:
+        """call()의 비동기 버전 (대기 중에도 이벤트 루프를 막지 않음)"""
+        attempt = 0
+        while True:
+            ticket = (await admit() if admit else None) or self.reserve(estimated_tokens)
+            await self._await(ticket)
+            try:
+                result = await fn()
+            except Exception as e:
+                if not isinstance(e, _retryable_errors()):
+                    raise
+                delay = self._on_error(ticket, e, attempt)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.record(ticket, tokens_of(result) if tokens_of else None)
+            return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            window = [t for t in self._tickets if now - WINDOW_SECONDS < t.at <= now]
+            waits = sorted(self._waits_ms)
+            return {
+                **self._stats,
+                "queue_depth": self._waiting,
+                "requests_last_minute": len(window),
+                "tokens_last_minute": sum(t.tokens for t in window),
+                "wait_ms_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_ms_p95": waits[int(len(waits) * 0.95)] if waits else 0.0
+            }
+
+    # ========== 내부 ==========
+
+    def _earliest(self, tokens: int, now: float, rpm: int, tpm: int) -> float:
+        """tokens를 쓰는 요청이 시작할 수 있는 가장 이른 시각 (self._lock 안에서 호출)"""
+        while self._tickets and self._tickets[0].at <= now - WINDOW_SECONDS:
+            self._tickets.popleft()
+
+        tickets = list(self._tickets)
+        start = max(now, self._blocked_until, tickets[-1].at if tickets else now)
+
+        count = len(tickets)
+        used = sum(t.tokens for t in tickets)
+        i = 0
+        while True:
+            while i < len(tickets) and tickets[i].at <= start - WINDOW_SECONDS:
+                count -= 1
+                used -= tickets[i].tokens
+                i += 1
+            if count < rpm and used + tokens <= tpm:
+                return start
+            # 가장 오래된 예약이 창 밖으로 나가는 시각까지 미룸
+            start = tickets[i].at + WINDOW_SECONDS
+
+    def _begin_wait(self, ticket: Ticket) -> float:
+        delay = max(0.0, ticket.at - time.monotonic())
+        with self._lock:
+            self._waits_ms.append(delay * 1000)
+            if delay > 0:
+                self._waiting += 1
+                self._stats["queued"] += 1
+                self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._waiting)
+        return delay
+
+    def _end_wait(self, delay: float):
+        if delay > 0:
+            with self._lock:
+                self._waiting -= 1
+
+    def _wait(self, ticket: Ticket, sleep: Callable[[float], None]):
+        delay = self._begin_wait(ticket)
+        try:
+            if delay > 0:
+                sleep(delay)
+        finally:
+            self._end_wait(delay)
+
+    async def _await(self, ticket: Ticket):
+        delay = self._begin_wait(ticket)
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self._end_wait(delay)
+
+    def _on_error(self, ticket: Ticket, error: Exception, attempt: int) -> float:
+        """재시도 대기 시간 계산 (마지막 시도였으면 예외 전파)"""
+        if not _maybe_processed(error):
+            self.release(ticket)
+        retry_after = retry_after_seconds(error)
+        if _is_rate_limit(error):
+            with self._lock:
+                self._stats["rate_limited"] += 1
+            if retry_after:
+                self.penalize(retry_after)
+
+        if attempt >= self.max_retries:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise error
+
+        backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = max(retry_after or 0.0, random.uniform(backoff / 2, backoff))
+        with self._lock:
+            self._stats["retries"] += 1
+        logger.warning(f"Upstream error, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries}): {error}")
+        return delay
+
+
+_shared: Optional[RateLimitScheduler] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimitScheduler:
+    """프로세스 공용 스케줄러 (config 값으로 최초 1회 생성)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimitScheduler(
+                rpm=config.RATE_LIMIT_RPM,
+                tpm=config.RATE_LIMIT_TPM,
+                max_retries=config.RATE_LIMIT_MAX_RETRIES
+            )
+        return _shared
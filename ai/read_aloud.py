@@ -0,0 +1,294 @@
+"""
+소리 내어 읽어 주기용 문장 단위 스트리밍 (TTS)
+
+답변을 눈으로 읽지 않고 음성으로 듣는 어르신이 많습니다.
+chat_stream() / get_topic_guide_stream()의 delta 이벤트를 모아 문장(또는 "N단계")이 끝나는 즉시
+한 문장씩 내보내므로, 전체 답변을 기다리지 않고 첫 단계부터 읽어 드릴 수 있습니다.
+
+문장 경계
+- 줄바꿈
+- 마침표·물음표·느낌표·물결·말줄임표 (+ 닫는 따옴표·괄호) 뒤에 공백
+  (번호만 있는 "1." / "2단계." 는 경계로 보지 않음, "3.5"처럼 공백이 없으면 소수점)
+- "N단계" 표시 앞 (모델이 문장부호 없이 "1단계: ... 2단계: ..."로 이어 쓸 때)
+- max_chars를 넘도록 경계가 없으면 쉼표·띄어쓰기에서 자름 (첫 문장이 너무 늦지 않게)
+
+이벤트 형식:
+    {"type": "sentence", "text": str, "index": int, "step": int | None}
+    ... 마지막에 원래 스트림의 "done"(first_sentence_ms, sentences 추가) 또는 "error"
+
+첫 문장까지 걸린 시간은 sonju_first_sentence_seconds 히스토그램에 기록합니다 (요청 시작부터).
+
+사용:
+    sink = TextSink()
+    done = read_aloud(ai.chat_stream("토스로 송금하는 법 알려줘"), sink, method="chat")
+
+실행: python read_aloud.py "토스로 송금하는 법 알려줘"
+      python read_aloud.py --guide 토스_송금
+"""
+import argparse
+import logging
+import re
+import sys
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# 문장 끝 부호 (+ 닫는 따옴표·괄호) 뒤에 공백
+_SENTENCE_END = re.compile(r"[.!?~…。]+[)\]\"'”’」』]*(?=\s)")
+# 단계 시작: 앞이 공백이고 뒤에 ":", ".", ")" 또는 공백이 오는 "N단계"
+_STEP_MARK = re.compile(r"(?<!\S)\d+\s*단계(?=\s*[:.)]|\s)")
+_STEP_START = re.compile(r"^(\d+)\s*단계")
+# 번호만 있는 조각 ("1.", "2단계.") - 여기서는 문장을 끊지 않음
+_ENUMERATOR = re.compile(r"^(\d+|\d+\s*단계)$")
+# 평문 규칙을 어기고 섞여 나온 마크다운 (읽으면 "별표"로 들림)
+_MARKDOWN = re.compile(r"\*\*|__|^#+\s*|^[-*•]\s+")
+
+
+def speakable(text: str) -> str:
+    """읽어 줄 문장으로 정리 (마크다운 기호 제거, 공백 정리)"""
+    return " ".join(_MARKDOWN.sub("", text.strip()).split())
+
+
+class SentenceSplitter:
+    """delta 텍스트를 받아 끝난 문장을 돌려주는 누적기"""
+
+    def __init__(self, max_chars: int = 120):
+        """
+        Args:
+            max_chars: 경계 없이 이 길이를 넘으면 쉼표·띄어쓰기에서 자름
+        """
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """텍스트 조각 추가 → 새로 끝난 문장들"""
+        self._buffer += text
+        sentences = []
+        while True:
+            cut = self._boundary(self._buffer)
+            if cut is None and len(self._buffer) > self.max_chars:
+                cut = self._soft_boundary(self._buffer)
+            if cut is None:
+                break
+            sentence, self._buffer = speakable(self._buffer[:cut]), self._buffer[cut:]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self) -> List[str]:
+        """스트림 끝 - 남은 텍스트를 마지막 문장으로"""
+        sentence, self._buffer = speakable(self._buffer), ""
+        return [sentence] if sentence else []
+
+    @staticmethod
+    def _boundary(buffer: str) -> Optional[int]:
+        """가장 앞의 문장 경계 (그 위치까지가 한 문장)"""
+        cuts = []
+        newline = buffer.find("\n")
+        if newline >= 0:
+            cuts.append(newline + 1)
+        for match in _SENTENCE_END.finditer(buffer):
+            if not _ENUMERATOR.match(buffer[:match.start()].strip()):
+                cuts.append(match.end())
+                break
+        for match in _STEP_MARK.finditer(buffer):
+            if buffer[:match.start()].strip():
+                cuts.append(match.start())
+                break
+        return min(cuts) if cuts else None
+
+    def _soft_boundary(self, buffer: str) -> int:
+        window = buffer[:self.max_chars]
+        for separator in (", ", " "):
+            index = window.rfind(separator)
+            if index > 0:
+                return index + len(separator)
+        return self.max_chars
+
+
+class _SentenceStream:
+    """sentences() / asentences() 공통 상태"""
+
+    def __init__(self, method: str, max_chars: int):
+        self.method = method
+        self.splitter = SentenceSplitter(max_chars)
+        self.started = time.perf_counter()
+        self.first_sentence_ms: Optional[float] = None
+        self.count = 0
+        self.step: Optional[int] = None
+
+    def feed(self, event: Dict) -> Iterator[Dict]:
+        if event["type"] == "delta":
+            yield from self._emit(self.splitter.feed(event["text"]))
+        elif event["type"] == "done":
+            yield from self._emit(self.splitter.flush())
+            yield {**event, "first_sentence_ms": self.first_sentence_ms, "sentences": self.count}
+        else:
+            # 오류: 끝나지 않은 문장은 읽지 않음
+            yield event
+
+    def _emit(self, texts: List[str]) -> Iterator[Dict]:
+        for text in texts:
+            step = _STEP_START.match(text)
+            if step:
+                self.step = int(step.group(1))
+            if self.first_sentence_ms is None:
+                self.first_sentence_ms = (time.perf_counter() - self.started) * 1000
+                get_metrics().observe("sonju_first_sentence_seconds", self.first_sentence_ms / 1000, method=self.method)
+            yield {"type": "sentence", "text": text, "index": self.count, "step": self.step}
+            self.count += 1
+
+
+def sentences(
+    events: Iterable[Dict],
+    method: str = "chat",
+    max_chars: int = 120,
+    deltas: bool = False
+) -> Iterator[Dict]:
+    """
+    스트림 이벤트 → 문장 이벤트
+
+    Args:
+        events: chat_stream() / get_topic_guide_stream()의 이벤트 (처음 꺼낼 때 요청이 시작됨)
+        method: 첫 문장 지연 지표의 method 라벨
+        max_chars: SentenceSplitter.max_chars
+        deltas: True면 delta 이벤트도 그대로 함께 내보냄 (화면 표시 + 읽어 주기)
+    """
+    stream = _SentenceStream(method, max_chars)
+    for event in events:
+        if deltas and event["type"] == "delta":
+            yield event
+        yield from stream.feed(event)
+
+
+async def asentences(
+    events: AsyncIterator[Dict],
+    method: str = "chat",
+    max_chars: int = 120,
+    deltas: bool = False
+) -> AsyncIterator[Dict]:
+    """sentences()의 비동기 버전 (achat_stream() / aget_topic_guide_stream())"""
+    stream = _SentenceStream(method, max_chars)
+    async for event in events:
+        if deltas and event["type"] == "delta":
+            yield event
+        for sentence in stream.feed(event):
+            yield sentence
+
+
+# ========== 읽어 주기 ==========
+
+class SpeechSink:
+    """
+    문장을 받아 읽어 주는 쪽 (TTS 엔진 연결부)
+
+    speak()은 스트림을 읽는 중에 불리므로, 음성 합성·재생은 큐에 넣고 바로 돌아와야 합니다.
+    """
+
+    def speak(self, text: str, step: Optional[int] = None):
+        """문장 하나 읽기 (step: 속한 "N단계" 번호, 단계가 바뀔 때 쉬어 가는 데 씀)"""
+        raise NotImplementedError
+
+    def close(self):
+        """답변이 끝남 (남은 음성 재생 마무리 등)"""
+
+
+class TextSink(SpeechSink):
+    """음성 대신 문장과 도착 시각을 기록 (테스트·콘솔 확인용)"""
+
+    def __init__(self, out: Optional[TextIO] = None):
+        """
+        Args:
+            out: 문장을 바로 출력할 파일 (None이면 기록만)
+        """
+        self.out = out
+        self.started = time.perf_counter()
+        self.spoken: List[Tuple[float, Optional[int], str]] = []
+        self.closed = False
+
+    def speak(self, text: str, step: Optional[int] = None):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        self.spoken.append((elapsed_ms, step, text))
+        if self.out is not None:
+            print(f"[{elapsed_ms:7.0f}ms] {text}", file=self.out, flush=True)
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def text(self) -> str:
+        return " ".join(text for _, _, text in self.spoken)
+
+    @property
+    def first_ms(self) -> Optional[float]:
+        return self.spoken[0][0] if self.spoken else None
+
+
+def read_aloud(events: Iterable[Dict], sink: SpeechSink, method: str = "chat", max_chars: int = 120) -> Dict:
+    """
+    스트림을 문장 단위로 sink에 넘겨 읽어 줌
+
+    Returns:
+        원래 스트림의 마지막 이벤트 (done이면 first_sentence_ms, sentences 포함)
+    """
+    last: Dict = {"type": "error", "success": False, "error": "빈 스트림"}
+    try:
+        for event in sentences(events, method, max_chars):
+            if event["type"] == "sentence":
+                sink.speak(event["text"], event["step"])
+            else:
+                last = event
+    finally:
+        sink.close()
+    return last
+
+
+async def aread_aloud(events: AsyncIterator[Dict], sink: SpeechSink, method: str = "chat", max_chars: int = 120) -> Dict:
+    """read_aloud()의 비동기 버전"""
+    last: Dict = {"type": "error", "success": False, "error": "빈 스트림"}
+    try:
+        async for event in asentences(events, method, max_chars):
+            if event["type"] == "sentence":
+                sink.speak(event["text"], event["step"])
+            else:
+                last = event
+    finally:
+        sink.close()
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="답변을 문장 단위로 받아 첫 문장 지연 확인")
+    parser.add_argument("message", nargs="?", default="토스로 송금하는 법 알려줘", help="채팅 메시지")
+    parser.add_argument("--guide", default=None, help="채팅 대신 주제별 가이드 (예: 토스_송금)")
+    parser.add_argument("--max-chars", type=int, default=None)
+    args = parser.parse_args()
+
+    from ai_service import SonjuAI, setup_logging
+    from config import config
+
+    setup_logging(logging.WARNING)
+    ai = SonjuAI()
+    max_chars = args.max_chars or config.READ_ALOUD_MAX_CHARS
+
+    if args.guide:
+        method, events = "get_topic_guide", ai.get_topic_guide_stream(args.guide)
+    else:
+        method, events = "chat", ai.chat_stream(args.message, semantic_cache=False)
+
+    sink = TextSink(out=sys.stdout)
+    done = read_aloud(events, sink, method=method, max_chars=max_chars)
+    if not done.get("success"):
+        print(f"실패: {done.get('error')}", file=sys.stderr)
+        sys.exit(1)
+
+    ttft = done.get("ttft_ms")
+    print(f"\n첫 토큰 {ttft or 0:.0f}ms / 첫 문장 {done['first_sentence_ms'] or 0:.0f}ms / "
+          f"전체 {done.get('total_ms') or 0:.0f}ms, {done['sentences']}문장")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import atexit
+import functools
 import logging
 import re
 
@@ -6,53 +8,64 @@ logging.getLogger().setLevel(logging.CRITICAL)
 logging.getLogger('httpx').setLevel(logging.CRITICAL)
 logging.getLogger('ai_service').setLevel(logging.CRITICAL)
 
-from ai_service import SonjuAI
+from ai_service import SonjuAI, setup_logging
+from config import config
+from history import ConversationMemory
+from intent import detect_intent, get_detector
+from prefetch import Prefetcher
 
-def detect_intent(message: str) -> dict:
-    """사용자 의도 파악"""
-    # 퀴즈 요청 감지
-    quiz_keywords = ['퀴즈', '문제', '테스트', '시험', '내줘', '내주']
-    if any(keyword in message for keyword in quiz_keywords):
-        topics = ['토스', '카카오톡', '전화', '문자', '사진']
-        for topic in topics:
-            if topic in message:
-                return {'type': 'quiz', 'topic': topic}
-        return {'type': 'quiz', 'topic': '토스'}
-    
-    # 가이드 요청 감지
-    guide_keywords = ['알려줘', '알려주세요', '알려주', '가르쳐', '방법', '어떻게', '어케', '가이드']
-    
-    if any(keyword in message for keyword in guide_keywords):
-        # 구체적인 기능 가이드
-        if '송금' in message or '돈 보내' in message or '보내는' in message:
-            return {'type': 'guide', 'topic': '송금'}
-        
-        if '계좌' in message:
-            return {'type': 'guide', 'topic': '계좌'}
-        
-        if '전화' in message:
-            return {'type': 'guide', 'topic': '전화'}
-        
-        if '문자' in message:
-            return {'type': 'guide', 'topic': '문자'}
-        
-        if '사진' in message:
-            return {'type': 'guide', 'topic': '사진'}
-        
-        # 앱별 기본 가이드
-        if '토스' in message:
-            return {'type': 'guide', 'topic': 'app_토스'}
-        
-        if '카카오톡' in message or '카톡' in message:
-            return {'type': 'guide', 'topic': 'app_카카오톡'}
-    
-    return {'type': 'chat'}
+def print_stream(events) -> dict:
+    """스트림 이벤트를 도착하는 대로 출력하고 마지막 이벤트(done/error) 반환"""
+    started = False
+    for event in events:
+        if event['type'] == 'delta':
+            if not started:
+                print("\n손주톡톡: ", end="", flush=True)
+                started = True
+            print(event['text'], end="", flush=True)
+        else:
+            if started:
+                print("\n")
+            return event
+    return {'type': 'error', 'success': False}
 
 def main():
+    setup_logging(logging.CRITICAL)
     ai = SonjuAI()
+    if config.CONSOLE_QUIZ_POOL:
+        # 퀴즈를 청하시면 바로 낼 수 있게 미리 만들어 둠 (켤 때마다 호출 비용이 들어 기본은 끔)
+        ai.start_quiz_pool()
+    if config.WARMUP_ON_START:
+        # 안내 문구를 읽는 동안 클라이언트 생성·첫 연결을 미리 해둠
+        ai.warm_up()
     current_quiz = None
-    conversation_history = []
-    max_history = 10
+    current_topic = None
+    # 가이드·퀴즈 해설을 읽는 동안 다음에 청하실 퀴즈·가이드를 미리 만들어 둠
+    prefetcher = Prefetcher(
+        fetchers={
+            # 미리 꺼낸 퀴즈도 이 사용자가 본 문제로 기록 (퀴즈 풀 중복 방지)
+            "quiz": functools.partial(ai.generate_quiz, user_id=config.CONSOLE_USER_ID),
+            "guide": ai.get_topic_guide
+        },
+        quiz_topics=[entry["topic"] for entry in get_detector().quiz_topics],
+        min_probability=config.PREFETCH_MIN_PROBABILITY,
+        prior=config.PREFETCH_PRIOR,
+        budget_ratio=config.PREFETCH_BUDGET_RATIO,
+        burst=config.PREFETCH_BURST,
+        wait_seconds=config.PREFETCH_WAIT_SECONDS,
+        start_delay=config.PREFETCH_START_DELAY,
+        stats_path=config.PREFETCH_STATS_PATH,
+        # 빗나간 퀴즈는 풀로 돌려놓고 본 문제 기록에서 뺌 (다음에 그 주제를 청하시면 호출 없이 냄)
+        returns={"quiz": functools.partial(ai.return_quiz, user_id=config.CONSOLE_USER_ID)}
+    ) if config.PREFETCH_ENABLED else None
+    if prefetcher is not None:
+        # 종료('그만')·Ctrl+C 모두 적중률을 남기고 전이 통계를 저장
+        atexit.register(prefetcher.close)
+    memory = ConversationMemory(
+        summarize=ai.summarize_history,
+        budget=config.HISTORY_TOKEN_BUDGET,
+        summary_trigger=config.HISTORY_SUMMARY_TRIGGER
+    )
     
     print("=" * 50)
     print("손주톡톡 AI 챗봇")
@@ -88,6 +101,8 @@ def main():
                 print(f"{result['explanation']}\n")
                 
                 current_quiz = None
+                if prefetcher is not None:
+                    prefetcher.served(f"answered:{current_topic}")
                 continue
             elif answer:
                 print("\n1, 2, 3, 4 중 하나를 선택해주세요!\n")
@@ -106,32 +121,24 @@ def main():
             if topic.startswith('app_'):
                 app_name = topic.replace('app_', '')
                 print(f"\n{app_name}의 기본 사용법을 알려드릴게요...\n")
-                
-                # 앱별 기본 사용법 요청
-                guide_prompt = f"{app_name} 앱의 기본 사용법을 어르신이 이해하기 쉽게 단계별로 설명해주세요."
-                response = ai.chat(guide_prompt, conversation_history=conversation_history)
             else:
                 # 기존 기능별 가이드
                 print(f"\n{topic} 가이드를 준비하고 있어요...\n")
-                
-                topic_map = {
-                    '송금': '토스_송금',
-                    '계좌': '토스_계좌조회',
-                    '전화': '전화걸기',
-                    '문자': '문자보내기',
-                    '사진': '사진찍기'
-                }
-                
-                guide_topic = topic_map.get(topic, topic)
-                response = ai.get_topic_guide(guide_topic)
+            
+            # 기능 → 가이드 주제 매핑은 intent_table.json에 있음 (송금 → 토스_송금, 앱은 app_토스 그대로)
+            # 가이드 팩에 있는 주제는 네트워크 없이 바로 출력
+            guide_topic = intent.get('guide_topic', topic)
+            prefetched = prefetcher.take(f"guide:{guide_topic}") if prefetcher is not None else None
+            if prefetched:
+                print(f"\n손주톡톡: {prefetched['message']}\n")
+                response = prefetched
+            else:
+                response = print_stream(ai.get_topic_guide_stream(guide_topic))
             
             if response["success"]:
-                print(f"\n손주톡톡: {response['message']}\n")
-                conversation_history.append({"role": "user", "content": user_input})
-                conversation_history.append({"role": "assistant", "content": response['message']})
-                
-                if len(conversation_history) > max_history * 2:
-                    conversation_history = conversation_history[-max_history * 2:]
+                memory.add_turn(user_input, response['message'])
+                if prefetcher is not None:
+                    prefetcher.served(f"guide:{guide_topic}")
             else:
                 print("\n지금은 답변을 드리기 어려워요. 다시 시도해주세요.\n")
             continue
@@ -139,11 +146,14 @@ def main():
         # 퀴즈 요청
         if intent['type'] == 'quiz':
             topic = intent['topic']
-            result = ai.generate_quiz(topic)
+            result = prefetcher.take(f"quiz:{topic}") if prefetcher is not None else None
+            if result is None:
+                result = ai.generate_quiz(topic, user_id=config.CONSOLE_USER_ID)
             
             if result["success"]:
                 quiz = result["quiz"]
                 current_quiz = quiz
+                current_topic = topic
                 
                 print(f"\n손주톡톡: {quiz['question']}\n")
                 for option in quiz['options']:
@@ -154,15 +164,14 @@ def main():
             continue
         
         # 일반 대화
-        response = ai.chat(user_input, conversation_history=conversation_history)
+        if prefetcher is not None:
+            prefetcher.take("chat")
+        response = print_stream(ai.chat_stream(user_input, conversation_history=memory.history()))
         
         if response["success"]:
-            print(f"\n손주톡톡: {response['message']}\n")
-            conversation_history.append({"role": "user", "content": user_input})
-            conversation_history.append({"role": "assistant", "content": response['message']})
-            
-            if len(conversation_history) > max_history * 2:
-                conversation_history = conversation_history[-max_history * 2:]
+            memory.add_turn(user_input, response['message'])
+            if prefetcher is not None:
+                prefetcher.served("chat")
         else:
             print("\n지금은 답변을 드리기 어려워요. 다시 시도해주세요.\n")
 
@@ -0,0 +1,219 @@
+"""
+유사 질문 답변 캐시
+
+"송금 어떻게 해" / "돈 보내는 방법 알려줘"처럼 표현만 다른 첫 질문에
+이미 만든 답변을 API 호출 없이 돌려줍니다.
+
+- 한국어 정규화 (공백·문장부호 제거, 자주 쓰는 동의 표현 통일)
+- 문자 2·3-gram 해싱 벡터 → L2 정규화 → NumPy 행렬에 누적
+- 코사인 유사도가 threshold 이상이고 주제 서명(signature)과 극성(polarity)이 같을 때만 히트
+  (문자 n-gram은 "안 좋아서" / "좋아서", "크게" / "작게"를 거의 같게 보므로 부정·반대말은 따로 비교)
+- 최대 개수 초과 시 가장 오래 안 쓴 항목부터 교체, TTL 지난 항목은 무시
+"""
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import deque
+from typing import Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+# 같은 뜻의 표현을 하나로 통일 (긴 표현부터 치환)
+SYNONYMS = {
+    "돈보내는": "송금",
+    "돈보내": "송금",
+    "이체": "송금",
+    "카톡": "카카오톡",
+    "어케": "어떻게",
+    "어떡해": "어떻게",
+    "알려주세요": "알려줘",
+    "알려줄래": "알려줘",
+    "알려주라": "알려줘",
+    "가르쳐주세요": "알려줘",
+    "가르쳐줘": "알려줘",
+    "설명해주세요": "알려줘",
+    "설명해줘": "알려줘",
+    "하는법": "방법",
+    "하는방법": "방법",
+}
+
+# 질문 끝에 붙는 요청 표현 (내용과 무관하므로 떼어냄)
+REQUEST_ENDINGS = (
+    "알려줘", "방법", "어떻게", "하나요", "해요", "하죠", "하는", "해", "요", "줘", "좀", "을", "를", "는"
+)
+
+_SYNONYM_PATTERN = re.compile(
+    "|".join(re.escape(k) for k in sorted(SYNONYMS, key=len, reverse=True))
+)
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]")
+
+# 부정 표현 ("안 돼요", "못 찾겠어", "않아요", "없어요")
+NEGATION = re.compile(
+    r"(?<![가-힣])안(?=\s|좋|되|돼|나와|나오|들려|보여|켜|열려)|(?<![가-힣])못(?=\s|하|해|했|찾|들|보)|않|없|말고|싫"
+)
+
+# 뜻이 반대인 표현 - 축: (한쪽, 반대쪽)
+OPPOSITES = {
+    "크기": (r"크게|키우|키워|늘리|늘려|올리|올려|높이|높여", r"작게|줄이|줄여|내리|내려|낮추|낮춰"),
+    "전원": (r"켜기|켜는|켜줘|켜요|켜려|켜고", r"끄기|끄는|꺼줘|꺼요|끄려|끄고"),
+    "열기": (r"열기|열어|여는|열려", r"닫기|닫아|닫는|닫혀"),
+    "추가": (r"추가|설치|등록|가입|저장", r"삭제|지우|지워|제거|해제|탈퇴"),
+    "방향": (r"보내|보낸|송금", r"받기|받는|받은|받으|받아"),
+    "밝기": (r"밝게|밝히", r"어둡게|어두"),
+    "기분": (r"좋|기쁘|기뻐|행복", r"나쁘|나빠|슬프|슬퍼|속상|우울"),
+}
+_OPPOSITE_PATTERNS = [
+    (axis, side, re.compile(pattern))
+    for axis, sides in OPPOSITES.items()
+    for side, pattern in enumerate(sides)
+]
+
+
+def normalize(text: str) -> str:
+    """
+    비교용 정규화 텍스트
+
+    예: "돈 보내는 방법 알려줘" → "송금", "송금 어떻게 해요?" → "송금"
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    text = _NON_WORD.sub("", text)
+    text = _SYNONYM_PATTERN.sub(lambda m: SYNONYMS[m.group(0)], text)
+
+    stripped = True
+    while stripped:
+        stripped = False
+        for ending in REQUEST_ENDINGS:
+            if text.endswith(ending) and len(text) - len(ending) >= 2:
+                text = text[:-len(ending)]
+                stripped = True
+                break
+    return text
+
+
+def polarity(text: str) -> frozenset:
+    """
+    질문의 부정·반대말 표시 (같아야 히트)
+
+    예: "소리 크게 하는 방법" → {("크기", 0)}, "소리 작게 하는 방법" → {("크기", 1)},
+        "기분이 안 좋아" → {"부정", ("기분", 0)}
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    marks = {(axis, side) for axis, side, pattern in _OPPOSITE_PATTERNS if pattern.search(text)}
+    if NEGATION.search(text):
+        marks.add("부정")
+    return frozenset(marks)
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_entries: int = 2000,
+        ttl: Optional[float] = 24 * 3600,
+        dim: int = 1024,
+        ngram_sizes=(2, 3),
+        signature: Optional[Callable[[str], Hashable]] = None
+    ):
+        """
+        Args:
+            threshold: 히트로 인정할 최소 코사인 유사도
+            max_entries: 최대 항목 수
+            ttl: 항목 유효 시간(초, None이면 무제한)
+            dim: 해싱 벡터 차원
+            ngram_sizes: 사용할 문자 n-gram 길이
+            signature: 질문 → 주제 서명 (서명이 다르면 유사해도 미스, 예: 토스 vs 카카오톡)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.signature = signature
+
+        self._matrix = np.zeros((max_entries, dim), dtype=np.float32)
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._signatures: List[Hashable] = [None] * max_entries
+        self._polarities: List[frozenset] = [frozenset()] * max_entries
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self._lookups = 0
+        self._hits = 0
+        self._latencies_ms = deque(maxlen=1000)
+
+    def vectorize(self, text: str) -> np.ndarray:
+        """정규화 텍스트의 문자 n-gram 해싱 벡터 (L2 정규화)"""
+        norm = f"^{normalize(text)}$"
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for n in self.ngram_sizes:
+            for i in range(len(norm) - n + 1):
+                vector[zlib.crc32(norm[i:i + n].encode("utf-8")) % self.dim] += 1.0
+
+        length = np.linalg.norm(vector)
+        if length:
+            vector /= length
+        return vector
+
+    def get(self, question: str) -> Optional[str]:
+        """유사 질문의 답변 (없으면 None)"""
+        started = time.perf_counter()
+        vector = self.vectorize(question)
+        signature = self.signature(question) if self.signature else None
+        marks = polarity(question)
+
+        with self._lock:
+            self._lookups += 1
+            answer = None
+
+            if self._size:
+                scores = self._matrix[:self._size] @ vector
+                if self.ttl is not None:
+                    scores[self._created[:self._size] < time.time() - self.ttl] = -1.0
+
+                for index in np.argsort(scores)[::-1][:5]:
+                    if scores[index] < self.threshold:
+                        break
+                    if self._signatures[index] == signature and self._polarities[index] == marks:
+                        answer = self._answers[index]
+                        self._last_used[index] = time.time()
+                        self._hits += 1
+                        break
+
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+            return answer
+
+    def put(self, question: str, answer: str):
+        vector = self.vectorize(question)
+        signature = self.signature(question) if self.signature else None
+        marks = polarity(question)
+        now = time.time()
+
+        with self._lock:
+            if self._size < self.max_entries:
+                index = self._size
+                self._size += 1
+            else:
+                index = int(np.argmin(self._last_used))
+
+            self._matrix[index] = vector
+            self._answers[index] = answer
+            self._signatures[index] = signature
+            self._polarities[index] = marks
+            self._created[index] = now
+            self._last_used[index] = now
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            return {
+                "entries": self._size,
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "hit_rate": self._hits / self._lookups if self._lookups else 0.0,
+                "lookup_ms_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+                "lookup_ms_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+            }
@@ -0,0 +1,287 @@
+"""
+손주톡톡 AI 비동기 API 서버
+
+실행: python server.py  (또는 uvicorn server:app --host 0.0.0.0 --port 8000)
+
+모든 엔드포인트는 SonjuAI의 비동기 메서드(AsyncOpenAI)를 사용하므로
+여러 어르신의 요청이 스레드를 점유하지 않고 하나의 이벤트 루프를 공유합니다.
+
+대화 히스토리와 출제한 퀴즈는 서버 세션(session_store)에 보관하므로
+클라이언트는 message / quiz_id만 보내면 됩니다. (conversation_history·quiz_data 직접 전송도 지원)
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from ai_service import SonjuAI, setup_logging
+from config import config
+from http_clients import get_client_factory
+from intent import detect_intent
+from learning_stats import LearningStats
+from read_aloud import asentences
+from session_store import SessionStore
+from model import (
+    AnalysisRequest,
+    AnalysisResponse,
+    ChatRequest,
+    ChatResponse,
+    EventIngestRequest,
+    EventIngestResponse,
+    GuideRequest,
+    IntentRequest,
+    IntentResponse,
+    LessonStatsResponse,
+    QuizCheckRequest,
+    QuizCheckResponse,
+    QuizGenerateRequest,
+    QuizGenerateResponse,
+    SessionClearRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+ai: SonjuAI = None
+sessions: SessionStore = None
+learning: LearningStats = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작 시 SonjuAI 인스턴스 하나를 만들어 모든 요청이 공유"""
+    global ai, sessions, learning
+    setup_logging()
+    ai = SonjuAI()
+    sessions = SessionStore(
+        max_turns=config.SESSION_MAX_TURNS,
+        max_quizzes=config.SESSION_MAX_QUIZZES,
+        idle_ttl=config.SESSION_IDLE_TTL,
+        max_sessions=config.SESSION_MAX_SESSIONS,
+        max_bytes=config.SESSION_MAX_BYTES,
+        db_path=config.SESSION_DB_PATH
+    )
+    learning = LearningStats(top_errors=config.LEARNING_TOP_ERRORS, snapshot_path=config.LEARNING_STATS_PATH)
+    snapshot_task = asyncio.create_task(_snapshot_learning()) if config.LEARNING_STATS_PATH else None
+    ai.start_quiz_pool()
+    warm_task = None
+    if config.WARMUP_ON_START:
+        ai.warm_up()
+        warm_task = asyncio.create_task(ai.awarm_up())
+    yield
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+    ai.stop_quiz_pool(timeout=1)
+    await ai.aclose()
+    await get_client_factory().aclose()
+    sessions.close()
+    learning.close()
+
+
+async def _snapshot_learning():
+    """학습 집계를 주기적으로 저장 (이벤트 로그가 한없이 길어지지 않게)"""
+    while True:
+        await asyncio.sleep(config.LEARNING_SNAPSHOT_INTERVAL)
+        try:
+            await asyncio.to_thread(learning.save)
+        except OSError as e:
+            logger.warning(f"학습 집계 저장 실패: {e}")
+
+
+app = FastAPI(title="손주톡톡 AI", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "rate_limit": ai.rate_limiter.stats(),
+        "coalescing": ai.singleflight.stats(),
+        "sessions": sessions.stats(),
+        "learning": learning.stats(),
+        "analysis_templates": ai.analysis_templates.stats() if ai.analysis_templates is not None else None,
+        "routing": ai.router.stats(),
+        "hedging": ai.hedger.stats() if ai.hedger is not None else None,
+        "scheduler": ai.scheduler.stats() if ai.scheduler is not None else None,
+        "shared_cache": ai.cache_backend.stats() if ai.cache_backend is not None else None,
+        "http_pool": ai.clients.stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 포맷 지표 (대기열·풀 상태는 조회 시점 값으로 갱신)"""
+    rate_limit = ai.rate_limiter.stats()
+    ai.metrics.set_gauge("sonju_rate_limit_queue_depth", rate_limit["queue_depth"])
+    ai.metrics.set_gauge("sonju_rate_limit_tokens_last_minute", rate_limit["tokens_last_minute"])
+    ai.metrics.set_gauge("sonju_rate_limit_wait_ms_p95", rate_limit["wait_ms_p95"])
+    if ai.quiz_pool is not None:
+        for pool, size in ai.quiz_pool.stats()["pool_sizes"].items():
+            ai.metrics.set_gauge("sonju_quiz_pool_size", size, pool=pool)
+    for kind, pool in ai.clients.stats().items():
+        if isinstance(pool, dict):
+            ai.metrics.set_gauge("sonju_http_pool_connections", pool["connections"], client=kind)
+            ai.metrics.set_gauge("sonju_http_pool_active", pool["active"], client=kind)
+            ai.metrics.set_gauge("sonju_http_pool_reuse_ratio", pool["reuse_ratio"], client=kind)
+    session_stats = sessions.stats()
+    ai.metrics.set_gauge("sonju_sessions", session_stats["sessions"])
+    ai.metrics.set_gauge("sonju_session_bytes", session_stats["bytes"])
+    return ai.metrics.render_prometheus()
+
+
+async def _history(request: ChatRequest) -> Optional[List[Dict]]:
+    """요청에 히스토리가 있으면 그대로, 없으면 서버 세션에서 (토큰 예산만큼)"""
+    if request.conversation_history is not None:
+        return request.conversation_history
+    return await sessions.ahistory(
+        request.session_id or request.user_id,
+        request.user_id,
+        token_budget=config.HISTORY_TOKEN_BUDGET
+    )
+
+
+async def _remember(request: ChatRequest, answer: str):
+    """서버 세션을 쓰는 요청이면 이번 턴 저장"""
+    if request.conversation_history is None:
+        await sessions.aadd_turn(request.session_id or request.user_id, request.user_id, request.message, answer)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    """일반 채팅"""
+    result = await ai.achat(request.message, conversation_history=await _history(request))
+    if result["success"]:
+        await _remember(request, result["message"])
+    return {**result, "session_id": request.session_id or request.user_id}
+
+
+@app.post("/session/clear")
+async def clear_session(request: SessionClearRequest):
+    """대화 새로 시작 (세션의 히스토리·퀴즈 삭제)"""
+    await sessions.aclear(request.session_id or request.user_id, request.user_id)
+    return {"success": True}
+
+
+@app.post("/quiz/generate", response_model=QuizGenerateResponse)
+async def generate_quiz(request: QuizGenerateRequest):
+    """퀴즈 생성 (퀴즈는 세션에 저장하고 quiz_id로 돌려줌)"""
+    result = await ai.agenerate_quiz(request.topic, request.difficulty, user_id=request.user_id)
+    session_id = request.session_id or request.user_id
+    if result["success"]:
+        result["quiz_id"] = await sessions.aput_quiz(session_id, request.user_id, result["quiz"])
+    return {**result, "session_id": session_id}
+
+
+@app.post("/quiz/check", response_model=QuizCheckResponse)
+async def check_quiz(request: QuizCheckRequest):
+    """퀴즈 정답 체크 (API 호출 없음)"""
+    quiz_data = request.quiz_data
+    if quiz_data is None:
+        if request.quiz_id is None:
+            raise HTTPException(status_code=400, detail="quiz_id 또는 quiz_data가 필요합니다.")
+        quiz_data = await sessions.aget_quiz(request.session_id or request.user_id, request.user_id, request.quiz_id)
+        if quiz_data is None:
+            raise HTTPException(status_code=404, detail="퀴즈를 찾을 수 없어요. 새 퀴즈를 받아주세요.")
+    
+    result = ai.check_quiz_answer(quiz_data, request.user_answer)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
+
+@app.post("/analysis", response_model=AnalysisResponse)
+async def generate_analysis(request: AnalysisRequest):
+    """학습 분석 텍스트 생성 (learning_data 또는 lesson: /events로 모은 집계 사용)"""
+    learning_data = request.learning_data
+    if learning_data is None:
+        if not request.lesson:
+            raise HTTPException(status_code=400, detail="learning_data 또는 lesson이 필요합니다.")
+        learning_data = learning.learning_data(request.user_id, request.lesson)
+        if learning_data is None:
+            raise HTTPException(status_code=404, detail="해당 레슨의 학습 기록이 없습니다.")
+    return await ai.agenerate_analysis(learning_data, use_llm=request.use_llm)
+
+
+# ========== 학습 이벤트 ==========
+
+@app.post("/events", response_model=EventIngestResponse)
+async def ingest_events(request: EventIngestRequest):
+    """레슨 단계 이벤트 묶음 수집 (사용자·레슨별 집계만 갱신)"""
+    accepted, rejected = learning.ingest(event.model_dump() for event in request.events)
+    return {"accepted": accepted, "rejected": rejected, "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/stats/{user_id}/{lesson}", response_model=LessonStatsResponse)
+async def lesson_stats(user_id: str, lesson: str):
+    """사용자·레슨 누적 집계"""
+    aggregate = learning.aggregate(user_id, lesson)
+    if aggregate is None:
+        raise HTTPException(status_code=404, detail="해당 레슨의 학습 기록이 없습니다.")
+    return aggregate
+
+
+@app.post("/guide", response_model=ChatResponse)
+async def get_topic_guide(request: GuideRequest):
+    """주제별 가이드"""
+    return await ai.aget_topic_guide(request.topic)
+
+
+@app.post("/intent", response_model=IntentResponse)
+async def intent(request: IntentRequest):
+    """사용자 의도 파악 (API 호출 없음)"""
+    return detect_intent(request.message)
+
+
+# ========== 스트리밍 (Server-Sent Events) ==========
+
+async def _sse(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    """스트림 이벤트 → SSE 프레임 ("event: delta|sentence|done|error")"""
+    async for event in events:
+        yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(events: AsyncIterator[Dict]) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _remember_stream(request: ChatRequest, events: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+    async for event in events:
+        if event["type"] == "done":
+            await _remember(request, event["message"])
+        yield event
+
+
+def _sentences(events: AsyncIterator[Dict], method: str, enabled: bool) -> AsyncIterator[Dict]:
+    """?sentences=true: delta 대신 끝난 문장마다 "sentence" 이벤트 (음성으로 읽어 주는 클라이언트용)"""
+    if not enabled:
+        return events
+    return asentences(events, method=method, max_chars=config.READ_ALOUD_MAX_CHARS)
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, sentences: bool = False):
+    """일반 채팅 스트리밍"""
+    events = _remember_stream(request, ai.achat_stream(request.message, conversation_history=await _history(request)))
+    return _sse_response(_sentences(events, "chat", sentences))
+
+
+@app.post("/guide/stream")
+async def get_topic_guide_stream(request: GuideRequest, sentences: bool = False):
+    """주제별 가이드 스트리밍"""
+    return _sse_response(_sentences(ai.aget_topic_guide_stream(request.topic), "get_topic_guide", sentences))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=config.API_HOST, port=config.API_PORT)
@@ -0,0 +1,275 @@
+"""
+서버 쪽 대화 세션 저장소
+
+클라이언트가 매 턴 conversation_history 전체와 퀴즈 dict를 다시 올려보내지 않도록
+세션별 최근 대화와 출제한 퀴즈를 서버가 들고 있습니다.
+
+- 키: (user_id, session_id) → 다른 사용자의 세션 ID를 보내도 남의 세션에 닿지 않음
+- 세션: 최근 턴 링 버퍼 (role, content) 튜플 + quiz_id → 퀴즈 (최근 몇 개만)
+- 히스토리 크기는 서버가 결정 (max_turns개 저장, 꺼낼 때 토큰 예산으로 자름)
+- 만료: 마지막 사용 후 idle_ttl 초 지나면 삭제, 세션 수·메모리 상한 초과 시 오래 안 쓴 것부터 내보냄
+- db_path를 주면 SQLite에 함께 저장 (재시작 후 복구, 메모리에서 내보낸 세션도 다시 불러옴)
+- 비동기 핸들러는 a로 시작하는 메서드 사용 (SQLite를 쓰면 스레드에서 실행해 이벤트 루프를 막지 않음)
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from history import trim_history
+
+logger = logging.getLogger(__name__)
+
+# 세션 하나당 고정 비용 추정치 (객체·dict 항목)
+SESSION_OVERHEAD_BYTES = 512
+
+
+def _key(user_id: str, session_id: str) -> str:
+    return json.dumps([user_id, session_id], ensure_ascii=False)
+
+
+class Session:
+    __slots__ = ("session_id", "user_id", "turns", "quizzes", "last_used", "size")
+
+    def __init__(self, session_id: str, user_id: str, max_turns: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max_turns)
+        self.quizzes: "OrderedDict[str, Dict]" = OrderedDict()
+        self.last_used = time.time()
+        self.size = SESSION_OVERHEAD_BYTES
+
+    def measure(self) -> int:
+        """대략적인 메모리 사용량(바이트)"""
+        self.size = (
+            SESSION_OVERHEAD_BYTES
+            + sum(len(content.encode("utf-8")) + 64 for _, content in self.turns)
+            + sum(len(json.dumps(quiz, ensure_ascii=False).encode("utf-8")) for quiz in self.quizzes.values())
+        )
+        return self.size
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"user_id": self.user_id, "turns": list(self.turns), "quizzes": list(self.quizzes.items())},
+            ensure_ascii=False
+        )
+
+    @classmethod
+    def from_json(cls, session_id: str, raw: str, max_turns: int, last_used: float) -> "Session":
+        data = json.loads(raw)
+        session = cls(session_id, data["user_id"], max_turns)
+        session.turns.extend(tuple(turn) for turn in data["turns"])
+        session.quizzes.update((quiz_id, quiz) for quiz_id, quiz in data["quizzes"])
+        session.last_used = last_used
+        session.measure()
+        return session
+
+
+class SessionStore:
+    def __init__(
+        self,
+        max_turns: int = 20,
+        max_quizzes: int = 4,
+        idle_ttl: float = 6 * 3600,
+        max_sessions: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        db_path: Optional[str] = None
+    ):
+        """
+        Args:
+            max_turns: 세션당 저장할 최근 메시지 수 (user/assistant 각각 1개)
+            max_quizzes: 세션당 보관할 최근 퀴즈 수
+            idle_ttl: 마지막 사용 후 유지 시간(초)
+            max_sessions: 메모리에 둘 최대 세션 수
+            max_bytes: 메모리에 둘 세션 데이터 총량 상한
+            db_path: SQLite 파일 경로 (None이면 메모리만 사용)
+        """
+        self.max_turns = max_turns
+        self.max_quizzes = max_quizzes
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "restored": 0, "expired": 0, "evicted": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM sessions WHERE last_used < ?", (time.time() - idle_ttl,))
+
+    # ========== 대화 ==========
+
+    def history(self, session_id: str, user_id: str, token_budget: Optional[int] = None) -> List[Dict]:
+        """프롬프트에 넣을 히스토리 (token_budget이 있으면 최근 것부터 예산만큼)"""
+        with self._lock:
+            session = self._get(_key(user_id, session_id), user_id)
+            history = [{"role": role, "content": content} for role, content in session.turns]
+        return trim_history(history, token_budget) if token_budget else history
+
+    def add_turn(self, session_id: str, user_id: str, user_message: str, assistant_message: str):
+        """사용자 메시지 + 답변 한 턴 저장"""
+        with self._lock:
+            session = self._get(_key(user_id, session_id), user_id)
+            session.turns.append(("user", user_message))
+            session.turns.append(("assistant", assistant_message))
+            self._updated(session)
+
+    def clear(self, session_id: str, user_id: str):
+        """세션 삭제"""
+        key = _key(user_id, session_id)
+        with self._lock:
+            if key in self._sessions:
+                self._drop(key)
+            elif self._db is not None:
+                self._db.execute("DELETE FROM sessions WHERE session_id = ?", (key,))
+
+    # ========== 퀴즈 ==========
+
+    def put_quiz(self, session_id: str, user_id: str, quiz: Dict) -> str:
+        """출제한 퀴즈 저장 후 quiz_id 반환 (오래된 퀴즈는 max_quizzes개만 남김)"""
+        quiz_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            session = self._get(_key(user_id, session_id), user_id)
+            session.quizzes[quiz_id] = quiz
+            while len(session.quizzes) > self.max_quizzes:
+                session.quizzes.popitem(last=False)
+            self._updated(session)
+        return quiz_id
+
+    def get_quiz(self, session_id: str, user_id: str, quiz_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._get(_key(user_id, session_id), user_id).quizzes.get(quiz_id)
+
+    # ========== 비동기 (서버 핸들러용) ==========
+
+    async def ahistory(self, session_id: str, user_id: str, token_budget: Optional[int] = None) -> List[Dict]:
+        return await self._offload(self.history, session_id, user_id, token_budget)
+
+    async def aadd_turn(self, session_id: str, user_id: str, user_message: str, assistant_message: str):
+        await self._offload(self.add_turn, session_id, user_id, user_message, assistant_message)
+
+    async def aclear(self, session_id: str, user_id: str):
+        await self._offload(self.clear, session_id, user_id)
+
+    async def aput_quiz(self, session_id: str, user_id: str, quiz: Dict) -> str:
+        return await self._offload(self.put_quiz, session_id, user_id, quiz)
+
+    async def aget_quiz(self, session_id: str, user_id: str, quiz_id: str) -> Optional[Dict]:
+        return await self._offload(self.get_quiz, session_id, user_id, quiz_id)
+
+    async def _offload(self, fn: Callable[..., Any], *args) -> Any:
+        """SQLite 파일 잠금·디스크 쓰기를 기다릴 수 있으면 스레드에서 (메모리만 쓰면 바로)"""
+        if self._db is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    # ========== 조회 ==========
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "persistent": self._db is not None
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ========== 내부 (self._lock 안에서 호출) ==========
+
+    def _get(self, key: str, user_id: str) -> Session:
+        """세션 조회 (메모리 → SQLite → 새로 생성)"""
+        now = time.time()
+        session = self._sessions.get(key)
+        if session is not None and now - session.last_used > self.idle_ttl:
+            self._drop(key)
+            self._stats["expired"] += 1
+            session = None
+
+        if session is None:
+            session = self._load(key, now)
+        if session is None:
+            session = Session(key, user_id, self.max_turns)
+            self._stats["created"] += 1
+            self._sessions[key] = session
+            self._bytes += session.size
+
+        session.last_used = now
+        self._sessions.move_to_end(key)
+        self._evict()
+        return session
+
+    def _updated(self, session: Session):
+        old = session.size
+        self._bytes += session.measure() - old
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, last_used) VALUES (?, ?, ?)",
+                (session.session_id, session.to_json(), session.last_used)
+            )
+        self._evict()
+
+    def _load(self, session_id: str, now: float) -> Optional[Session]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT data, last_used FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.idle_ttl:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._stats["expired"] += 1
+            return None
+
+        try:
+            session = Session.from_json(session_id, row[0], self.max_turns, row[1])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"세션 복구 실패 - session: {session_id}, {e}")
+            return None
+        self._sessions[session_id] = session
+        self._bytes += session.size
+        self._stats["restored"] += 1
+        return session
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def _evict(self):
+        """만료 세션 삭제 + 상한을 넘으면 오래 안 쓴 세션을 메모리에서 내보냄 (SQLite에는 남음)"""
+        cutoff = time.time() - self.idle_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used < cutoff:
+                self._drop(session_id)
+                self._stats["expired"] += 1
+            elif len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.popitem(last=False)
+                self._bytes -= session.size
+                self._stats["evicted"] += 1
+            else:
+                break
@@ -0,0 +1,102 @@
+"""
+동일 요청 합치기 (single-flight)
+
+같은 모델·메시지·파라미터의 completion이 이미 진행 중이면 새로 호출하지 않고
+먼저 시작한 호출의 결과를 함께 기다립니다.
+(예: 수업 중 여러 어르신이 동시에 "송금 가이드"를 요청하는 경우)
+
+키에는 우선순위 등급도 넣습니다. 라이브 요청이 같은 내용의 background 호출(퀴즈 풀 채우기 등)에
+붙으면 background 대기열에서 기다리고, 그 호출이 밀려나면 같이 실패하기 때문입니다.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def request_key(request: Dict, priority_class: str = "") -> str:
+    """요청 파라미터 전체 + 우선순위 등급으로 만든 키 (등급이 다르면 합치지 않음)"""
+    raw = json.dumps([priority_class, request], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._leaders: Counter = Counter()
+        self._coalesced: Counter = Counter()
+
+    def do(self, key: str, fn: Callable[[], T], label: str = "") -> T:
+        """
+        key가 같은 호출이 진행 중이면 그 결과를 기다리고, 아니면 fn()을 직접 실행
+
+        먼저 시작한 호출이 예외로 끝나면 기다리던 호출에도 같은 예외가 전달됩니다.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._leaders[label] += 1
+            else:
+                self._coalesced[label] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]], label: str = "") -> T:
+        """do()의 비동기 버전 (기다리던 쪽이 취소되어도 먼저 시작한 호출은 계속 진행)"""
+        loop_key = (id(asyncio.get_running_loop()), key)
+
+        with self._lock:
+            task = self._tasks.get(loop_key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._tasks[loop_key] = task
+                task.add_done_callback(lambda _: self._forget(loop_key))
+                self._leaders[label] += 1
+            else:
+                self._coalesced[label] += 1
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "leaders": dict(self._leaders),
+                "coalesced": dict(self._coalesced)
+            }
+
+    def _forget(self, loop_key: Tuple[int, str]):
+        with self._lock:
+            self._tasks.pop(loop_key, None)
@@ -1,9 +1,10 @@
 #연결 테스트 파일입니다 손주톡톡 기능과 상관 x
 
-from openai import OpenAI
 import os
 from dotenv import load_dotenv
 
+from http_clients import get_client_factory
+
 # .env 파일 로드
 load_dotenv()
 
@@ -15,8 +16,9 @@ else:
     print("❌ API 키를 찾을 수 없습니다.")
     exit()
 
-# OpenAI 클라이언트 초기화
-client = OpenAI(api_key=api_key)
+# OpenAI 클라이언트 초기화 (서비스와 같은 연결 풀 설정)
+factory = get_client_factory()
+client = factory.sync_client().with_options(max_retries=2)
 
 # 연결 테스트
 try:
@@ -29,6 +31,8 @@ try:
     print("✅ OpenAI 연결 성공!")
     print("응답:", response.choices[0].message.content)
     print(f"토큰 사용: {response.usage.total_tokens}")
+    pool = factory.stats()["sync"]
+    print(f"연결: HTTP/2 {factory.stats()['http2']}, 열린 연결 {pool['connections']}개")
 
 except Exception as e:
     print(f"❌ 에러: {e}")
@@ -0,0 +1,37 @@
+import os
+import sys
+
+# 모듈이 ai/ 바로 아래에 평평하게 있으므로 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def sonju(monkeypatch, tmp_path):
+    """네트워크 없이 만든 SonjuAI (클라이언트는 첫 호출 때 만들어지므로 API를 부르지 않음)"""
+    from config import config
+
+    monkeypatch.setattr(config, "OPENAI_API_KEY", "test", raising=False)
+    monkeypatch.setattr(config, "GUIDE_CACHE_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(config, "WARMUP_ON_START", False, raising=False)
+
+    from ai_service import SonjuAI
+    return SonjuAI()
+
+
+def api_error(status: int, headers=None):
+    """openai 상태 오류 (429 → RateLimitError, 5xx → InternalServerError 등)"""
+    import httpx2
+    from openai import OpenAI
+
+    request = httpx2.Request("POST", "http://test/v1/chat/completions")
+    response = httpx2.Response(status, headers=headers or {}, request=request)
+    return OpenAI(api_key="test")._make_status_error("오류", body=None, response=response)
+
+
+def api_timeout():
+    import httpx2
+    from openai import APITimeoutError
+
+    return APITimeoutError(request=httpx2.Request("POST", "http://test/v1/chat/completions"))
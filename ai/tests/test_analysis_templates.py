@@ -0,0 +1,28 @@
+import pytest
+
+from analysis_templates import TEMPLATES, AnalysisTemplates
+
+SLOW = {"lesson": "토스_송금", "avg_time": 40, "accuracy": 0.9}
+
+
+def test_default_title_is_neutral():
+    text, pattern = AnalysisTemplates().render({**SLOW, "errors": []})
+    assert pattern == "slow_accurate"
+    assert text.startswith("어르신,")
+    assert "할머니" not in text and "할아버지" not in text
+
+
+def test_given_title_is_used():
+    text, _ = AnalysisTemplates().render({**SLOW, "errors": [], "title": "할아버지"})
+    assert text.startswith("할아버지,")
+
+
+@pytest.mark.parametrize("pattern", ["steady", "slow_accurate"])
+def test_error_note_in_every_variant(pattern):
+    assert all("{note}" in template for template in TEMPLATES[pattern])
+
+
+def test_slow_accurate_mentions_single_error():
+    text, pattern = AnalysisTemplates().render({**SLOW, "errors": ["확인 버튼"]})
+    assert pattern == "slow_accurate"
+    assert "확인 버튼은" in text
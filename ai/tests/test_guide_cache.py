@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+from guide_cache import GuideCache
+
+
+def _offloads(monkeypatch):
+    calls = []
+    to_thread = asyncio.to_thread
+
+    async def recording(fn, *args):
+        calls.append(fn.__name__)
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", recording)
+    return calls
+
+
+def test_async_disk_reads_and_writes_run_off_the_loop(tmp_path, monkeypatch):
+    GuideCache(cache_dir=str(tmp_path)).put("k", "가이드")
+    cache = GuideCache(cache_dir=str(tmp_path))
+    calls = _offloads(monkeypatch)
+
+    assert asyncio.run(cache.aget("k")) == "가이드"
+    assert calls == ["get"]
+
+    # 메모리에 올라온 뒤에는 스레드를 거치지 않음
+    assert asyncio.run(cache.aget("k")) == "가이드"
+    assert asyncio.run(cache.afilled("k")) == 1
+    assert calls == ["get"]
+
+    asyncio.run(cache.aput("k2", "새 가이드"))
+    assert calls == ["get", "put"]
+    assert GuideCache(cache_dir=str(tmp_path)).get("k2") == "새 가이드"
+
+
+def test_memory_only_cache_stays_on_the_loop(monkeypatch):
+    cache = GuideCache()
+    calls = _offloads(monkeypatch)
+    asyncio.run(cache.aput("k", "가이드"))
+    assert asyncio.run(cache.aget("k")) == "가이드"
+    assert calls == []
+
+
+def test_memory_hit_does_not_wait_for_disk_io(tmp_path, monkeypatch):
+    cache = GuideCache(cache_dir=str(tmp_path))
+    cache.put("hot", "가이드")
+
+    started, release = threading.Event(), threading.Event()
+    load = cache._load
+
+    def slow_load(key):
+        started.set()
+        release.wait(5)
+        return load(key)
+
+    monkeypatch.setattr(cache, "_load", slow_load)
+    reader = threading.Thread(target=cache.get, args=("cold",))
+    reader.start()
+    assert started.wait(5)
+    try:
+        assert cache.get("hot") == "가이드"
+    finally:
+        release.set()
+        reader.join(5)
+
+
+def test_async_topic_guide_uses_disk_cache(sonju, monkeypatch):
+    calls = []
+
+    async def generate(topic):
+        calls.append(topic)
+        return {"success": True, "message": f"{topic} 안내", "tokens_used": 10}
+
+    monkeypatch.setattr(sonju, "agenerate_topic_guide", generate)
+
+    first = asyncio.run(sonju.aget_topic_guide("없는_주제"))
+    second = asyncio.run(sonju.aget_topic_guide("없는_주제"))
+    assert first["message"] == second["message"] == "없는_주제 안내"
+    assert second["cached"] and calls == ["없는_주제"]
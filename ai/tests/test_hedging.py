@@ -0,0 +1,56 @@
+import threading
+import time
+
+from hedging import Hedger
+
+
+def test_executor_queue_time_does_not_trigger_hedge():
+    hedger = Hedger(default_delay=0.1, max_workers=2)
+    release = threading.Event()
+    blockers = [threading.Thread(target=hedger.call, args=(release.wait,)) for _ in range(2)]
+    for blocker in blockers:
+        blocker.start()
+    time.sleep(0.05)
+
+    result = {}
+    caller = threading.Thread(target=lambda: result.setdefault("value", hedger.call(lambda: time.sleep(0.05) or "답")))
+    caller.start()
+    # 두 일꾼이 모두 바쁜 동안 caller의 첫 호출은 대기열에서 헤지 대기 시간(0.1초)보다 오래 기다림
+    time.sleep(0.3)
+    release.set()
+    caller.join(5)
+    for blocker in blockers:
+        blocker.join(5)
+
+    assert result["value"] == "답"
+    # blocker 두 건만 늦어져 헤지됨 (caller는 시작 후 0.05초 만에 끝남)
+    assert hedger.stats()["hedged"] == 2
+    hedger.shutdown()
+
+
+def test_failed_loser_is_charged_through_cost():
+    hedger = Hedger(default_delay=0.05, max_workers=4)
+    charged = []
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            raise RuntimeError("첫 호출 실패")
+        return "헤지 응답"
+
+    assert hedger.call(fn, cost=lambda loser, sent: charged.append((loser, sent)) or 40) == "헤지 응답"
+    time.sleep(0.3)
+    assert charged == [(None, True)]
+    assert hedger.stats()["hedge_wins"] == 1
+    assert hedger.stats()["extra_tokens"] == 40
+    hedger.shutdown()
+
+
+def test_reserve_refusal_skips_hedge():
+    hedger = Hedger(default_delay=0.01)
+    assert hedger.call(lambda: time.sleep(0.05) or "답", reserve=lambda: False) == "답"
+    stats = hedger.stats()
+    assert stats["hedged"] == 0 and stats["denied"] == 1 and stats["credits"] >= 1
+    hedger.shutdown()
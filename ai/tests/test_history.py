@@ -0,0 +1,60 @@
+from history import ConversationMemory, message_tokens, trim_history
+
+
+def _memory(budget=300, trigger=120):
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append(messages)
+        return (previous + " / " if previous else "") + f"요약{len(calls)}"
+
+    return ConversationMemory(summarize, budget=budget, summary_trigger=trigger), calls
+
+
+def _talk(memory, turns):
+    for i in range(turns):
+        memory.add_turn("질문 " * 20 + str(i), "답변 " * 30 + str(i))
+
+
+def test_history_stays_within_budget_and_survives_trim():
+    memory, _ = _memory()
+    for i in range(20):
+        _talk(memory, 1)
+        history = memory.history()
+        assert message_tokens(history) <= memory.budget
+        assert trim_history(history, memory.budget) == history
+
+
+def test_folded_turns_are_summarized_immediately():
+    memory, calls = _memory()
+    _talk(memory, 6)
+
+    assert calls, "예산을 넘었는데 요약하지 않음"
+    folded = [m for batch in calls for m in batch]
+    kept = memory.recent
+    # 접힌 메시지 + 남은 메시지 = 전체 대화 (빠진 대화 없음)
+    assert len(folded) + len(kept) == 12
+    assert memory.history()[0]["content"].endswith(f"요약{len(calls)}")
+
+
+def test_folds_whole_pairs():
+    memory, calls = _memory()
+    _talk(memory, 10)
+
+    for batch in calls:
+        assert [m["role"] for m in batch] == ["user", "assistant"] * (len(batch) // 2)
+    assert memory.recent[0]["role"] == "user"
+
+
+def test_summary_calls_are_amortized():
+    memory, calls = _memory()
+    _talk(memory, 10)
+    assert len(calls) < 10 - 3
+
+
+def test_without_summarizer_drops_oldest_pairs():
+    memory = ConversationMemory(None, budget=300, summary_trigger=120)
+    _talk(memory, 6)
+    assert memory.summary == ""
+    assert memory.recent[0]["role"] == "user"
+    assert message_tokens(memory.history()) <= 300
@@ -0,0 +1,67 @@
+import json
+
+from learning_stats import LearningStats
+
+
+def _event(i, correct=True, step="송금"):
+    return {"user_id": "u1", "lesson": "토스", "step": step, "duration": 2.0, "correct": correct, "timestamp": 1000 + i}
+
+
+def test_events_survive_without_clean_shutdown(tmp_path):
+    path = str(tmp_path / "learning.json")
+    stats = LearningStats(snapshot_path=path)
+    stats.ingest([_event(0), _event(1, correct=False)])
+    stats.ingest([_event(2)])
+    # save()/close() 없이 끝남
+
+    restored = LearningStats(snapshot_path=path)
+    aggregate = restored.aggregate("u1", "토스")
+    assert aggregate["events"] == 3
+    assert aggregate["errors"] == [{"step": "송금", "count": 1}]
+
+
+def test_save_truncates_log_and_replay_skips_snapshotted_batches(tmp_path):
+    path = str(tmp_path / "learning.json")
+    stats = LearningStats(snapshot_path=path)
+    stats.ingest([_event(0)])
+    stats.save()
+    assert (tmp_path / "learning.json.log").read_text() == ""
+
+    stats.ingest([_event(1)])
+    restored = LearningStats(snapshot_path=path)
+    assert restored.aggregate("u1", "토스")["events"] == 2
+
+
+def test_replay_skips_batches_already_in_snapshot(tmp_path):
+    path = str(tmp_path / "learning.json")
+    stats = LearningStats(snapshot_path=path)
+    stats.ingest([_event(0)])
+    log = (tmp_path / "learning.json.log").read_text()
+    stats.save()
+    # 저장 도중 비우지 못한 로그가 남은 경우
+    (tmp_path / "learning.json.log").write_text(log)
+
+    restored = LearningStats(snapshot_path=path)
+    assert restored.aggregate("u1", "토스")["events"] == 1
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / "learning.json")
+    stats = LearningStats(snapshot_path=path)
+    stats.ingest([_event(0)])
+    with open(tmp_path / "learning.json.log", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"seq": 2, "events": [["u1", "토스", "송금", 1.0, True, 1.0]]})[:20])
+
+    restored = LearningStats(snapshot_path=path)
+    assert restored.aggregate("u1", "토스")["events"] == 1
+
+    # 잘린 줄 뒤에 이어 쓴 묶음도 다음 복구 때 살아 있음
+    restored.ingest([_event(1)])
+    assert LearningStats(snapshot_path=path).aggregate("u1", "토스")["events"] == 2
+
+
+def test_rejected_events_are_not_logged(tmp_path):
+    path = str(tmp_path / "learning.json")
+    stats = LearningStats(snapshot_path=path)
+    assert stats.ingest([{"user_id": "u1"}, {**_event(0), "duration": -1}]) == (0, 2)
+    assert (tmp_path / "learning.json.log").read_text() == ""
@@ -0,0 +1,69 @@
+import pytest
+
+from conftest import api_error, api_timeout
+from model_router import ModelRouter, is_degradation
+from rate_limiter import RateLimitScheduler
+
+ROUTES = {"default": {"model": "main", "max_tokens": 10, "temperature": 0, "fallback": "backup"}}
+
+
+def test_degradation_errors():
+    assert is_degradation(api_timeout())
+    assert is_degradation(api_error(500))
+    assert is_degradation(api_error(503))
+    assert not is_degradation(api_error(429))
+    assert not is_degradation(api_error(400))
+    assert not is_degradation(ValueError("parse"))
+
+
+@pytest.fixture
+def service(sonju):
+    sonju.router = ModelRouter(ROUTES, min_samples=4, error_rate=0.2)
+    sonju.rate_limiter = RateLimitScheduler(max_retries=3, backoff_base=0.001, backoff_max=0.001)
+    sonju.scheduler = None
+    return sonju
+
+
+def _flaky(service, errors):
+    """errors를 차례로 던진 뒤 성공하는 업스트림 호출"""
+    request = {"model": "main", "messages": [{"role": "user", "content": "안녕"}], "max_tokens": 10}
+    remaining = list(errors)
+    last = {}
+
+    def upstream():
+        def create():
+            if remaining:
+                raise remaining.pop(0)
+            return "ok"
+        return service._observed(request, create, last)
+
+    return service._limited(request, upstream, "interactive", last=last)
+
+
+def test_retried_rate_limits_do_not_trip_fallback(service):
+    for _ in range(10):
+        assert _flaky(service, [api_error(429), api_error(429)]) == "ok"
+
+    summary = service.router.stats()["models"]["main"]
+    assert summary["samples"] == 10
+    assert summary["error_rate"] == 0.0
+    assert service.router.select("default")["model"] == "main"
+
+
+def test_only_final_failure_is_recorded(service):
+    assert _flaky(service, [api_timeout()]) == "ok"
+    with pytest.raises(Exception):
+        _flaky(service, [api_timeout()] * 4)
+    with pytest.raises(Exception):
+        _flaky(service, [api_error(429)] * 4)
+
+    summary = service.router.stats()["models"]["main"]
+    assert summary["samples"] == 2
+    assert summary["error_rate"] == 0.5
+
+
+def test_repeated_server_errors_trip_fallback(service):
+    for _ in range(4):
+        with pytest.raises(Exception):
+            _flaky(service, [api_error(500)] * 4)
+    assert service.router.select("default")["model"] == "backup"
@@ -0,0 +1,89 @@
+import functools
+import time
+
+from prefetch import Prefetcher
+from priority_scheduler import PriorityScheduler, current_priority
+from rate_limiter import RateLimitScheduler
+
+QUIZ = {
+    "question": "토스에서 송금 버튼은 어디에 있나요?",
+    "options": ["1. 아래", "2. 위", "3. 왼쪽", "4. 오른쪽"],
+    "correct_answer": 1,
+    "explanation": "화면 아래에 있어요.",
+    "encouragement": "잘하셨어요!"
+}
+
+
+def _prefetcher(fetch, **kwargs):
+    return Prefetcher({"quiz": fetch}, quiz_topics=["토스"], start_delay=0, **kwargs)
+
+
+def _wait_done(prefetcher):
+    future = prefetcher._pending[1]
+    while not future.done():
+        time.sleep(0.01)
+
+
+def test_taken_prefetch_is_raised_to_interactive():
+    limiter = RateLimitScheduler(rpm=1000, tpm=1000)
+    scheduler = PriorityScheduler(limiter, reserved_quota=0.2)
+    # background 몫(800)은 다 찼고 interactive 몫만 남음
+    limiter.reserve(850)
+    admitted = []
+
+    def fetch(topic):
+        scheduler.admit(current_priority("near_real_time"), 100)
+        admitted.append(current_priority("near_real_time"))
+        return {"success": True, "quiz": QUIZ, "tokens_used": 100}
+
+    prefetcher = _prefetcher(fetch, wait_seconds=2)
+    prefetcher.served("answered:토스")
+    time.sleep(0.1)
+    assert scheduler.stats()["classes"]["background"]["waiting"] == 1
+
+    started = time.perf_counter()
+    assert prefetcher.take("quiz:토스")["success"]
+    assert time.perf_counter() - started < 1
+    assert admitted == ["interactive"]
+    assert scheduler.stats()["classes"]["interactive"]["promoted"] == 1
+    scheduler.shutdown()
+
+
+def test_mispredicted_quiz_goes_back_to_pool(sonju):
+    assert sonju.quiz_pool.put("토스", "쉬움", QUIZ)
+    prefetcher = _prefetcher(
+        functools.partial(sonju.generate_quiz, user_id="u"),
+        returns={"quiz": functools.partial(sonju.return_quiz, user_id="u")}
+    )
+    prefetcher.served("answered:토스")
+    _wait_done(prefetcher)
+    assert sonju.quiz_pool.size("토스", "쉬움") == 0
+
+    assert prefetcher.take("guide:토스_송금") is None
+    assert prefetcher.stats()["returned"] == 1
+    assert prefetcher.stats()["wasted_tokens"] == 0
+    # 되돌린 퀴즈는 같은 사용자에게 다시 나감 (본 문제로 남지 않음)
+    result = sonju.generate_quiz("토스", user_id="u")
+    assert result["pooled"] and result["quiz"]["question"] == QUIZ["question"]
+
+
+def test_unreturnable_result_counts_as_wasted():
+    prefetcher = _prefetcher(
+        lambda topic: {"success": True, "quiz": QUIZ, "tokens_used": 120},
+        returns={"quiz": lambda topic, result: False}
+    )
+    prefetcher.served("answered:토스")
+    _wait_done(prefetcher)
+    assert prefetcher.take("chat") is None
+    assert prefetcher.stats()["wasted_tokens"] == 120
+    assert prefetcher.stats()["returned"] == 0
+
+
+def test_miss_before_start_makes_no_call():
+    calls = []
+    prefetcher = Prefetcher({"quiz": calls.append}, quiz_topics=["토스"], start_delay=5)
+    prefetcher.served("answered:토스")
+    assert prefetcher.take("chat") is None
+    time.sleep(0.05)
+    assert calls == []
+    assert prefetcher.stats()["skipped"] == 1
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from priority_scheduler import PriorityScheduler, SchedulerRejected
+from rate_limiter import RateLimitScheduler
+
+
+class _Recording(PriorityScheduler):
+    """입장 순서를 기록"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.order = []
+
+    def _grant(self, waiter, ticket, now):
+        self.order.append(waiter.priority)
+        super()._grant(waiter, ticket, now)
+
+
+def _admit_in_thread(scheduler, priority, tokens=100):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["ticket"] = scheduler.admit(priority, tokens)
+        except SchedulerRejected as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def _wait_queued(scheduler, count):
+    deadline = time.monotonic() + 2
+    while scheduler.stats()["waiting"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scheduler.stats()["waiting"] == count
+
+
+def test_admits_immediately_when_nothing_waits():
+    limiter = RateLimitScheduler(rpm=100, tpm=10000)
+    scheduler = PriorityScheduler(limiter)
+    ticket = scheduler.admit("background", 100)
+    assert ticket is not None and ticket.tokens == 100
+    assert scheduler.stats()["classes"]["background"]["queued"] == 0
+
+
+def test_weighted_fair_order_across_classes():
+    limiter = RateLimitScheduler(rpm=100, tpm=100000)
+    scheduler = _Recording(limiter, weights={"interactive": 4, "background": 1})
+    limiter.penalize(0.3)
+
+    threads = []
+    for priority in ["background"] * 3 + ["interactive"] * 3:
+        threads.append(_admit_in_thread(scheduler, priority)[0])
+        time.sleep(0.01)
+    _wait_queued(scheduler, 6)
+    for thread in threads:
+        thread.join(3)
+
+    # 가중치 4배 → 먼저 들어온 background보다 interactive가 앞섬, 같은 등급 안에서는 도착 순
+    assert scheduler.order == ["interactive"] * 3 + ["background"] * 3
+    scheduler.shutdown()
+
+
+def test_reserved_quota_is_left_for_interactive():
+    limiter = RateLimitScheduler(rpm=10, tpm=100000)
+    scheduler = PriorityScheduler(limiter, reserved_quota=0.2, deadlines={"background": 0.2})
+    for _ in range(8):
+        scheduler.admit("background", 10)
+
+    with pytest.raises(SchedulerRejected) as rejected:
+        scheduler.admit("background", 10)
+    assert rejected.value.reason == "expired"
+
+    started = time.perf_counter()
+    assert scheduler.admit("interactive", 10) is not None
+    assert time.perf_counter() - started < 0.1
+    scheduler.shutdown()
+
+
+def test_background_is_shed_when_live_traffic_arrives():
+    limiter = RateLimitScheduler(rpm=100, tpm=100000)
+    scheduler = PriorityScheduler(limiter, queue_limits={"background": 2})
+    limiter.penalize(0.5)
+
+    first, first_outcome = _admit_in_thread(scheduler, "background")
+    _wait_queued(scheduler, 1)
+    last, last_outcome = _admit_in_thread(scheduler, "background")
+    _wait_queued(scheduler, 2)
+
+    # 대기열이 background 한도에 닿아 있으면 새 background는 바로 거절
+    with pytest.raises(SchedulerRejected) as rejected:
+        scheduler.admit("background", 100)
+    assert rejected.value.reason == "shed"
+
+    # 높은 등급이 들어오면 가장 늦게 들어온 background부터 돌려보냄
+    live, live_outcome = _admit_in_thread(scheduler, "interactive")
+    for thread in (first, last, live):
+        thread.join(3)
+    assert last_outcome["error"].reason == "shed"
+    assert "ticket" in first_outcome and "ticket" in live_outcome
+    assert scheduler.stats()["classes"]["background"]["shed"] == 2
+    scheduler.shutdown()
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    limiter = RateLimitScheduler(rpm=100, tpm=100000)
+    scheduler = PriorityScheduler(limiter)
+    limiter.penalize(0.5)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.aadmit("near_real_time", 100), 0.05)
+
+    asyncio.run(run())
+    stats = scheduler.stats()
+    assert stats["waiting"] == 0
+    assert stats["classes"]["near_real_time"]["cancelled"] == 1
+    scheduler.shutdown()
+
+
+def test_shutdown_rejects_waiters():
+    limiter = RateLimitScheduler(rpm=100, tpm=100000)
+    scheduler = PriorityScheduler(limiter)
+    limiter.penalize(5)
+
+    thread, outcome = _admit_in_thread(scheduler, "background")
+    _wait_queued(scheduler, 1)
+    scheduler.shutdown()
+    thread.join(3)
+    assert outcome["error"].reason == "shutdown"
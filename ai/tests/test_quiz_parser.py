@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from quiz_parser import DEFAULT_ENCOURAGEMENT, parse_quiz, quiz_response_format, validate_quiz
+
+QUIZ = {
+    "question": "토스에서 송금하려면 어떤 버튼을 누르나요?",
+    "options": ["1. 송금", "2. 결제", "3. 설정", "4. 혜택"],
+    "correct_answer": 1,
+    "explanation": "송금 버튼을 누르면 받는 사람을 고를 수 있어요.",
+    "encouragement": "잘하셨어요!"
+}
+
+
+def _text(**changes):
+    return json.dumps({**QUIZ, **changes}, ensure_ascii=False)
+
+
+def test_clean_quiz_needs_no_repairs():
+    quiz, repairs = parse_quiz(_text())
+    assert quiz == QUIZ
+    assert repairs == []
+
+
+def test_ignores_code_fence_and_surrounding_text():
+    quiz, _ = parse_quiz(f"퀴즈입니다.\n```json\n{_text()}\n```\n풀어 보세요!")
+    assert quiz == QUIZ
+
+
+def test_trailing_comma():
+    quiz, repairs = parse_quiz(_text()[:-1] + ", }")
+    assert quiz == QUIZ
+    assert repairs == ["trailing_comma"]
+
+
+@pytest.mark.parametrize("answer", ["2", "2번", "②", "(2)", "2)"])
+def test_answer_string(answer):
+    quiz, repairs = parse_quiz(_text(correct_answer=answer))
+    assert quiz["correct_answer"] == 2
+    assert repairs == ["answer_string"]
+
+
+def test_answer_as_option_text():
+    quiz, repairs = parse_quiz(_text(correct_answer="설정"))
+    assert quiz["correct_answer"] == 3
+    assert repairs == ["answer_text"]
+
+
+@pytest.mark.parametrize("options", [
+    ["송금", "결제", "설정", "혜택"],
+    ["1) 송금", "2) 결제", "3) 설정", "4) 혜택"],
+    ["A. 송금", "B. 결제", "C. 설정", "D. 혜택"],
+    ["① 송금", "② 결제", "③ 설정", "④ 혜택"],
+])
+def test_option_numbering(options):
+    quiz, repairs = parse_quiz(_text(options=options))
+    assert quiz["options"] == QUIZ["options"]
+    assert set(repairs) == {"option_numbering"}
+
+
+def test_options_dict():
+    quiz, repairs = parse_quiz(_text(options={"1": "송금", "2": "결제", "3": "설정", "4": "혜택"}))
+    assert quiz["options"] == QUIZ["options"]
+    assert repairs[0] == "options_dict"
+
+
+def test_field_aliases_and_default_encouragement():
+    data = {k: v for k, v in QUIZ.items() if k not in ("options", "correct_answer", "encouragement")}
+    data.update(choices=QUIZ["options"], answer=1)
+    quiz = validate_quiz(data, repairs := [])
+    assert quiz == {**QUIZ, "encouragement": DEFAULT_ENCOURAGEMENT}
+    assert repairs.count("field_alias") == 2
+    assert "default_encouragement" in repairs
+
+
+def test_numbers_inside_option_text_are_kept():
+    options = ["1. 3.5초 기다리기", "2. 2번 누르기", "3. 송금", "4. 결제"]
+    quiz, repairs = parse_quiz(_text(options=options))
+    assert quiz["options"] == options
+    assert repairs == []
+
+
+@pytest.mark.parametrize("text, error", [
+    ("퀴즈를 만들 수 없어요.", json.JSONDecodeError),
+    ('{"question": "송금", "options": [', json.JSONDecodeError),
+    (_text(options=["1. 송금", "2. 결제", "3. 설정"]), ValueError),
+    (_text(options="송금, 결제"), ValueError),
+    (_text(options=["1. 송금", "2. ", "3. 설정", "4. 혜택"]), ValueError),
+    (_text(correct_answer=5), ValueError),
+    (_text(correct_answer=True), ValueError),
+    (_text(correct_answer="모르겠어요"), ValueError),
+    (_text(question=""), ValueError),
+    (json.dumps({"question": "송금"}, ensure_ascii=False), KeyError),
+    ("[1, 2]", json.JSONDecodeError),
+])
+def test_unfixable_quizzes_raise(text, error):
+    with pytest.raises(error):
+        parse_quiz(text)
+
+
+def test_response_formats():
+    schema = quiz_response_format("json_schema")["json_schema"]["schema"]
+    assert schema["additionalProperties"] is False
+    assert set(schema["required"]) == set(QUIZ)
+    assert schema["properties"]["correct_answer"]["enum"] == [1, 2, 3, 4]
+    assert quiz_response_format("json_object") == {"type": "json_object"}
+    assert quiz_response_format("none") is None
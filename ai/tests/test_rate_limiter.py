@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from conftest import api_error, api_timeout
+from priority_scheduler import PriorityScheduler, SchedulerRejected
+from rate_limiter import RateLimitScheduler
+
+
+@pytest.fixture
+def limiter():
+    return RateLimitScheduler(rpm=100, tpm=1000, max_retries=2, backoff_base=0.001, backoff_max=0.001)
+
+
+def _failing(*errors, result="ok"):
+    remaining = list(errors)
+
+    def fn():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    return fn
+
+
+def test_reserve_then_record_actual_tokens(limiter):
+    ticket = limiter.reserve(300)
+    assert limiter.stats()["tokens_last_minute"] == 300
+    limiter.record(ticket, 120)
+    assert limiter.stats()["tokens_last_minute"] == 120
+    limiter.record(ticket, None)
+    assert ticket.tokens == 120
+
+
+def test_try_reserve_keeps_share_free(limiter):
+    ticket, _ = limiter.try_reserve(700, share=0.8)
+    assert ticket is not None
+    ticket, wait = limiter.try_reserve(200, share=0.8)
+    assert ticket is None and wait > 0
+    ticket, _ = limiter.try_reserve(200, share=1.0)
+    assert ticket is not None
+
+
+def test_rate_limited_attempt_is_released(limiter):
+    assert limiter.call(_failing(api_error(429)), 400) == "ok"
+    stats = limiter.stats()
+    assert stats["retries"] == 1 and stats["rate_limited"] == 1
+    assert stats["requests_last_minute"] == 2
+    assert stats["tokens_last_minute"] == 400
+
+
+def test_timed_out_attempt_keeps_estimate(limiter):
+    assert limiter.call(_failing(api_timeout()), 400, tokens_of=lambda _: 50) == "ok"
+    assert limiter.stats()["tokens_last_minute"] == 400 + 50
+
+
+def test_non_retryable_error_is_raised(limiter):
+    with pytest.raises(api_error(400).__class__):
+        limiter.call(_failing(api_error(400)), 10)
+    assert limiter.stats()["retries"] == 0
+
+
+def test_gives_up_after_max_retries(limiter):
+    with pytest.raises(api_error(503).__class__):
+        limiter.call(_failing(*[api_error(503)] * 3), 10)
+    assert limiter.stats()["failed"] == 1
+
+
+def test_every_attempt_is_admitted(limiter):
+    admitted = []
+
+    def admit():
+        admitted.append(1)
+        ticket, _ = limiter.try_reserve(100, share=0.5)
+        return ticket
+
+    assert limiter.call(_failing(api_error(429), api_error(500)), 100, admit=admit) == "ok"
+    assert len(admitted) == 3
+    # admit가 준 예약만 쓰고 따로 예약하지 않음
+    assert limiter.stats()["requests"] == 3
+
+
+def test_async_retries_are_admitted(limiter):
+    admitted = []
+
+    async def admit():
+        admitted.append(1)
+        return limiter.reserve(100)
+
+    async def fn(errors=[api_error(429)]):
+        if errors:
+            raise errors.pop()
+        return "ok"
+
+    assert asyncio.run(limiter.acall(fn, 100, admit=admit)) == "ok"
+    assert len(admitted) == 2
+
+
+def test_background_retry_does_not_use_reserved_quota():
+    limiter = RateLimitScheduler(rpm=1000, tpm=1000, max_retries=3, backoff_base=0.001, backoff_max=0.001)
+    scheduler = PriorityScheduler(limiter, reserved_quota=0.2, deadlines={"background": 0.3})
+    limiter.reserve(600)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            # 첫 시도가 429로 돌아오는 사이 다른 호출이 background 몫(800)을 거의 다 씀
+            limiter.reserve(100)
+            raise api_error(429)
+        return "ok"
+
+    with pytest.raises(SchedulerRejected) as rejected:
+        limiter.call(fn, 150, admit=lambda: scheduler.admit("background", 150))
+    assert rejected.value.reason == "expired"
+    assert len(attempts) == 1
+    assert limiter.stats()["tokens_last_minute"] == 700
+
+    # interactive는 남겨 둔 몫으로 바로 나감
+    assert scheduler.admit("interactive", 150) is not None
+    scheduler.shutdown()
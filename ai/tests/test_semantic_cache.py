@@ -0,0 +1,74 @@
+import pytest
+
+from intent import get_detector
+from semantic_cache import SemanticCache, normalize, polarity
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(signature=get_detector().topic_signature)
+
+
+def test_paraphrase_hits(cache):
+    cache.put("송금 어떻게 해요?", "송금 방법")
+    assert normalize("돈 보내는 방법 알려줘") == normalize("송금 어떻게 해요?")
+    assert cache.get("돈 보내는 방법 알려줘") == "송금 방법"
+
+
+def test_negation_misses(cache):
+    cache.put("손주야 오늘 기분이 너무 좋아서 전화했어", "와 정말 기쁜 날이네요!")
+    assert cache.get("손주야 오늘 기분이 너무 안 좋아서 전화했어") is None
+    assert cache.get("손주야 오늘 기분이 너무 안좋아서 전화했어") is None
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("소리 크게 하는 방법", "소리 작게 하는 방법"),
+    ("화면 밝게 하는 방법 알려줘", "화면 어둡게 하는 방법 알려줘"),
+    ("와이파이 켜는 방법", "와이파이 끄는 방법"),
+    ("토스로 돈 보내는 방법", "토스로 돈 받는 방법"),
+    ("카톡 친구 추가하는 방법", "카톡 친구 삭제하는 방법"),
+    ("사진이 보이는 방법", "사진이 안 보이는 방법"),
+])
+def test_opposite_meaning_misses(cache, stored, asked):
+    cache.put(stored, "답변")
+    assert cache.get(asked) is None
+
+
+def test_polarity_marks():
+    assert polarity("소리 크게 하는 방법") != polarity("소리 작게 하는 방법")
+    assert "부정" in polarity("전화가 안 돼요")
+    assert polarity("안녕하세요 송금 방법") == polarity("송금 방법")
+
+
+def test_different_topic_misses(cache):
+    cache.put("토스 송금 방법 알려줘", "토스")
+    assert cache.get("카카오톡 송금 방법 알려줘") is None
+
+
+def test_threshold_default_rejects_loose_match(cache):
+    cache.put("사진 보내는 방법", "사진")
+    assert cache.get("사진 크기 보내는 방법 설정") is None
+
+
+def test_ttl_expired_misses():
+    cache = SemanticCache(ttl=0)
+    cache.put("송금 방법", "답변")
+    assert cache.get("송금 방법") is None
+
+
+def test_chat_is_not_how_to():
+    detector = get_detector()
+    assert not detector.is_how_to("손주야 오늘 기분이 너무 좋아서 전화했어")
+    assert detector.is_how_to("소리 크게 하는 방법")
+    assert detector.is_how_to("송금 어떻게 해")
+
+
+def test_service_caches_how_to_only(sonju):
+    answer = {"success": True, "message": "와 정말 기쁜 날이네요!"}
+    sonju._semantic_store("손주야 오늘 기분이 너무 좋아서 전화했어", None, True, answer)
+    assert sonju.semantic_cache.stats()["entries"] == 0
+    assert sonju._semantic_lookup("손주야 오늘 기분이 너무 좋아서 전화했어", None, True) is None
+
+    sonju._semantic_store("소리 크게 하는 방법", None, True, {"success": True, "message": "크게"})
+    assert sonju._semantic_lookup("소리 크게 하는 방법 알려줘", None, True)["message"] == "크게"
+    assert sonju._semantic_lookup("소리 작게 하는 방법", None, True) is None
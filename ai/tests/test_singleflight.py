@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from priority_scheduler import SchedulerRejected, priority
+from singleflight import SingleFlight, request_key
+
+REQUEST = {"model": "m", "messages": [{"role": "user", "content": "송금 퀴즈"}], "max_tokens": 10}
+
+
+def _run_together(*targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(5)
+
+
+def test_identical_calls_share_one_leader():
+    flight = SingleFlight()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "답"
+
+    _run_together(*[lambda: results.append(flight.do("k", slow, label="m"))] * 3)
+    assert calls == [1]
+    assert results == ["답"] * 3
+    assert flight.stats()["coalesced"] == {"m": 2}
+
+
+def test_leader_error_reaches_joiners():
+    flight = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("실패")
+
+    def join():
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    _run_together(join, join)
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_async_joiner_cancel_keeps_leader_running():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "답"
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado("k", slow))
+        second = asyncio.ensure_future(flight.ado("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "답"
+    assert calls == [1]
+
+
+def test_key_separates_priority_classes():
+    assert request_key(REQUEST, "interactive") == request_key(dict(REQUEST), "interactive")
+    assert request_key(REQUEST, "interactive") != request_key(REQUEST, "background")
+
+
+@pytest.fixture
+def service(sonju, monkeypatch):
+    """업스트림 대신 등급을 기록하고 0.2초 뒤 답하는 SonjuAI (background는 밀려남)"""
+    sonju.coalesce_methods = {"generate_quiz"}
+    sonju.hedge_methods = set()
+    sonju.upstream_classes = []
+
+    def limited(request, fn, priority_class, tokens_of=None, last=None):
+        sonju.upstream_classes.append(priority_class)
+        time.sleep(0.2)
+        if priority_class == "background":
+            raise SchedulerRejected(priority_class, "shed")
+        return "퀴즈"
+
+    monkeypatch.setattr(sonju, "_limited", limited)
+    return sonju
+
+
+def test_live_call_does_not_join_background_leader(service):
+    results = []
+
+    def refill():
+        with priority("background"):
+            try:
+                service._create(REQUEST, "generate_quiz")
+            except SchedulerRejected as e:
+                results.append(e.reason)
+
+    def live():
+        results.append(service._create(REQUEST, "generate_quiz"))
+
+    _run_together(refill, live, live)
+    assert sorted(service.upstream_classes) == ["background", "near_real_time"]
+    assert sorted(results) == ["shed", "퀴즈", "퀴즈"]